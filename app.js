@@ -25,6 +25,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const connectionThresholdInput = d3.select('#connection-threshold');
     const connectionThresholdValue = d3.select('#connection-threshold-value');
     const calcSortModeSelect = d3.select('#calc-sort-mode');
+    const textSearchInput = d3.select('#text-search');
+    const textSearchResults = d3.select('#text-search-results');
 
     const containerRect = container.node().getBoundingClientRect();
     const state = {
@@ -43,6 +45,11 @@ document.addEventListener('DOMContentLoaded', () => {
         topicMetaByCode: new Map(),
         calculusHierarchy: new Map(),
         nodeIdByTopicCode: new Map(),
+        csPostings: null,
+        rationaleTexts: {},
+        rationaleShards: null,
+        loadedShards: new Map(),
+        readyShards: new Set(),
         allCourses: [],
         selectedCourses: new Set(),
         selectedNodeId: null,
@@ -57,7 +64,10 @@ document.addEventListener('DOMContentLoaded', () => {
         showFullMap: false,
         maxDegree: 0,
         activeTopicCode: null,
-        initialFitDone: false
+        initialFitDone: false,
+        hasPrecomputedLayout: false,
+        searchIndexPromise: null,
+        related: null
     };
 
     svg.attr('width', state.width).attr('height', state.height);
@@ -164,11 +174,35 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    if (!textSearchInput.empty()) {
+        let searchTimer = null;
+        textSearchInput.on('input', (event) => {
+            const query = event.target.value;
+            window.clearTimeout(searchTimer);
+            searchTimer = window.setTimeout(() => {
+                if (!query.trim()) {
+                    textSearchResults.html('');
+                    return;
+                }
+                loadSearchIndex().then((index) => {
+                    // Ignore answers to queries the user has already typed past
+                    if (textSearchInput.property('value') !== query) return;
+                    renderTextSearchResults(index ? searchRationales(index, query) : null);
+                });
+            }, 120);
+        });
+    }
+
     Promise.all([
-        d3.json('graph_data.json'),
+        // Skeleton without rationale text for first paint; full file if it has not been built
+        d3.json('graph_skeleton.json').catch(() => d3.json('graph_data.json')),
         d3.text('Calculus topic list-Table 1.csv'),
-        d3.text('CS topic lists-Table 1.csv')
-    ]).then(([graph, calculusCsvText, csTopicsCsvText]) => {
+        d3.text('CS topic lists-Table 1.csv'),
+        // Optional build artifact; filtering falls back to scanning rationales without it
+        d3.json('cs_topic_postings.json').catch(() => null),
+        // Optional build artifact; the rationale panel skips related topics without it
+        d3.json('related_topics.json').catch(() => null)
+    ]).then(([graph, calculusCsvText, csTopicsCsvText, postings, related]) => {
         if (!graph) {
             throw new Error('Graph data missing');
         }
@@ -183,7 +217,12 @@ document.addEventListener('DOMContentLoaded', () => {
         state.allCourses = Array.from(topicLookup.hierarchy.keys());
         state.csTopicsList = csTopicsList;
 
+        // Content-addressed rationale strings; items reference them by rationale_id
+        state.rationaleTexts = graph.rationale_texts || {};
+        state.rationaleShards = graph.rationale_shards || null;
         initializeGraph(graph);
+        state.csPostings = buildPostingsLookup(postings);
+        state.related = buildRelatedLookup(related);
         renderCalculusTree(state.calculusHierarchy);
         renderCSTopicTree(state.nodes, csTopicsList);
         updateCourseSummary();
@@ -195,7 +234,7 @@ document.addEventListener('DOMContentLoaded', () => {
         window.setTimeout(() => {
             fitGraphToView({ animate: true });
             state.initialFitDone = true;
-        }, 900);
+        }, state.hasPrecomputedLayout ? 0 : 900);
     }).catch((error) => {
         console.error('Error loading visualization data:', error);
         alert('An error occurred while loading the visualization. Please check the console for details.');
@@ -215,36 +254,23 @@ document.addEventListener('DOMContentLoaded', () => {
         state.edges = graph.edges.map((edge) => ({ ...edge }));
 
         state.nodes.forEach((node) => {
-            // Check for special mappings first (nodes 27, 28, 20, 24)
-            let specialMapping = null;
-            if (node.number_id) {
-                specialMapping = getSpecialTopicMapping(node.label, node.number_id);
-            }
-
-            if (specialMapping) {
-                // Apply special mapping directly
-                node.topicCode = specialMapping.topicCode;
-                node.topicName = specialMapping.topicName;
-                node.course = specialMapping.course || node.calc_level;
-                node.coreIdea = specialMapping.coreIdea;
-                state.nodeIdByTopicCode.set(specialMapping.topicCode, node.id);
+            // The build resolves topicCode, topicName, course and coreIdea from
+            // topic_code_map.json; older graph files fall back to the label.
+            const resolved = node.topicCode && node.topicName && node.coreIdea
+                ? node
+                : state.topicLookupByName.get(normalizeText(node.label));
+
+            if (resolved) {
+                node.topicCode = resolved.topicCode;
+                node.topicName = resolved.topicName;
+                node.course = resolved.course || node.calc_level;
+                node.coreIdea = resolved.coreIdea;
+                state.nodeIdByTopicCode.set(resolved.topicCode, node.id);
             } else {
-                // Try normal lookup
-                const normalizedLabel = normalizeText(node.label);
-                const lookupMatch = state.topicLookupByName.get(normalizedLabel);
-
-                if (lookupMatch) {
-                    node.topicCode = lookupMatch.topicCode;
-                    node.topicName = lookupMatch.topicName;
-                    node.course = lookupMatch.course || node.calc_level;
-                    node.coreIdea = lookupMatch.coreIdea;
-                    state.nodeIdByTopicCode.set(lookupMatch.topicCode, node.id);
-                } else {
-                    node.topicCode = node.number_id != null ? String(node.number_id) : node.id;
-                    node.topicName = node.label;
-                    node.course = node.calc_level || 'Course';
-                    console.warn('Topic mapping not found for:', node.label);
-                }
+                node.topicCode = node.number_id != null ? String(node.number_id) : node.id;
+                node.topicName = node.label;
+                node.course = node.calc_level || 'Course';
+                console.warn('Topic mapping not found for:', node.label);
             }
 
             state.nodeById.set(node.id, node);
@@ -257,8 +283,16 @@ document.addEventListener('DOMContentLoaded', () => {
             degreeMap.set(edge.target, (degreeMap.get(edge.target) || 0) + 1);
         });
 
+        // Positions precomputed by layout.py are centred on (0, 0)
+        state.hasPrecomputedLayout = state.nodes.length > 0
+            && state.nodes.every((node) => Number.isFinite(node.x) && Number.isFinite(node.y));
+
         state.nodes.forEach((node) => {
             node.degree = degreeMap.get(node.id) || 0;
+            if (state.hasPrecomputedLayout) {
+                node.x += state.width / 2;
+                node.y += state.height / 2;
+            }
         });
 
         state.maxDegree = d3.max(state.nodes, (node) => node.degree) || 1;
@@ -322,6 +356,8 @@ document.addEventListener('DOMContentLoaded', () => {
             .force('center', d3.forceCenter(state.width / 2, state.height / 2))
             .force('collision', d3.forceCollide().radius((d) => computeNodeRadius(d) + 12))
             .alphaDecay(0.025)
+            // A settled layout only needs a short nudge for the current chart size
+            .alpha(state.hasPrecomputedLayout ? 0.05 : 1)
             .on('tick', () => {
                 state.linkSelection
                     .attr('x1', (d) => d.source.x)
@@ -433,469 +469,6 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // Special mappings for nodes with slight name differences
-    function getSpecialTopicMapping(nodeLabel, numberId) {
-        // Handle number_id 24 which has two different nodes
-        if (numberId === 24) {
-            const labelLower = nodeLabel ? nodeLabel.toLowerCase() : '';
-            if (labelLower.includes('sketching') || labelLower.includes('graphing')) {
-                // Node Z: Sketching/graphing functions -> Der15
-                return {
-                    topicCode: 'Der15',
-                    topicName: 'Graphing with derivatives',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            } else {
-                // Node P: Linear approximation -> Der11
-                return {
-                    topicCode: 'Der11',
-                    topicName: 'Linear approximations',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            }
-        }
-
-        // Handle number_id 19 which has two different nodes
-        if (numberId === 19) {
-            const labelLower = nodeLabel ? nodeLabel.toLowerCase() : '';
-            if (labelLower.includes('chain')) {
-                // The chain rule -> Der7
-                return {
-                    topicCode: 'Der7',
-                    topicName: 'The chain rule',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            } else if (labelLower.includes('related')) {
-                // Related rates -> Der10
-                return {
-                    topicCode: 'Der10',
-                    topicName: 'Related rates',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            }
-        }
-
-        // Handle number_id 26 which has two different nodes
-        if (numberId === 26) {
-            const labelLower = nodeLabel ? nodeLabel.toLowerCase() : '';
-            if (labelLower.includes('shape') || labelLower.includes('concavity')) {
-                // The shape of graphs and concavity -> Der14
-                return {
-                    topicCode: 'Der14',
-                    topicName: 'The shape of graphs and concavity',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            } else if (labelLower.includes('optimization')) {
-                // Optimization -> Der17
-                return {
-                    topicCode: 'Der17',
-                    topicName: 'Optimization',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            }
-        }
-
-        // Handle number_id 22 which has two different nodes
-        if (numberId === 22) {
-            const labelLower = nodeLabel ? nodeLabel.toLowerCase() : '';
-            if (labelLower.includes('mean value')) {
-                // The mean value theorem -> Der13
-                return {
-                    topicCode: 'Der13',
-                    topicName: 'The mean value theorem',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            } else if (labelLower.includes('inverse trigonometric')) {
-                // Integrals involving inverse trigonometric functions -> Int13
-                return {
-                    topicCode: 'Int13',
-                    topicName: 'Inverse trigonometric integrals',
-                    course: 'Calculus I',
-                    coreIdea: 'Integrals'
-                };
-            }
-        }
-
-        // Handle number_id 29 which has two different nodes
-        if (numberId === 29) {
-            const labelLower = nodeLabel ? nodeLabel.toLowerCase() : '';
-            if (labelLower.includes('implicit')) {
-                // Implicit differentiation -> Der8
-                return {
-                    topicCode: 'Der8',
-                    topicName: 'Implicit differentiation',
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            } else if (labelLower.includes('integrals') || labelLower.includes('area')) {
-                // Motivating the need for integrals and approximating the area under curves -> Int2
-                return {
-                    topicCode: 'Int2',
-                    topicName: 'Introduction to integrals and area approximation',
-                    course: 'Calculus I',
-                    coreIdea: 'Integrals'
-                };
-            }
-        }
-
-        // Handle number_id 30 which has two different nodes
-        if (numberId === 30) {
-            const labelLower = nodeLabel ? nodeLabel.toLowerCase() : '';
-            if (labelLower.includes('newton')) {
-                // Newtons method -> Der18
-                return {
-                    topicCode: 'Der18',
-                    topicName: "Newton's method",
-                    course: 'Calculus I',
-                    coreIdea: 'Derivatives'
-                };
-            } else if (labelLower.includes('definite')) {
-                // Definite integrals -> Int3
-                return {
-                    topicCode: 'Int3',
-                    topicName: 'Definite integrals',
-                    course: 'Calculus I',
-                    coreIdea: 'Integrals'
-                };
-            }
-        }
-
-        const specialMappings = {
-            // Calculus I - Limits and Continuity
-            1: { // Motivating the need for calculus & limits -> Lim1
-                topicCode: 'Lim1',
-                topicName: 'Introduction to calculus and limits',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            2: { // Introducing the limit concept -> Lim2
-                topicCode: 'Lim2',
-                topicName: 'The limit concept',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            3: { // Determining limits of functions graphically and numerically -> Lim3
-                topicCode: 'Lim3',
-                topicName: 'Graphical and numerical limits',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            4: { // Determining the limits of functions with limit laws -> Lim4
-                topicCode: 'Lim4',
-                topicName: 'Limit laws',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            6: { // Limits at infinity and infinite limits -> Lim6
-                topicCode: 'Lim6',
-                topicName: 'Limits at infinity and infinite limits',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            7: { // Epsilon-delta definition of the limit -> Lim5
-                topicCode: 'Lim5',
-                topicName: 'Epsilon-delta definition of the limit',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            8: { // Continuity, discontinuities, and the intermediate value theorem -> Lim7
-                topicCode: 'Lim7',
-                topicName: 'Continuity and the intermediate value theorem',
-                course: 'Calculus I',
-                coreIdea: 'Limits and Continuity'
-            },
-            // Calculus I - Derivatives
-            9: { // Motivating the need for the derivative and introducing the derivative concept -> Der1
-                topicCode: 'Der1',
-                topicName: 'Introduction to derivatives',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            10: { // Defining the derivative as a function -> Der2
-                topicCode: 'Der2',
-                topicName: 'Derivatives as functions',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            11: { // Basic differentiation rules -> Der3
-                topicCode: 'Der3',
-                topicName: 'Basic differentiation rules',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            12: { // Product and quotient rules -> Der4
-                topicCode: 'Der4',
-                topicName: 'The product and quotient rules',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            14: { // Trigonometric derivatives -> Der5
-                topicCode: 'Der5',
-                topicName: 'Trigonometric derivatives',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            16: { // Derivatives of logarithmic and exponential functions -> Der6
-                topicCode: 'Der6',
-                topicName: 'Logarithmic and exponential derivatives',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            18: { // Applications of derivatives: rates of change and exponential models -> Der9
-                topicCode: 'Der9',
-                topicName: 'Rates of change and exponential models',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            25: { // Extreme values -> Der12
-                topicCode: 'Der12',
-                topicName: 'Extreme values',
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            27: { // L'Hopitals rule -> Der16
-                topicCode: 'Der16',
-                topicName: "L'Hôpital's rule",
-                course: 'Calculus I',
-                coreIdea: 'Derivatives'
-            },
-            // Calculus I - Integrals
-            20: { // Hyperbolic functions -> Int12 (Note: graph_data.json says Calculus II, but CSV says Calculus I)
-                topicCode: 'Int12',
-                topicName: 'Hyperbolic functions',
-                course: 'Calculus I', // Using CSV data, not graph_data.json calc_level
-                coreIdea: 'Integrals'
-            },
-            21: { // Integration with the substitution rule -> Int7
-                topicCode: 'Int7',
-                topicName: 'Integration by substitution',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            28: { // Antiderivatives -> Int1
-                topicCode: 'Int1',
-                topicName: 'Antiderivatives',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            31: { // The fundamental theorem of calculus -> Int4
-                topicCode: 'Int4',
-                topicName: 'The fundamental theorem of calculus',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            32: { // Indefinite integrals and the net change theorem -> Int5
-                topicCode: 'Int5',
-                topicName: 'Indefinite integrals and the net change theorem',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            33: { // Integrals of exponential and logarithmic functions -> Int6
-                topicCode: 'Int6',
-                topicName: 'Logarithmic and exponential integrals',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            38: { // Using integrals to find the area between two curves -> Int8
-                topicCode: 'Int8',
-                topicName: 'Area between curves',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            40: { // Using integrals to find the volume of solids of revolution -> Int9
-                topicCode: 'Int9',
-                topicName: 'Volume of solids of revolution',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            41: { // Using integrals for physical applications -> Int10
-                topicCode: 'Int10',
-                topicName: 'Physical applications of integrals',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            43: { // Using integrals to find arc length and surface area -> Int11
-                topicCode: 'Int11',
-                topicName: 'Arc length and surface area',
-                course: 'Calculus I',
-                coreIdea: 'Integrals'
-            },
-            // Calculus II - Advanced integration
-            13: { // Integration by parts -> AdvInt1
-                topicCode: 'AdvInt1',
-                topicName: 'Integration by parts',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            48: { // Trigonometric integrals -> AdvInt2
-                topicCode: 'AdvInt2',
-                topicName: 'Trigonometric integrals',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            49: { // Trigonometric substitutions -> AdvInt3
-                topicCode: 'AdvInt3',
-                topicName: 'Trigonometric substitutions',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            50: { // Integration using the method of partial fractions -> AdvInt4
-                topicCode: 'AdvInt4',
-                topicName: 'Integration by partial fractions',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            51: { // General integration strategies and approaches -> AdvInt5
-                topicCode: 'AdvInt5',
-                topicName: 'Integration strategies',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            52: { // Integration using tables, technology, and numerical approaches -> AdvInt6
-                topicCode: 'AdvInt6',
-                topicName: 'Numerical and table-based integration',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            53: { // Improper integrals -> AdvInt7
-                topicCode: 'AdvInt7',
-                topicName: 'Improper integrals',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            54: { // Application to probability -> AdvInt8
-                topicCode: 'AdvInt8',
-                topicName: 'Probability applications',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            55: { // Application to physics -> AdvInt9
-                topicCode: 'AdvInt9',
-                topicName: 'Advanced physical applications',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            56: { // Application to economics -> AdvInt10
-                topicCode: 'AdvInt10',
-                topicName: 'Economics applications',
-                course: 'Calculus II',
-                coreIdea: 'Advanced integration'
-            },
-            // Calculus II - Differential Equations
-            57: { // Introducing the concept of differential equations -> DiffEq1
-                topicCode: 'DiffEq1',
-                topicName: 'Introduction to differential equations',
-                course: 'Calculus II',
-                coreIdea: 'Differential Equations'
-            },
-            58: { // Direction fields and Eulers method -> DiffEq2
-                topicCode: 'DiffEq2',
-                topicName: "Direction fields and Euler's method",
-                course: 'Calculus II',
-                coreIdea: 'Differential Equations'
-            },
-            59: { // Separable differential equations -> DiffEq3
-                topicCode: 'DiffEq3',
-                topicName: 'Separable differential equations',
-                course: 'Calculus II',
-                coreIdea: 'Differential Equations'
-            },
-            60: { // Modeling with differential equations -> DiffEq4
-                topicCode: 'DiffEq4',
-                topicName: 'Modeling with differential equations',
-                course: 'Calculus II',
-                coreIdea: 'Differential Equations'
-            },
-            61: { // Special first-order linear differential equations -> DiffEq5
-                topicCode: 'DiffEq5',
-                topicName: 'Special first-order linear differential equations',
-                course: 'Calculus II',
-                coreIdea: 'Differential Equations'
-            },
-            // Calculus II - Sequences and Series
-            5: { // Sequences -> SeqSer1
-                topicCode: 'SeqSer1',
-                topicName: 'Sequences',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            17: { // Taylor series -> SeqSer7
-                topicCode: 'SeqSer7',
-                topicName: 'Taylor series',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            63: { // Series -> SeqSer2
-                topicCode: 'SeqSer2',
-                topicName: 'Series',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            64: { // Convergence and divergence -> SeqSer3
-                topicCode: 'SeqSer3',
-                topicName: 'Convergence and divergence',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            65: { // Comparison tests -> SeqSer4
-                topicCode: 'SeqSer4',
-                topicName: 'Comparison tests',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            66: { // The ratio and root tests -> SeqSer5
-                topicCode: 'SeqSer5',
-                topicName: 'The ratio and root tests',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            67: { // Alternating series -> SeqSer6
-                topicCode: 'SeqSer6',
-                topicName: 'Alternating series',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            69: { // Power series and functions -> SeqSer8
-                topicCode: 'SeqSer8',
-                topicName: 'Power series and functions',
-                course: 'Calculus II',
-                coreIdea: 'Sequences and Series'
-            },
-            // Calculus II - Parametric Equations and Polar Coordinates
-            15: { // Polar coordinates -> ParamPol2
-                topicCode: 'ParamPol2',
-                topicName: 'Polar coordinates',
-                course: 'Calculus II',
-                coreIdea: 'Parametric Equations and Polar Coordinates'
-            },
-            23: { // Parametric equations -> ParamPol1
-                topicCode: 'ParamPol1',
-                topicName: 'Parametric equations',
-                course: 'Calculus II',
-                coreIdea: 'Parametric Equations and Polar Coordinates'
-            },
-            72: { // Area and arc length in polar coordinates -> ParamPol3
-                topicCode: 'ParamPol3',
-                topicName: 'Area and arc length in polar coordinates',
-                course: 'Calculus II',
-                coreIdea: 'Parametric Equations and Polar Coordinates'
-            },
-            73: { // Conic sections -> ParamPol4
-                topicCode: 'ParamPol4',
-                topicName: 'Conic sections',
-                course: 'Calculus II',
-                coreIdea: 'Parametric Equations and Polar Coordinates'
-            }
-        };
-        return specialMappings[numberId];
-    }
-
     function renderCalculusTree(hierarchy) {
         const container = d3.select('#calculus-tree');
         if (container.empty()) {
@@ -1147,6 +720,133 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // Built by build_search_index.py; fetched the first time the search box is used
+    function loadSearchIndex() {
+        if (!state.searchIndexPromise) {
+            state.searchIndexPromise = d3.json('search_index.json')
+                .then((index) => (index ? { ...index, decoded: new Map() } : null))
+                .catch(() => null);
+        }
+        return state.searchIndexPromise;
+    }
+
+    // Same tokens as tokenize() in build_search_index.py
+    const SEARCH_STOPWORDS = new Set(('a an and are as at be by can for from how in into is it its of on or such ' +
+        'that the their then there these this to used uses using was we when where which while with').split(' '));
+    const SEARCH_MAX_PREFIX_TERMS = 50;
+
+    function tokenizeSearchText(text) {
+        return ((text || '').toLowerCase().replace(/&/g, ' and ').match(/[a-z0-9]+/g) || [])
+            .filter((token) => token.length > 1 && !SEARCH_STOPWORDS.has(token) && !/^[0-9]+$/.test(token));
+    }
+
+    function lowerBound(terms, term) {
+        let low = 0;
+        let high = terms.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (terms[mid] < term) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        return low;
+    }
+
+    // Posting strings are base-36 doc gaps, with ".tf" when a term occurs more than once
+    function getSearchPostings(index, position) {
+        let entries = index.decoded.get(position);
+        if (!entries) {
+            entries = [];
+            let doc = 0;
+            index.postings[position].split(',').forEach((part) => {
+                const [gap, tf] = part.split('.');
+                doc += parseInt(gap, 36);
+                entries.push([doc, tf ? parseInt(tf, 36) : 1]);
+            });
+            index.decoded.set(position, entries);
+        }
+        return entries;
+    }
+
+    // BM25, scored like SearchIndex.search(): the last token also matches as a prefix
+    function searchRationales(index, query, limit = 20) {
+        const tokens = tokenizeSearchText(query);
+        const scores = new Map();
+        const docCount = index.docs.length;
+        const avgLength = index.avgLength || 1;
+
+        tokens.forEach((token, i) => {
+            const positions = [];
+            const start = lowerBound(index.terms, token);
+            if (i === tokens.length - 1) {
+                for (let p = start; p < index.terms.length && positions.length < SEARCH_MAX_PREFIX_TERMS; p += 1) {
+                    if (!index.terms[p].startsWith(token)) break;
+                    positions.push(p);
+                }
+            } else if (index.terms[start] === token) {
+                positions.push(start);
+            }
+
+            const best = new Map();
+            positions.forEach((position) => {
+                const entries = getSearchPostings(index, position);
+                const idf = Math.log(1 + (docCount - entries.length + 0.5) / (entries.length + 0.5));
+                entries.forEach(([doc, tf]) => {
+                    const length = index.docs[doc][3];
+                    const score = idf * tf * (index.k1 + 1) / (tf + index.k1 * (1 - index.b + index.b * length / avgLength));
+                    if (score > (best.get(doc) || 0)) {
+                        best.set(doc, score);
+                    }
+                });
+            });
+            best.forEach((score, doc) => scores.set(doc, (scores.get(doc) || 0) + score));
+        });
+
+        return Array.from(scores.entries())
+            .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+            .slice(0, limit)
+            .map(([doc, score]) => {
+                const [topic, category, csTopic] = index.docs[doc];
+                const [topicCode, topicName] = index.topics[topic];
+                return {
+                    score,
+                    topicCode,
+                    topicName,
+                    category: category >= 0 ? index.categories[category] : null,
+                    csTopic: csTopic >= 0 ? index.csTopics[csTopic] : null
+                };
+            });
+    }
+
+    function renderTextSearchResults(results) {
+        textSearchResults.html('');
+        if (!results) {
+            textSearchResults.append('div').attr('class', 'text-search-empty').text('Search is not available.');
+            return;
+        }
+        if (!results.length) {
+            textSearchResults.append('div').attr('class', 'text-search-empty').text('No matches.');
+            return;
+        }
+
+        results.forEach((result) => {
+            const button = textSearchResults.append('button')
+                .attr('type', 'button')
+                .attr('class', 'text-search-result')
+                .on('click', () => {
+                    const nodeId = state.nodeIdByTopicCode.get(result.topicCode);
+                    const nodeData = nodeId ? state.nodeById.get(nodeId) : null;
+                    if (nodeData) {
+                        selectCalculusNode(nodeData, { fromSidebar: true });
+                    }
+                });
+            button.append('span').text(`${result.topicCode}. ${result.topicName}`);
+            button.append('small').text(result.category ? `${result.category} · ${result.csTopic}` : 'Calculus topic');
+        });
+    }
+
     function toggleCSTopicSelection(category, topicName, buttonSelection) {
         let topicsSet = state.selectedCSTopics.get(category);
         if (!topicsSet) {
@@ -1210,6 +910,18 @@ document.addEventListener('DOMContentLoaded', () => {
 
         state.selectedCSTopics.forEach((topicsSet, category) => {
             topicsSet.forEach((topic) => {
+                if (state.csPostings) {
+                    const posting = getPosting(category, topic);
+                    if (!posting) {
+                        return;
+                    }
+                    posting.nodeIds.forEach((nodeId, i) => {
+                        const level = posting.strengths[i] || 1;
+                        const existing = state.csHighlightLevels.get(nodeId) || 0;
+                        state.csHighlightLevels.set(nodeId, Math.max(existing, level));
+                    });
+                    return;
+                }
                 state.nodes.forEach((node) => {
                     const level = getConnectionLevel(node, category, topic);
                     if (level > 0) {
@@ -1221,7 +933,66 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    function buildPostingsLookup(postings) {
+        // category -> topic -> { nodeIds, nodeIndexes, counts, strengths, weights, positionByNodeId }
+        if (!postings || !postings.postings || !Array.isArray(postings.nodes)) {
+            return null;
+        }
+        const lookup = new Map();
+        Object.entries(postings.postings).forEach(([category, topics]) => {
+            const byTopic = new Map();
+            Object.entries(topics).forEach(([topic, posting]) => {
+                const nodeIds = posting.nodes.map((index) => postings.nodes[index]);
+                byTopic.set(topic, {
+                    nodeIds,
+                    nodeIndexes: posting.nodes,
+                    counts: posting.counts,
+                    strengths: posting.strengths,
+                    weights: posting.weights || posting.counts,
+                    positionByNodeId: new Map(nodeIds.map((nodeId, i) => [nodeId, i]))
+                });
+            });
+            lookup.set(category, byTopic);
+        });
+        return lookup;
+    }
+
+    function buildRelatedLookup(related) {
+        // { topics: topicCode -> [{ topicCode, cosine, shared }], csTopics: category -> topic -> [{ category, topic, cosine, shared }] }
+        if (!related || !Array.isArray(related.csTopics)) {
+            return null;
+        }
+        const topics = new Map();
+        Object.entries(related.topics || {}).forEach(([topicCode, neighbors]) => {
+            topics.set(topicCode, neighbors.map(([code, cosine, shared]) => ({ topicCode: code, cosine, shared })));
+        });
+        const csTopics = new Map();
+        related.csTopics.forEach(([category, topic], index) => {
+            if (!csTopics.has(category)) {
+                csTopics.set(category, new Map());
+            }
+            const neighbors = (related.csNeighbors && related.csNeighbors[index]) || [];
+            csTopics.get(category).set(topic, neighbors.map(([other, cosine, shared]) => ({
+                category: related.csTopics[other][0],
+                topic: related.csTopics[other][1],
+                cosine,
+                shared
+            })));
+        });
+        return { topics, csTopics };
+    }
+
+    function getPosting(category, topic) {
+        const byTopic = state.csPostings.get(category);
+        return byTopic ? byTopic.get(topic) || null : null;
+    }
+
     function getConnectionLevel(node, category, topic) {
+        if (state.csPostings) {
+            const posting = getPosting(category, topic);
+            const position = posting ? posting.positionByNodeId.get(node.id) : undefined;
+            return position === undefined ? 0 : posting.strengths[position] || 1;
+        }
         if (!node.rationales || !node.rationales[category]) {
             return 0;
         }
@@ -1229,7 +1000,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!entry) {
             return 0;
         }
-        return entry.connection_level || entry.connectionLevel || entry.connectionStrength || 1;
+        return entry.strength || entry.connection_level || entry.connectionLevel || entry.connectionStrength || 1;
     }
 
     function updateCourseSummary() {
@@ -1281,7 +1052,43 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
-        let maxConnections = 0;
+        let maxStrength = 0;
+
+        if (state.csPostings) {
+            // Only walk the posting lists of the selected topics
+            const nodeIndexById = new Map();
+            selectedFilters.forEach(({ category, topic }) => {
+                const posting = getPosting(category, topic);
+                if (!posting) {
+                    return;
+                }
+                posting.nodeIds.forEach((nodeId, i) => {
+                    const node = state.nodeById.get(nodeId);
+                    if (!node || node.isCourseVisible === false) {
+                        return;
+                    }
+                    let entry = state.calcConnectionsByNodeId.get(nodeId);
+                    if (!entry) {
+                        entry = { node, totalConnections: 0, totalStrength: 0, filterSummaries: [] };
+                        state.calcConnectionsByNodeId.set(nodeId, entry);
+                        nodeIndexById.set(nodeId, posting.nodeIndexes[i]);
+                    }
+                    entry.totalConnections += posting.counts[i];
+                    entry.totalStrength += posting.weights[i];
+                    entry.filterSummaries.push({ category, topic, count: posting.counts[i] });
+                    maxStrength = Math.max(maxStrength, entry.totalStrength);
+                });
+            });
+
+            // Keep graph node order so ties sort the same way as a full scan
+            const ordered = Array.from(state.calcConnectionsByNodeId.entries())
+                .sort((a, b) => nodeIndexById.get(a[0]) - nodeIndexById.get(b[0]));
+            state.calcConnectionsByNodeId = new Map(ordered);
+
+            updateCalcListFiltersUI(maxStrength);
+            renderCalcTopicList();
+            return;
+        }
 
         state.nodes.forEach((node) => {
             // 先根据 Calculus Courses 过滤：只对当前可见课程的节点计算连接
@@ -1289,7 +1096,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
             const rationales = node.rationales || {};
+            const strengthByTopic = node.strength_by_cs_topic || {};
             let totalConnections = 0;
+            let totalStrength = 0;
             const filterSummaries = [];
 
             selectedFilters.forEach(({ category, topic }) => {
@@ -1298,6 +1107,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 );
                 if (items.length > 0) {
                     totalConnections += items.length;
+                    // Precomputed by the build; older data falls back to counting rows
+                    totalStrength += (strengthByTopic[category] || {})[topic] || items.length;
                     filterSummaries.push({
                         category,
                         topic,
@@ -1310,15 +1121,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 state.calcConnectionsByNodeId.set(node.id, {
                     node,
                     totalConnections,
+                    totalStrength,
                     filterSummaries
                 });
-                if (totalConnections > maxConnections) {
-                    maxConnections = totalConnections;
+                if (totalStrength > maxStrength) {
+                    maxStrength = totalStrength;
                 }
             }
         });
 
-        updateCalcListFiltersUI(maxConnections);
+        updateCalcListFiltersUI(maxStrength);
         renderCalcTopicList();
     }
 
@@ -1365,15 +1177,20 @@ document.addEventListener('DOMContentLoaded', () => {
             1
         );
 
-        // Clamp threshold
+        const maxStrength = connections.reduce(
+            (max, entry) => Math.max(max, entry.totalStrength),
+            1
+        );
+
+        // Clamp threshold (weighted by Strength)
         const clampedThreshold = Math.max(
             1,
-            Math.min(state.connectionThreshold || 1, maxConnections)
+            Math.min(state.connectionThreshold || 1, maxStrength)
         );
         state.connectionThreshold = clampedThreshold;
 
         const filtered = connections.filter(
-            (entry) => entry.totalConnections >= clampedThreshold
+            (entry) => entry.totalStrength >= clampedThreshold
         );
 
         let sorted = filtered.slice();
@@ -1385,6 +1202,8 @@ document.addEventListener('DOMContentLoaded', () => {
             );
         } else if (state.calcSortMode === 'connections') {
             sorted.sort((a, b) => b.totalConnections - a.totalConnections);
+        } else if (state.calcSortMode === 'strength') {
+            sorted.sort((a, b) => b.totalStrength - a.totalStrength);
         } else {
             // Default: course -> core idea -> topic code (with numeric sorting)
             // Helper function to extract prefix and number from topic code (e.g., "Lim1" -> ["Lim", 1])
@@ -1517,12 +1336,12 @@ document.addEventListener('DOMContentLoaded', () => {
         return 'other';
     }
 
-    function updateCalcListFiltersUI(maxConnections) {
+    function updateCalcListFiltersUI(maxStrength) {
         if (connectionThresholdInput.empty() || connectionThresholdValue.empty()) {
             return;
         }
 
-        if (maxConnections <= 1) {
+        if (maxStrength <= 1) {
             state.connectionThreshold = 1;
             connectionThresholdInput
                 .property('disabled', true)
@@ -1531,7 +1350,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 .property('value', 1);
             connectionThresholdValue.text('1');
         } else {
-            const upper = Math.max(1, maxConnections);
+            const upper = Math.max(1, maxStrength);
             connectionThresholdInput
                 .property('disabled', false)
                 .attr('min', 1)
@@ -1707,12 +1526,55 @@ document.addEventListener('DOMContentLoaded', () => {
         return node ? node.isCourseVisible : true;
     }
 
+    function getRationaleShardUrl(nodeData) {
+        const shards = state.rationaleShards;
+        if (!shards || !nodeData) {
+            return null;
+        }
+        const fileIndex = shards.nodes[nodeData.id];
+        return fileIndex === undefined ? null : `${shards.directory}/${shards.files[fileIndex]}`;
+    }
+
+    function loadRationaleShard(url) {
+        if (!state.loadedShards.has(url)) {
+            const request = d3.json(url).then((shard) => {
+                Object.assign(state.rationaleTexts, (shard && shard.texts) || {});
+                state.readyShards.add(url);
+            }).catch((error) => {
+                // Allow a retry on the next click
+                state.loadedShards.delete(url);
+                throw error;
+            });
+            state.loadedShards.set(url, request);
+        }
+        return state.loadedShards.get(url);
+    }
+
     function showRationale(nodeData) {
         if (!nodeData) {
             rationaleDisplay.classed('hidden', true);
             emptyState.classed('hidden', false);
             return;
         }
+
+        const shardUrl = getRationaleShardUrl(nodeData);
+        if (shardUrl && !state.readyShards.has(shardUrl)) {
+            rationaleTitle.text(`${nodeData.topicCode || nodeData.number_id || ''} ${nodeData.topicName || nodeData.label}`.trim());
+            rationaleContent.html('').append('p').attr('class', 'no-rationale-message').text('Loading rationales…');
+            rationaleDisplay.classed('hidden', false);
+            emptyState.classed('hidden', true);
+            loadRationaleShard(shardUrl).then(() => {
+                if (state.selectedNodeId === nodeData.id) {
+                    showRationale(nodeData);
+                }
+            }).catch((error) => {
+                console.error('Error loading rationales:', error);
+                rationaleContent.html('').append('p')
+                    .attr('class', 'no-rationale-message')
+                    .text('Rationales could not be loaded. Click the topic again to retry.');
+            });
+            return;
+        }
         
         rationaleTitle.text(`${nodeData.topicCode || nodeData.number_id || ''} ${nodeData.topicName || nodeData.label}`.trim());
         rationaleLevel.text(`${nodeData.course || nodeData.calc_level || ''}${nodeData.coreIdea ? ` · ${nodeData.coreIdea}` : ''}`);
@@ -1749,6 +1611,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         updateCalcPillRationaleState(nodeData.id, hasMatchingRationales, selectedFilters.length > 0);
+        appendRelatedTopics(nodeData, selectedFilters);
 
         // Render LaTeX after all content is added
         if (window.renderMathInElement && rationaleContent.node()) {
@@ -1789,11 +1652,62 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         items.forEach((item) => {
             const block = rationaleContent.append('div').attr('class', 'rationale-item');
-            const rationaleText = item.rationale || '';
+            const rationaleText = item.rationale || state.rationaleTexts[item.rationale_id] || '';
             block.html(`<strong>${item.cs_topic || ''}:</strong> ${rationaleText}`);
         });
     }
 
+    const RELATED_SHOWN = 5;
+
+    function appendRelatedTopics(nodeData, selectedFilters) {
+        if (!state.related) {
+            return;
+        }
+        const relatedTopics = (state.related.topics.get(nodeData.topicCode) || [])
+            .filter((entry) => state.nodeIdByTopicCode.has(entry.topicCode))
+            .slice(0, RELATED_SHOWN);
+        // Co-occurring CS topics for the selected filters, or for the node's strongest CS topic
+        const sources = selectedFilters.length > 0
+            ? selectedFilters
+            : (nodeData.top_cs_topics || []).slice(0, 1).map(([category, topic]) => ({ category, topic }));
+        const csGroups = sources
+            .map(({ category, topic }) => ({
+                category,
+                topic,
+                neighbors: (state.related.csTopics.get(category)?.get(topic) || []).slice(0, RELATED_SHOWN)
+            }))
+            .filter((group) => group.neighbors.length > 0);
+        if (relatedTopics.length === 0 && csGroups.length === 0) {
+            return;
+        }
+
+        rationaleContent.append('h5').text('Related');
+        const section = rationaleContent.append('div').attr('class', 'related-topics');
+        if (relatedTopics.length > 0) {
+            section.append('div').attr('class', 'related-label').text('Calculus topics supporting the same CS topics');
+            relatedTopics.forEach((entry) => {
+                const topicNode = state.nodeById.get(state.nodeIdByTopicCode.get(entry.topicCode));
+                const button = section.append('button')
+                    .attr('type', 'button')
+                    .attr('class', 'related-topic')
+                    .attr('title', `Cosine similarity ${entry.cosine.toFixed(2)}`)
+                    .on('click', () => selectCalculusNode(topicNode, { fromSidebar: true }));
+                button.append('span').text(`${entry.topicCode}. ${topicNode.topicName || topicNode.label}`);
+                button.append('small').text(`${entry.shared} shared CS topic${entry.shared === 1 ? '' : 's'}`);
+            });
+        }
+        csGroups.forEach(({ category, topic, neighbors }) => {
+            section.append('div').attr('class', 'related-label').text(`Often alongside ${topic} (${category})`);
+            const list = section.append('div').attr('class', 'related-cs-topics');
+            neighbors.forEach((entry) => {
+                list.append('span')
+                    .attr('class', 'related-cs-topic')
+                    .attr('title', `${entry.category} · ${entry.shared} shared calculus topic${entry.shared === 1 ? '' : 's'}`)
+                    .text(entry.topic);
+            });
+        });
+    }
+
     function getSelectedCSTopicFilters() {
         const filters = [];
         state.selectedCSTopics.forEach((topicsSet, category) => {
@@ -0,0 +1,94 @@
+"""
+Write graph_data.json together with every artifact derived from it.
+
+The data scripts call write_artifacts() instead of dumping the graph
+themselves, so the derived files (postings index, prerequisite reachability,
+search index, related topics, skeleton and rationale shards, and the
+binary graph_data.bin) never fall out of step with graph_data.json. A
+graph whose prerequisite edges contain a cycle is rejected before any file
+is written. Every output is built in memory first and each file is
+written to a temporary name and renamed into place, so a graph a builder
+can't handle leaves the previous set of files as it was.
+
+Each derived file is only rewritten when its inputs changed:
+.build_cache/artifacts.json records the input hash (postings_key(),
+reachability_key(), search_index_key(), related_key()) every file was
+last built from. An incremental build also passes the ids of the nodes it
+patched, so only the rationale shards holding them are rewritten.
+
+Node positions come from layout.py and related_topics.json is rebuilt when
+NumPy is installed; without it the graph keeps whatever x/y it already has
+and related_topics.json is left as it is. The layout only runs again when
+the node ids or edges changed (layout.apply_layout caches positions).
+"""
+
+import json
+import os
+from pathlib import Path
+
+from build_cache import file_stamp, is_current, load_stamps, save_stamps
+from build_postings import POSTINGS_FILE, build_postings, postings_key
+from build_reachability import REACHABILITY_FILE, build_reachability, check_acyclic, reachability_key
+from build_search_index import SEARCH_INDEX_FILE, build_search_index, search_index_key
+from build_shards import build_shards, write_shards
+from graph_binary import build_binary_graph
+from graph_io import write_graph
+from ingest import BASE_PATH, GRAPH_DATA_FILE
+
+try:
+    from layout import apply_layout
+except ImportError:  # optional: NumPy is only needed to refresh the layout
+    apply_layout = None
+
+try:
+    from build_related import RELATED_FILE, build_related, related_key
+except ImportError:  # optional: related topics need NumPy too
+    build_related = None
+
+
+def _replace_file(filepath, data):
+    tmp = filepath.with_name(filepath.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filepath)
+
+
+def write_artifacts(graph, base_path=None, graph_file=None, changed_nodes=None):
+    """Write graph_data.json (or graph_file) and the derived artifacts whose inputs changed
+
+    changed_nodes is the set of node ids an incremental build patched; None
+    means any node may have changed.
+    """
+    base_path = Path(base_path or BASE_PATH)
+    graph_file = Path(graph_file or base_path / GRAPH_DATA_FILE)
+    # Reachability needs a DAG; fail before graph_data.json is touched
+    check_acyclic(graph)
+    if apply_layout is not None:
+        apply_layout(graph, base_path)
+
+    # Build everything before writing anything
+    binary = build_binary_graph(graph)
+    stamps = load_stamps(base_path)
+    derived = [
+        (POSTINGS_FILE, postings_key, build_postings),
+        (REACHABILITY_FILE, reachability_key, build_reachability),
+        (SEARCH_INDEX_FILE, search_index_key, build_search_index),
+    ]
+    if build_related is not None:
+        derived.append((RELATED_FILE, related_key, build_related))
+    stale = {}
+    for name, input_key, build in derived:
+        key = input_key(graph)
+        if not is_current(stamps, name, base_path / name, key):
+            payload = json.dumps(build(graph), ensure_ascii=False, separators=(',', ':'))
+            stale[name] = (key, payload.encode('utf-8'))
+    shards = build_shards(graph)
+
+    write_graph(graph, graph_file)
+    _replace_file(graph_file.with_suffix('.bin'), binary)
+    for name, (key, data) in stale.items():
+        _replace_file(base_path / name, data)
+        stamps[name] = file_stamp(base_path / name, key)
+    write_shards(graph, base_path, changed_nodes, stamps, shards)
+    save_stamps(stamps, base_path)
+    return graph_file
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmark every data pipeline stage on a synthetic dataset.
+
+Generates a dataset with synthetic_data.py (or reuses --data-dir), then times
+each stage the data scripts run:
+
+    parse       parse_calculus_csv + parse_category_files (also normalizes each row's calculus topic)
+    normalize   normalize_text over every topic name, CSV row and node label (cold cache)
+    index       building the ingest.Dataset indexes
+    match       match_calculus_topic for every node label
+    merge       convert_data.update_graph_data
+    dedupe      fix_duplicate_rationales.remove_stale_rationales
+    json_dump   graph_io.write_graph
+    verify      verify_sync.check_sync
+
+After each stage the process's peak RSS so far is recorded as
+process_peak_rss_mb. It is ru_maxrss, the high-water mark of the whole
+process, so it only shows which stage first pushed memory that high, not
+what each stage needs on its own; --tracemalloc adds each stage's own peak
+of Python allocations. Results can be written as JSON. A later run with
+--compare fails (exit status 1) when a stage gets slower or the process
+peak grows by more than --tolerance.
+
+Usage:
+    python3 benchmark.py --scale small --output bench_small.json
+    python3 benchmark.py --scale small --compare bench_small.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from convert_data import match_calculus_topic, update_graph_data
+from fix_duplicate_rationales import build_correct_connections, remove_stale_rationales
+from graph_io import load_graph, write_graph
+from ingest import (
+    CALCULUS_LIST_FILE, CATEGORY_MANIFEST_FILE, GRAPH_DATA_FILE, Dataset, discover_category_files,
+    normalize_text, parse_calculus_csv, parse_category_files,
+)
+from synthetic_data import SCALES, write_synthetic_dataset
+from topic_matcher import TopicMatcher
+from verify_sync import check_sync
+
+RESULTS_VERSION = 2
+STAGES = ['parse', 'normalize', 'index', 'match', 'merge', 'dedupe', 'json_dump', 'verify']
+# Stages faster than this are too noisy to fail a comparison on
+MIN_COMPARED_SECONDS = 0.02
+
+
+def process_peak_rss_mb():
+    """Peak resident set size of the whole process so far, in MiB (not per stage)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_stages(data_dir, trace_memory=False):
+    """Run every stage once over data_dir; returns {stage: {seconds, process_peak_rss_mb, detail}}"""
+    data_dir = Path(data_dir)
+    results = {}
+    state = {}
+
+    def parse():
+        state['topics'] = parse_calculus_csv(data_dir / CALCULUS_LIST_FILE)
+        state['rows_by_category'], state['calc_keys'] = parse_category_files(discover_category_files(data_dir))
+        state['graph'] = load_graph(data_dir / GRAPH_DATA_FILE)
+        return f"{sum(len(rows) for rows in state['rows_by_category'].values())} rows"
+
+    def normalize():
+        normalize_text.cache_clear()
+        count = 0
+        for topic_info in state['topics'].values():
+            normalize_text(topic_info['topicName'])
+            count += 1
+        for rows in state['rows_by_category'].values():
+            for row in rows:
+                normalize_text(row['calc_topic'])
+                normalize_text(row['cs_topic'])
+            count += 2 * len(rows)
+        for node in state['graph']['nodes']:
+            normalize_text(node.get('label', ''))
+        count += len(state['graph']['nodes'])
+        info = normalize_text.cache_info()
+        return f"{count} calls, {info.hits} cache hits"
+
+    def index():
+        state['dataset'] = Dataset(state['topics'], state['rows_by_category'], state['calc_keys'])
+        return f"{len(state['dataset'].by_topic_code)} topic codes"
+
+    def match():
+        matcher = TopicMatcher(state['topics'])
+        matched = sum(
+            1 for node in state['graph']['nodes']
+            if match_calculus_topic(node.get('label', ''), matcher, state['topics'])
+        )
+        return f"{matched}/{len(state['graph']['nodes'])} labels matched"
+
+    def merge():
+        update_graph_data(state['graph'], state['dataset'])
+        return f"{len(state['graph']['nodes'])} nodes"
+
+    def dedupe():
+        fixed = remove_stale_rationales(state['graph'], build_correct_connections(state['dataset']), verbose=False)
+        return f"{fixed} nodes fixed"
+
+    def json_dump():
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / GRAPH_DATA_FILE
+            write_graph(state['graph'], output)
+            return f"{output.stat().st_size / (1024 * 1024):.1f} MiB"
+
+    def verify():
+        result = check_sync(state['graph'], state['dataset'])
+        return f"{result['found']} found, {len(result['missing'])} missing, {len(result['extra'])} extra"
+
+    stages = dict(zip(STAGES, [parse, normalize, index, match, merge, dedupe, json_dump, verify]))
+    with open(os.devnull, 'w') as devnull:
+        for name in STAGES:
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            # The stage functions print per-node progress; keep it out of the report
+            with contextlib.redirect_stdout(devnull):
+                detail = stages[name]()
+            seconds = time.perf_counter() - start
+            results[name] = {'seconds': seconds, 'process_peak_rss_mb': round(process_peak_rss_mb(), 1),
+                             'detail': detail}
+            if trace_memory:
+                results[name]['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+                tracemalloc.stop()
+    return results
+
+
+def run_benchmark(data_dir, repeat=1, trace_memory=False):
+    """Best time per stage over repeat runs, plus the last run's memory figures"""
+    best = None
+    for _ in range(repeat):
+        results = run_stages(data_dir, trace_memory)
+        if best is None:
+            best = results
+        else:
+            for name, stage in results.items():
+                stage['seconds'] = min(stage['seconds'], best[name]['seconds'])
+            best = results
+    for stage in best.values():
+        stage['seconds'] = round(stage['seconds'], 4)
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against a baseline, as human-readable strings"""
+    regressions = []
+    for name, stage in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+        limit = before['seconds'] * (1 + tolerance)
+        if stage['seconds'] > limit and stage['seconds'] >= MIN_COMPARED_SECONDS:
+            regressions.append(f"{name}: {stage['seconds']:.3f}s vs baseline {before['seconds']:.3f}s")
+    if results['process_peak_rss_mb'] > baseline['process_peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"process peak RSS: {results['process_peak_rss_mb']:.1f} MiB "
+                           f"vs baseline {baseline['process_peak_rss_mb']:.1f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the data pipeline on synthetic data')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='today')
+    parser.add_argument('--topics', type=int, help='override the number of calculus topics')
+    parser.add_argument('--rows', type=int, help='override the number of rationale rows')
+    parser.add_argument('--categories', type=int, help='override the number of categories')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help='generate into (or reuse) this directory instead of a temporary one')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per stage; the fastest is kept')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='also record each stage\'s peak Python allocations (slows the run)')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    parser.add_argument('--compare', metavar='BASELINE', help='fail when slower than this results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown or memory growth against the baseline (default: 0.25)')
+    args = parser.parse_args()
+
+    topics, rows, categories = SCALES[args.scale]
+    scale = {
+        'topics': args.topics or topics,
+        'rows': args.rows or rows,
+        'categories': args.categories or categories,
+        'seed': args.seed,
+    }
+
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        if not (Path(data_dir) / CATEGORY_MANIFEST_FILE).exists():
+            start = time.perf_counter()
+            write_synthetic_dataset(data_dir, **scale)
+            print(f"Generated {scale['topics']} topics and {scale['rows']} rows "
+                  f"in {time.perf_counter() - start:.1f}s")
+        stages = run_benchmark(data_dir, args.repeat, args.tracemalloc)
+
+    results = {
+        'version': RESULTS_VERSION,
+        'scale': scale,
+        'python': platform.python_version(),
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 4),
+        'process_peak_rss_mb': max(stage['process_peak_rss_mb'] for stage in stages.values()),
+    }
+
+    # The memory column is the process-wide peak so far, not each stage's own use
+    print(f"\n{'stage':<10} {'seconds':>9} {'proc peak':>10}  detail")
+    for name, stage in stages.items():
+        print(f"{name:<10} {stage['seconds']:>9.3f} {stage['process_peak_rss_mb']:>6.1f} MiB  {stage['detail']}")
+    print(f"{'total':<10} {results['total_seconds']:>9.3f} {results['process_peak_rss_mb']:>6.1f} MiB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != RESULTS_VERSION:
+            print(f"\nBaseline {args.compare} is results version {baseline.get('version')}, "
+                  f"expected {RESULTS_VERSION}; write a new one with --output")
+            sys.exit(2)
+        if baseline.get('scale') != scale:
+            print(f"\nBaseline scale {baseline.get('scale')} does not match {scale}")
+            sys.exit(2)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\n✓ Within {args.tolerance:.0%} of {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""
+Incremental rebuild support for graph_data.json.
+
+Keeps a manifest of per-file and per-row content hashes in .build_cache/
+and a pickle of every parsed CSV keyed by its content hash. On the next
+build, unchanged CSVs come straight from the cache, and only the
+(topic code, category) groups whose rows actually changed are patched into
+the graph. Editing one row of ML-Calc-Table 1.csv therefore touches only the
+nodes carrying that topic code.
+
+categories.json and topic_code_map.json are hashed too. They decide the
+category order and every node's topic code, so when either changes the
+graph is never patched and the scripts resolve every node again.
+"""
+
+import hashlib
+import json
+import pickle
+import sys
+from pathlib import Path
+
+from ingest import (
+    BASE_PATH,
+    CATEGORY_MANIFEST_FILE,
+    Dataset,
+    parse_calculus_csv,
+    parse_rationales_csv,
+    refresh_node_summary,
+    source_files,
+)
+from topic_codes import TOPIC_CODE_MAP_FILE
+
+CACHE_DIR = '.build_cache'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 3
+STAMPS_FILE = 'artifacts.json'
+# Files that change how rows and nodes are resolved rather than what they contain
+CONFIG_FILES = (CATEGORY_MANIFEST_FILE, TOPIC_CODE_MAP_FILE)
+
+_ROW_FIELDS = ('calc_topic', 'cs_topic', 'rationale', 'strength')
+
+
+def _digest(parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\x1f')
+    return h.hexdigest()
+
+
+def row_hash(row):
+    """Content hash of one rationale row"""
+    return _digest(str(row.get(field, '')) for field in _ROW_FIELDS)
+
+
+def file_hash(path, previous=None):
+    """sha256 of a file, reusing the previous manifest entry when size and mtime match"""
+    stat = path.stat()
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous['sha256'], stat
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest(), stat
+
+
+def load_manifest(base_path=None):
+    path = Path(base_path or BASE_PATH) / CACHE_DIR / MANIFEST_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest, base_path=None):
+    cache_dir = Path(base_path or BASE_PATH) / CACHE_DIR
+    cache_dir.mkdir(exist_ok=True)
+    tmp_path = cache_dir / (MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    tmp_path.replace(cache_dir / MANIFEST_FILE)
+
+
+def load_stamps(base_path=None):
+    """artifact name -> {'key', 'size', 'mtime_ns'} of its last build"""
+    try:
+        with open(Path(base_path or BASE_PATH) / CACHE_DIR / STAMPS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_stamps(stamps, base_path=None):
+    cache_dir = Path(base_path or BASE_PATH) / CACHE_DIR
+    cache_dir.mkdir(exist_ok=True)
+    tmp_path = cache_dir / (STAMPS_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(stamps, f, ensure_ascii=False)
+    tmp_path.replace(cache_dir / STAMPS_FILE)
+
+
+def file_stamp(output_file, key):
+    """Stamp recording that output_file, as it is on disk now, was built from key"""
+    stat = Path(output_file).stat()
+    return {'key': key, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def is_current(stamps, name, output_file, key):
+    """True when output_file was built from key and has not been touched since"""
+    stamp = stamps.get(name)
+    if not stamp or stamp.get('key') != key:
+        return False
+    try:
+        stat = Path(output_file).stat()
+    except OSError:
+        return False
+    return stamp.get('size') == stat.st_size and stamp.get('mtime_ns') == stat.st_mtime_ns
+
+
+def _cache_name(sha):
+    # The manifest version is part of the name so a parser change never serves stale pickles
+    return f'{sha}.v{MANIFEST_VERSION}.pickle'
+
+
+def prune_cache(base_path, keep_hashes):
+    """Delete cached parses for file contents (or parser versions) that no longer exist"""
+    keep_names = {_cache_name(sha) for sha in keep_hashes}
+    for cache_file in (Path(base_path) / CACHE_DIR).glob('*.pickle'):
+        if cache_file.name not in keep_names:
+            cache_file.unlink()
+
+
+def _cached_parse(cache_dir, sha, parse):
+    """Return parse() output, served from the pickle cache when the content hash is known"""
+    cache_file = cache_dir / _cache_name(sha)
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f), True
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+    result = parse()
+    with open(cache_file, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return result, False
+
+
+def load_dataset_cached(base_path=None, manifest=None):
+    """Build a Dataset, reusing cached parses for CSVs whose content hash is unchanged
+
+    Returns (dataset, file_entries, cache_hits), where file_entries is the
+    per-file part of the next manifest.
+    """
+    base_path = Path(base_path or BASE_PATH)
+    cache_dir = base_path / CACHE_DIR
+    cache_dir.mkdir(exist_ok=True)
+    previous_files = (manifest or {}).get('files', {})
+
+    calc_list_file, category_files = source_files(base_path)
+    file_entries = {}
+    cache_hits = 0
+
+    sha, stat = file_hash(calc_list_file, previous_files.get(calc_list_file.name))
+    calculus_topics, hit = _cached_parse(cache_dir, sha, lambda: parse_calculus_csv(calc_list_file))
+    cache_hits += hit
+    file_entries[calc_list_file.name] = {'sha256': sha, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    rows_by_category = {}
+    for path, category in category_files:
+        previous = previous_files.get(path.name)
+        sha, stat = file_hash(path, previous)
+        rows, hit = _cached_parse(cache_dir, sha, lambda: parse_rationales_csv(path, category))
+        cache_hits += hit
+        # Parses are cached by content, so a category renamed in categories.json
+        # comes back under its old name
+        if hit and rows and rows[0]['category'] != category:
+            for row in rows:
+                row['category'] = sys.intern(category)
+        rows_by_category[sys.intern(category)] = rows
+        if previous and previous.get('sha256') == sha:
+            row_hashes = previous['rows']
+        else:
+            row_hashes = [row_hash(row) for row in rows]
+        file_entries[path.name] = {
+            'sha256': sha,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'category': category,
+            'rows': row_hashes,
+        }
+
+    return Dataset(calculus_topics, rows_by_category), file_entries, cache_hits
+
+
+def config_entries(base_path=None, manifest=None):
+    """name -> {'sha256', 'size', 'mtime_ns'} for each of CONFIG_FILES that exists"""
+    base_path = Path(base_path or BASE_PATH)
+    previous = (manifest or {}).get('config', {})
+    entries = {}
+    for name in CONFIG_FILES:
+        path = base_path / name
+        if path.exists():
+            sha, stat = file_hash(path, previous.get(name))
+            entries[name] = {'sha256': sha, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    return entries
+
+
+def group_digests(dataset, file_entries):
+    """category -> {topic_code -> digest of that group's rows, in file order}"""
+    row_hashes_by_category = {
+        entry['category']: entry['rows']
+        for entry in file_entries.values()
+        if 'category' in entry
+    }
+    groups = {}
+    for category, rows in dataset.rows_by_category.items():
+        row_hashes = row_hashes_by_category[category]
+        members = {}
+        for row, digest in zip(rows, row_hashes):
+            if row['topic_code']:
+                members.setdefault(row['topic_code'], []).append(digest)
+        groups[category] = {code: _digest(hashes) for code, hashes in members.items()}
+    return groups
+
+
+def topic_digests(dataset):
+    """topic_code -> digest of its Calculus topic list entry"""
+    return {
+        code: _digest((info['topicName'], info['course'], info['coreIdea']))
+        for code, info in dataset.calculus_topics.items()
+    }
+
+
+def diff_manifests(previous, groups, topics):
+    """Work out what changed since the previous manifest
+
+    Returns (changed_groups, changed_topics): a set of (topic_code, category)
+    pairs whose rationale rows differ, and a set of topic codes whose
+    Calculus topic list entry differs.
+    """
+    previous_groups = previous.get('groups', {})
+    changed_groups = set()
+    for category in set(groups) | set(previous_groups):
+        old = previous_groups.get(category, {})
+        new = groups.get(category, {})
+        for code in set(old) | set(new):
+            if old.get(code) != new.get(code):
+                changed_groups.add((code, category))
+
+    previous_topics = previous.get('topics', {})
+    changed_topics = {
+        code for code in set(topics) | set(previous_topics)
+        if topics.get(code) != previous_topics.get(code)
+    }
+    return changed_groups, changed_topics
+
+
+def patch_graph(graph, dataset, changed_groups, changed_topics):
+    """Apply only the changed groups and topic entries to graph nodes in place
+
+    Returns the set of ids of the nodes that were touched.
+    """
+    changed_by_code = {}
+    for code, category in changed_groups:
+        changed_by_code.setdefault(code, set()).add(category)
+
+    patched = set()
+    for node in graph['nodes']:
+        topic_code = node.get('topicCode')
+        if topic_code not in changed_by_code and topic_code not in changed_topics:
+            continue
+
+        topic_info = dataset.calculus_topics.get(topic_code)
+        if topic_code in changed_topics and topic_info:
+            node['topicName'] = topic_info['topicName']
+            node['course'] = topic_info['course']
+            node['coreIdea'] = topic_info['coreIdea']
+
+        categories = changed_by_code.get(topic_code)
+        if categories:
+            fresh = dataset.by_topic_code.get(topic_code, {})
+            rationales = node.setdefault('rationales', {})
+            for category in categories:
+                if category in fresh:
+                    rationales[category] = list(fresh[category])
+                else:
+                    rationales.pop(category, None)
+            # Keep category order the same as a full rebuild would produce
+            order = {category: i for i, category in enumerate(dataset.categories)}
+            node['rationales'] = dict(sorted(
+                rationales.items(),
+                key=lambda item: order.get(item[0], len(order))
+            ))
+            refresh_node_summary(node)
+        patched.add(node['id'])
+    return patched
+
+
+class IncrementalBuild:
+    """One incremental build: load with cache, diff against the last manifest, record the new one
+
+    Usage:
+        build = IncrementalBuild(base_path)
+        changed_nodes = None
+        if build.can_patch(graph_path):
+            changed_nodes = build.patch(graph)
+        else:
+            ...full rebuild using build.dataset...
+        write_artifacts(graph, base_path, graph_path, changed_nodes)
+        build.commit(graph_path)
+    """
+
+    def __init__(self, base_path=None):
+        self.base_path = Path(base_path or BASE_PATH)
+        self.previous = load_manifest(self.base_path)
+        self.dataset, self.file_entries, self.cache_hits = load_dataset_cached(self.base_path, self.previous)
+        self.config = config_entries(self.base_path, self.previous)
+        self.groups = group_digests(self.dataset, self.file_entries)
+        self.topics = topic_digests(self.dataset)
+        if self.previous:
+            self.changed_groups, self.changed_topics = diff_manifests(self.previous, self.groups, self.topics)
+        else:
+            self.changed_groups, self.changed_topics = None, None
+
+    @property
+    def config_changed(self):
+        """True when categories.json or topic_code_map.json differ from the last build"""
+        previous = (self.previous or {}).get('config', {})
+        return ({name: entry['sha256'] for name, entry in previous.items()}
+                != {name: entry['sha256'] for name, entry in self.config.items()})
+
+    def can_patch(self, graph_path):
+        """True when the last build's manifest still describes graph_path as it is on disk
+
+        Also False when the config files changed, since then any node may
+        resolve to a different topic code or category order.
+        """
+        if not self.previous or self.config_changed or not Path(graph_path).exists():
+            return False
+        graph_entry = self.previous.get('graph')
+        if not graph_entry:
+            return False
+        sha, _ = file_hash(Path(graph_path), graph_entry)
+        return sha == graph_entry['sha256']
+
+    @property
+    def has_changes(self):
+        return bool(self.changed_groups or self.changed_topics)
+
+    def patch(self, graph):
+        return patch_graph(graph, self.dataset, self.changed_groups, self.changed_topics)
+
+    def commit(self, graph_path):
+        """Record the manifest for the graph file that was just written"""
+        graph_path = Path(graph_path)
+        sha, stat = file_hash(graph_path)
+        prune_cache(self.base_path, {entry['sha256'] for entry in self.file_entries.values()})
+        save_manifest({
+            'version': MANIFEST_VERSION,
+            'files': self.file_entries,
+            'config': self.config,
+            'groups': self.groups,
+            'topics': self.topics,
+            'graph': {'sha256': sha, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+        }, self.base_path)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Build cs_topic_postings.json, an inverted index from (category, CS topic)
+to the graph nodes whose rationales reference it.
+
+app.js loads this next to graph_data.json so CS-topic filtering only walks
+the posting lists of the selected topics instead of every node's rationales.
+
+Format:
+    {
+      "version": 1,
+      "nodes": ["A", "B", ...],            # node ids; postings refer to these by index
+      "postings": {
+        "<category>": {
+          "<cs topic>": {
+            "nodes": [0, 4, 9],            # ascending node indexes
+            "counts": [1, 2, 1],           # rationale rows per node
+            "strengths": [2, 2, 1],        # strongest row per node (1 when unknown)
+            "weights": [2, 3, 1],          # summed Strength of the node's rows
+            "topicCodes": ["Der1", "Lim1"] # sorted distinct topic codes
+          }
+        }
+      }
+    }
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE
+
+POSTINGS_FILE = 'cs_topic_postings.json'
+POSTINGS_VERSION = 1
+
+
+def postings_key(graph):
+    """Hash of everything build_postings() reads: node ids, topic codes, CS topics and strengths"""
+    h = hashlib.sha1(str(POSTINGS_VERSION).encode('utf-8'))
+    for node in graph['nodes']:
+        h.update(f"\x1d{node['id']}\x1f{node.get('topicCode') or ''}".encode('utf-8'))
+        for category, items in (node.get('rationales') or {}).items():
+            h.update(f'\x1c{category}'.encode('utf-8'))
+            for item in items:
+                h.update(f"\x1e{item.get('cs_topic') or ''}\x1f{item.get('strength') or ''}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def build_postings(graph):
+    """Build the postings structure for a loaded graph"""
+    node_ids = [node['id'] for node in graph['nodes']]
+    postings = {}
+
+    for node_index, node in enumerate(graph['nodes']):
+        topic_code = node.get('topicCode')
+        for category, items in (node.get('rationales') or {}).items():
+            for item in items:
+                cs_topic = (item.get('cs_topic') or '').strip()
+                if not cs_topic:
+                    continue
+                posting = postings.setdefault(category, {}).setdefault(cs_topic, {
+                    'nodes': [], 'counts': [], 'strengths': [], 'weights': [], 'topicCodes': set()
+                })
+                strength = item.get('strength') or 1
+                # Nodes are visited in index order, so lists stay sorted
+                if posting['nodes'] and posting['nodes'][-1] == node_index:
+                    posting['counts'][-1] += 1
+                    posting['strengths'][-1] = max(posting['strengths'][-1], strength)
+                    posting['weights'][-1] += strength
+                else:
+                    posting['nodes'].append(node_index)
+                    posting['counts'].append(1)
+                    posting['strengths'].append(strength)
+                    posting['weights'].append(strength)
+                if topic_code:
+                    posting['topicCodes'].add(topic_code)
+
+    for topics in postings.values():
+        for posting in topics.values():
+            posting['topicCodes'] = sorted(posting['topicCodes'])
+
+    return {
+        'version': POSTINGS_VERSION,
+        'nodes': node_ids,
+        'postings': {
+            category: dict(sorted(topics.items()))
+            for category, topics in sorted(postings.items())
+        },
+    }
+
+
+def write_postings(graph, base_path=None):
+    """Write cs_topic_postings.json next to graph_data.json"""
+    output_file = Path(base_path or Path(__file__).parent) / POSTINGS_FILE
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(build_postings(graph), f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
+
+
+def main():
+    base_path = Path(__file__).parent
+    graph = load_graph(base_path / GRAPH_DATA_FILE)
+
+    output_file = write_postings(graph, base_path)
+    print(f"Wrote {output_file.name} ({output_file.stat().st_size} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Build prerequisite_reachability.json: the transitive closure of the
+prerequisite edges in graph_data.json, plus topological order, levels and
+the critical path.
+
+An edge source -> target means source is a prerequisite of target. The
+closure is stored as one bitset per node (bit i = node i in "nodes"), so
+"is A needed before B?" is a single bit test.
+
+Format:
+    {
+      "version": 1,
+      "nodes": ["A", "B", ...],       # bit i refers to nodes[i]
+      "order": [0, 3, 1, ...],        # node indexes in topological order
+      "levels": [0, 1, 2, ...],       # longest prerequisite chain ending at the node
+      "heights": [4, 3, 0, ...],      # longest chain starting at the node
+      "ancestors": ["6", "0", ...],   # hex bitset of every prerequisite, direct or not
+      "descendants": ["1a", ...],     # hex bitset of every topic that depends on the node
+      "criticalPath": {"length": 7, "nodes": ["A", "B", ...]}
+    }
+
+Query from Python:
+    reach = Reachability.load()
+    reach.is_ancestor('A', 'C')
+    reach.descendants('B')
+"""
+
+import hashlib
+import heapq
+import json
+from pathlib import Path
+
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE
+
+REACHABILITY_FILE = 'prerequisite_reachability.json'
+REACHABILITY_VERSION = 1
+
+
+def _adjacency(node_ids, edges):
+    """Deduplicated child lists by node index, ignoring edges to unknown nodes"""
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    children = [set() for _ in node_ids]
+    for source, target in edges:
+        if source in index and target in index:
+            children[index[source]].add(index[target])
+    return [sorted(c) for c in children]
+
+
+def topological_order(children):
+    """Kahn's algorithm, lowest index first among ready nodes
+
+    Raises ValueError naming the nodes left on a cycle.
+    """
+    indegree = [0] * len(children)
+    for targets in children:
+        for target in targets:
+            indegree[target] += 1
+    ready = [i for i, degree in enumerate(indegree) if degree == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node = heapq.heappop(ready)
+        order.append(node)
+        for target in children[node]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                heapq.heappush(ready, target)
+    if len(order) != len(children):
+        cyclic = [i for i, degree in enumerate(indegree) if degree > 0]
+        raise ValueError(f"Prerequisite edges contain a cycle through node indexes {cyclic}")
+    return order
+
+
+def _edge_pairs(graph):
+    return [(edge['source'], edge['target']) for edge in graph.get('edges', [])]
+
+
+def check_acyclic(graph):
+    """Raise ValueError when the prerequisite edges of graph contain a cycle"""
+    topological_order(_adjacency([node['id'] for node in graph['nodes']], _edge_pairs(graph)))
+
+
+def reachability_key(graph):
+    """Hash of everything build_reachability() reads: node ids and edges"""
+    payload = json.dumps([
+        REACHABILITY_VERSION,
+        [node['id'] for node in graph['nodes']],
+        _edge_pairs(graph),
+    ], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def build_reachability(graph):
+    """Build the reachability structure for a loaded graph"""
+    node_ids = [node['id'] for node in graph['nodes']]
+    children = _adjacency(node_ids, _edge_pairs(graph))
+    parents = [[] for _ in node_ids]
+    for source, targets in enumerate(children):
+        for target in targets:
+            parents[target].append(source)
+
+    order = topological_order(children)
+    n = len(node_ids)
+    levels = [0] * n
+    heights = [0] * n
+    ancestors = [0] * n
+    descendants = [0] * n
+
+    for node in order:
+        for parent in parents[node]:
+            ancestors[node] |= ancestors[parent] | (1 << parent)
+            levels[node] = max(levels[node], levels[parent] + 1)
+    for node in reversed(order):
+        for child in children[node]:
+            descendants[node] |= descendants[child] | (1 << child)
+            heights[node] = max(heights[node], heights[child] + 1)
+
+    critical = []
+    if n:
+        # Start from the deepest root and always step to the child that keeps the chain longest
+        node = max((i for i in order if levels[i] == 0), key=lambda i: (heights[i], -i))
+        critical.append(node)
+        while children[node]:
+            node = max(children[node], key=lambda c: (heights[c], -c))
+            critical.append(node)
+
+    return {
+        'version': REACHABILITY_VERSION,
+        'nodes': node_ids,
+        'order': order,
+        'levels': levels,
+        'heights': heights,
+        'ancestors': [format(bits, 'x') for bits in ancestors],
+        'descendants': [format(bits, 'x') for bits in descendants],
+        'criticalPath': {
+            'length': len(critical) - 1 if critical else 0,
+            'nodes': [node_ids[i] for i in critical],
+        },
+    }
+
+
+class Reachability:
+    """Ancestor/descendant queries over a built reachability structure
+
+    The closures are unpacked into fixed-width bitset rows (one bytearray
+    per direction, ceil(n / 8) bytes per node), so is_ancestor() reads a
+    single byte.
+    """
+
+    def __init__(self, data):
+        self.node_ids = data['nodes']
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.order = data['order']
+        self.levels = data['levels']
+        self.heights = data['heights']
+        self._width = (len(self.node_ids) + 7) // 8
+        self._ancestors = self._matrix(data['ancestors'])
+        self._descendants = self._matrix(data['descendants'])
+        self.critical_path = data['criticalPath']['nodes']
+
+    @classmethod
+    def load(cls, filepath=None):
+        filepath = filepath or Path(__file__).parent / REACHABILITY_FILE
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_graph(cls, graph):
+        return cls(build_reachability(graph))
+
+    def _matrix(self, rows):
+        """Hex bitsets packed into one bytearray of little-endian fixed-width rows"""
+        width = self._width
+        matrix = bytearray(len(rows) * width)
+        for row, bits in enumerate(rows):
+            matrix[row * width:(row + 1) * width] = int(bits, 16).to_bytes(width, 'little')
+        return matrix
+
+    def _row(self, matrix, row):
+        return int.from_bytes(matrix[row * self._width:(row + 1) * self._width], 'little')
+
+    def is_ancestor(self, ancestor, node):
+        """True when ancestor is a direct or indirect prerequisite of node"""
+        bit = self.index[ancestor]
+        return bool(self._ancestors[self.index[node] * self._width + (bit >> 3)] >> (bit & 7) & 1)
+
+    def is_descendant(self, descendant, node):
+        return self.is_ancestor(node, descendant)
+
+    def _ids(self, bits):
+        ids = []
+        while bits:
+            low = bits & -bits
+            ids.append(self.node_ids[low.bit_length() - 1])
+            bits ^= low
+        return ids
+
+    def ancestors(self, node):
+        """Every prerequisite of node, in node index order"""
+        return self._ids(self._row(self._ancestors, self.index[node]))
+
+    def descendants(self, node):
+        """Every topic that depends on node, in node index order"""
+        return self._ids(self._row(self._descendants, self.index[node]))
+
+    def level(self, node):
+        return self.levels[self.index[node]]
+
+    def height(self, node):
+        return self.heights[self.index[node]]
+
+
+def write_reachability(graph, base_path=None):
+    """Write prerequisite_reachability.json next to graph_data.json"""
+    output_file = Path(base_path or Path(__file__).parent) / REACHABILITY_FILE
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(build_reachability(graph), f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
+
+
+def main():
+    base_path = Path(__file__).parent
+    graph = load_graph(base_path / GRAPH_DATA_FILE)
+
+    output_file = write_reachability(graph, base_path)
+    with open(output_file, 'r', encoding='utf-8') as f:
+        critical = json.load(f)['criticalPath']
+    print(f"Wrote {output_file.name} ({output_file.stat().st_size} bytes)")
+    print(f"Critical path ({critical['length']} edges): {' -> '.join(critical['nodes'])}")
+
+
+if __name__ == '__main__':
+    main()
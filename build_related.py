@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Build related_topics.json: calculus topics that support the same CS topics,
+and CS topics that draw on the same calculus topics.
+
+The graph is turned into a sparse topic code × (category, CS topic) matrix
+in CSR form (NumPy arrays), weighted by summed Strength. Both products A·Aᵀ
+and Aᵀ·A are computed from the sparse arrays, a block of rows at a time:
+only pairs of entries sharing a column contribute (or, when those are
+dense enough, a BLAS product is cheaper and used instead), and memory stays
+bounded by the block size. Each cell gives a
+co-occurrence count (shared CS topics, or shared calculus topics) and a
+cosine similarity; the top RELATED_K neighbours by cosine are kept for every
+calculus topic and every CS topic. The rationale panel in app.js shows them
+for the selected topic.
+
+Format:
+    {
+      "version": 1,
+      "csTopics": [["Machine Learning", "Gradient descent"], ...],
+      "topics": {"Der1": [["Der2", 0.8312, 3], ...]},   # [topic code, cosine, shared CS topics]
+      "csNeighbors": [[[12, 0.7071, 2], ...], ...]        # per csTopics entry: [csTopics index, cosine, shared topics]
+    }
+
+Requires NumPy.
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE, strength_aggregates
+
+RELATED_FILE = 'related_topics.json'
+RELATED_VERSION = 1
+RELATED_K = 10
+# Entry pairs expanded at once by the sparse product (about 60 bytes each)
+PAIR_BLOCK = 1 << 20
+# Cells of A·Aᵀ computed at once by the dense product (about 30 bytes each)
+BLOCK_CELLS = 1 << 20
+# Largest A expanded for the dense product, and how many BLAS multiply-adds
+# cost about as much as accumulating one pair of sparse entries
+DENSE_MAX_CELLS = 1 << 23
+DENSE_FLOPS_PER_PAIR = 1000
+
+
+def _topic_rows(graph):
+    """(topic code, {category: {cs topic: strength}}) for the first node of every topic code"""
+    # Nodes sharing a topic code carry the same rationales; one row per code
+    seen = set()
+    for node in graph['nodes']:
+        topic_code = node.get('topicCode')
+        if not topic_code or topic_code in seen:
+            continue
+        seen.add(topic_code)
+        by_cs_topic = node.get('strength_by_cs_topic')
+        if by_cs_topic is None:
+            _, by_cs_topic, _ = strength_aggregates(node.get('rationales') or {})
+        yield topic_code, by_cs_topic
+
+
+def related_key(graph):
+    """Hash of everything build_related() reads: the Strength per (topic code, category, CS topic)"""
+    h = hashlib.sha1(f'{RELATED_VERSION}\x1f{RELATED_K}'.encode('utf-8'))
+    for topic_code, by_cs_topic in _topic_rows(graph):
+        h.update(f'\x1d{topic_code}'.encode('utf-8'))
+        h.update(json.dumps(by_cs_topic, ensure_ascii=False).encode('utf-8'))
+    return h.hexdigest()
+
+
+def incidence_matrix(graph):
+    """(topic codes, cs topics, indptr, indices, data): CSR arrays of the Strength-weighted incidence matrix"""
+    topic_codes = []
+    cs_topics = []
+    cs_topic_index = {}
+    indptr = [0]
+    indices = []
+    data = []
+
+    for topic_code, by_cs_topic in _topic_rows(graph):
+        row = {}
+        for category, topics in by_cs_topic.items():
+            for cs_topic, strength in topics.items():
+                key = (category, cs_topic)
+                if key not in cs_topic_index:
+                    cs_topic_index[key] = len(cs_topics)
+                    cs_topics.append(key)
+                row[cs_topic_index[key]] = strength
+        topic_codes.append(topic_code)
+        for column in sorted(row):
+            indices.append(column)
+            data.append(row[column])
+        indptr.append(len(indices))
+
+    return (topic_codes, cs_topics, np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int64), np.array(data, dtype=np.float64))
+
+
+def transpose(indptr, indices, data, n_columns):
+    """CSR arrays of the transposed matrix"""
+    rows = row_entries(indptr)
+    order = np.argsort(indices, kind='stable')
+    counts = np.bincount(indices, minlength=n_columns)
+    return np.concatenate(([0], np.cumsum(counts))), rows[order], data[order]
+
+
+def row_entries(indptr):
+    """Row index of every stored entry of a CSR matrix"""
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _collect_top(left, right, cosines, shared, top, neighbours):
+    """Add the best `top` (right, cosine, shared) of each left row to neighbours
+
+    The arrays must be in (left, right) order; ties keep the lower right row.
+    """
+    order = np.argsort(-cosines, kind='stable')
+    order = order[np.argsort(left[order], kind='stable')]
+    left, right, cosines, shared = left[order], right[order], cosines[order], shared[order]
+    starts = np.flatnonzero(np.concatenate(([True], left[1:] != left[:-1])))
+    rank = np.arange(len(left)) - np.repeat(starts, np.diff(np.append(starts, len(left))))
+    best = rank < top
+    for row, other, cosine, count in zip(left[best].tolist(), right[best].tolist(),
+                                         cosines[best].tolist(), shared[best].tolist()):
+        neighbours.setdefault(row, []).append((other, cosine, count))
+
+
+def _sparse_neighbours(csr, csc, norms, top):
+    """Top neighbours from the pairs of entries sharing a column, a block of rows at a time"""
+    indptr, indices, data = csr
+    column_ptr, column_rows, column_data = csc
+    n_rows = len(indptr) - 1
+    entry_row = row_entries(indptr)
+    entry_pairs = column_ptr[indices + 1] - column_ptr[indices]
+    # Rows are grouped so that each block expands to about PAIR_BLOCK pairs
+    row_pairs = np.cumsum(np.bincount(entry_row, entry_pairs, minlength=n_rows))
+    bounds = np.unique(np.searchsorted(row_pairs, np.arange(PAIR_BLOCK, row_pairs[-1] if n_rows else 0, PAIR_BLOCK)))
+
+    neighbours = {}
+    for start, stop in zip(np.concatenate(([0], bounds + 1)).tolist(), np.append(bounds + 1, n_rows).tolist()):
+        first, last = indptr[start], indptr[stop]
+        sizes = entry_pairs[first:last]
+        offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        partner = np.repeat(column_ptr[indices[first:last]], sizes) + offsets
+        rows = np.repeat(entry_row[first:last], sizes)
+        others = column_rows[partner]
+        products = np.repeat(data[first:last], sizes) * column_data[partner]
+        keep = others != rows
+        if not keep.any():
+            continue
+
+        keys, inverse = np.unique(rows[keep] * n_rows + others[keep], return_inverse=True)
+        dots = np.bincount(inverse, products[keep])
+        shared = np.bincount(inverse)
+        left, right = keys // n_rows, keys % n_rows
+        cosines = dots / (norms[left] * norms[right])
+
+        _collect_top(left, right, cosines, shared, top, neighbours)
+    return neighbours
+
+
+def _dense_neighbours(csr, n_columns, norms, top):
+    """Top neighbours from a BLAS product of A expanded to a dense matrix, a block of rows at a time"""
+    indptr, indices, data = csr
+    n_rows = len(indptr) - 1
+    dense = np.zeros((n_rows, n_columns))
+    dense[row_entries(indptr), indices] = data
+    # Shared-column counts are small integers, exact in float32
+    present = (dense > 0).astype(np.float32)
+    block = max(1, BLOCK_CELLS // n_rows)
+
+    neighbours = {}
+    for start in range(0, n_rows, block):
+        stop = min(start + block, n_rows)
+        dots = dense[start:stop] @ dense.T
+        shared = (present[start:stop] @ present.T).astype(np.int32)
+        shared[np.arange(stop - start), np.arange(start, stop)] = 0
+        cosines = np.where(shared > 0, dots / np.outer(norms[start:stop], norms).clip(min=1e-12), -1.0)
+
+        # Everything scoring at least each row's top-th best, so ties at the cut are all seen
+        cut = -np.partition(-cosines, top - 1, axis=1)[:, top - 1]
+        local, right = np.nonzero((cosines >= cut[:, None]) & (shared > 0))
+        _collect_top(local + start, right, cosines[local, right], shared[local, right], top, neighbours)
+    return neighbours
+
+
+def gram_neighbours(csr, csc, k=RELATED_K):
+    """Top-k other rows by cosine for every row of A·Aᵀ: {row: [(other row, cosine, shared columns)]}
+
+    csr holds A's (indptr, indices, data), csc the same for Aᵀ. Only pairs of
+    rows sharing a column have a nonzero product, so the sparse path expands
+    exactly those pairs. When there are so many that a dense BLAS product of
+    A is cheaper (and A is small enough to expand), that is used instead.
+    """
+    indptr, indices, data = csr
+    n_rows, n_columns = len(indptr) - 1, len(csc[0]) - 1
+    top = min(k, n_rows - 1)
+    if top <= 0 or not len(indices):
+        return {}
+    norms = np.sqrt(np.bincount(row_entries(indptr), data * data, minlength=n_rows))
+
+    pairs = int((np.diff(csc[0]) ** 2).sum())
+    if n_rows * n_columns <= DENSE_MAX_CELLS and n_rows * n_rows * n_columns <= pairs * DENSE_FLOPS_PER_PAIR:
+        return _dense_neighbours(csr, n_columns, norms, top)
+    return _sparse_neighbours(csr, csc, norms, top)
+
+
+def build_related(graph, k=RELATED_K):
+    """Build the related-topics structure for a loaded graph"""
+    topic_codes, cs_topics, indptr, indices, data = incidence_matrix(graph)
+    n_cs_topics = len(cs_topics)
+    csr = (indptr, indices, data)
+    csc = transpose(indptr, indices, data, n_cs_topics)
+
+    # Topics meet through shared CS topics, CS topics through shared topics
+    topic_neighbours = gram_neighbours(csr, csc, k)
+    cs_neighbours = gram_neighbours(csc, csr, k)
+
+    return {
+        'version': RELATED_VERSION,
+        'csTopics': [list(key) for key in cs_topics],
+        'topics': {
+            topic_codes[row]: [[topic_codes[other], round(cosine, 4), count] for other, cosine, count in neighbours]
+            for row, neighbours in sorted(topic_neighbours.items())
+        },
+        'csNeighbors': [
+            [[other, round(cosine, 4), count] for other, cosine, count in cs_neighbours.get(row, [])]
+            for row in range(n_cs_topics)
+        ],
+    }
+
+
+def write_related(graph, base_path=None):
+    """Write related_topics.json next to graph_data.json"""
+    output_file = Path(base_path or Path(__file__).parent) / RELATED_FILE
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(build_related(graph), f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build related_topics.json, or show the neighbours of a topic')
+    parser.add_argument('--topic', help='print the calculus topics related to this topic code')
+    parser.add_argument('--cs-topic', help='print the CS topics that co-occur with this CS topic')
+    args = parser.parse_args()
+
+    base_path = Path(__file__).parent
+    graph = load_graph(base_path / GRAPH_DATA_FILE)
+
+    if args.topic or args.cs_topic:
+        related = build_related(graph)
+        if args.topic:
+            for topic_code, cosine, shared in related['topics'].get(args.topic, []):
+                print(f"{topic_code:<10} {cosine:.3f}  {shared} shared CS topics")
+        if args.cs_topic:
+            for i, (category, cs_topic) in enumerate(related['csTopics']):
+                if cs_topic.lower() != args.cs_topic.lower():
+                    continue
+                print(f"{category}: {cs_topic}")
+                for other, cosine, shared in related['csNeighbors'][i]:
+                    other_category, other_topic = related['csTopics'][other]
+                    print(f"  {cosine:.3f}  {shared} shared  {other_category}: {other_topic}")
+        return
+
+    output_file = write_related(graph, base_path)
+    print(f"Wrote {output_file.name} ({output_file.stat().st_size} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Build search_index.json, a BM25 full-text index over the graph's text.
+
+Every rationale row is a document made of its calculus topic name, CS topic
+and rationale text. Every calculus topic also gets a document of its own
+(name and node label), so topics without rationales can be found too.
+app.js loads the index the first time the search box is used and runs the
+same BM25 scoring as search() below, without touching rationale text.
+
+Format:
+    {
+      "version": 1,
+      "k1": 1.2, "b": 0.75,
+      "topics": [["Der1", "Definition of the derivative"], ...],
+      "categories": ["Machine Learning", ...],
+      "csTopics": ["Gradient descent", ...],
+      "docs": [[topic, category, csTopic, length], ...],   # indexes; -1 for topic documents
+      "avgLength": 71.4,
+      "terms": ["absolute", "acceleration", ...],          # sorted, for prefix lookup
+      "postings": ["0,3.2,1f", ...]                        # one string per term
+    }
+
+A posting string lists the term's documents in ascending order as
+comma-separated base-36 gaps from the previous document (the first from 0),
+with ".<tf>" appended (also base 36) when the term occurs more than once.
+Document frequency is the number of entries.
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE
+
+SEARCH_INDEX_FILE = 'search_index.json'
+SEARCH_INDEX_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Terms a trailing query prefix may expand to
+MAX_PREFIX_TERMS = 50
+
+# Runs of two or more characters: single letters are never tokens
+_TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+STOPWORDS = frozenset("""
+a an and are as at be by can for from how in into is it its of on or such that the their
+then there these this to used uses using was we when where which while with
+""".split())
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric tokens, without stopwords, bare numbers and single letters"""
+    return [
+        token for token in _TOKEN_RE.findall((text or '').lower().replace('&', ' and '))
+        if token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+def _to_base36(number):
+    if number == 0:
+        return '0'
+    digits = []
+    while number:
+        number, remainder = divmod(number, 36)
+        digits.append(_DIGITS[remainder])
+    return ''.join(reversed(digits))
+
+
+# Posting gaps and term counts are nearly always small; look those up
+_SMALL_BASE36 = [_to_base36(number) for number in range(36 * 36)]
+
+
+def _base36(number):
+    if number < len(_SMALL_BASE36):
+        return _SMALL_BASE36[number]
+    return _to_base36(number)
+
+
+def encode_postings(entries):
+    """[(doc, tf)] in ascending doc order -> posting string"""
+    parts = []
+    previous = 0
+    for doc, tf in entries:
+        gap = _base36(doc - previous)
+        parts.append(gap if tf == 1 else f'{gap}.{_base36(tf)}')
+        previous = doc
+    return ','.join(parts)
+
+
+def decode_postings(encoded):
+    """Posting string -> [(doc, tf)]"""
+    entries = []
+    doc = 0
+    for part in encoded.split(','):
+        gap, _, tf = part.partition('.')
+        doc += int(gap, 36)
+        entries.append((doc, int(tf, 36) if tf else 1))
+    return entries
+
+
+def search_index_key(graph):
+    """Hash of everything build_search_index() reads: topic codes, names and labels, CS topics and texts"""
+    h = hashlib.sha1(str(SEARCH_INDEX_VERSION).encode('utf-8'))
+    seen = set()
+    for node in graph['nodes']:
+        topic_code = node.get('topicCode')
+        if not topic_code or topic_code in seen:
+            continue
+        seen.add(topic_code)
+        h.update(f"\x1d{topic_code}\x1f{node.get('topicName') or ''}\x1f{node.get('label') or ''}".encode('utf-8'))
+        for category_name, items in (node.get('rationales') or {}).items():
+            h.update(f'\x1c{category_name}'.encode('utf-8'))
+            for item in items:
+                h.update(f"\x1e{item.get('cs_topic') or ''}\x1f{item.get('rationale') or ''}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def build_search_index(graph):
+    """Build the index structure for a loaded graph"""
+    topics = []
+    topic_index = {}
+    categories = []
+    category_index = {}
+    cs_topics = []
+    cs_topic_index = {}
+    docs = []
+    postings = {}
+
+    def add_document(topic, category, cs_topic, text):
+        counts = Counter(tokenize(text))
+        doc = len(docs)
+        docs.append([topic, category, cs_topic, sum(counts.values())])
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc, tf))
+
+    # Nodes sharing a topic code carry the same rationales; index them once
+    for node in graph['nodes']:
+        topic_code = node.get('topicCode')
+        if not topic_code or topic_code in topic_index:
+            continue
+        topic_name = node.get('topicName') or node.get('label') or ''
+        topic = topic_index[topic_code] = len(topics)
+        topics.append([topic_code, topic_name])
+        label = node.get('label') or ''
+        add_document(topic, -1, -1, topic_name if label == topic_name else f'{topic_name} {label}')
+
+        for category_name, items in (node.get('rationales') or {}).items():
+            if category_name not in category_index:
+                category_index[category_name] = len(categories)
+                categories.append(category_name)
+            for item in items:
+                cs_topic_name = (item.get('cs_topic') or '').strip()
+                if cs_topic_name not in cs_topic_index:
+                    cs_topic_index[cs_topic_name] = len(cs_topics)
+                    cs_topics.append(cs_topic_name)
+                add_document(
+                    topic, category_index[category_name], cs_topic_index[cs_topic_name],
+                    f"{topic_name} {cs_topic_name} {item.get('rationale') or ''}",
+                )
+
+    terms = sorted(postings)
+    return {
+        'version': SEARCH_INDEX_VERSION,
+        'k1': BM25_K1,
+        'b': BM25_B,
+        'topics': topics,
+        'categories': categories,
+        'csTopics': cs_topics,
+        'docs': docs,
+        'avgLength': round(sum(doc[3] for doc in docs) / len(docs), 3) if docs else 0,
+        'terms': terms,
+        'postings': [encode_postings(postings[term]) for term in terms],
+    }
+
+
+class SearchIndex:
+    """BM25 queries over a built index (the same scoring app.js uses)"""
+
+    def __init__(self, index):
+        self.index = index
+        self.terms = index['terms']
+        self._decoded = {}
+
+    @classmethod
+    def load(cls, filepath=None):
+        filepath = Path(filepath or Path(__file__).parent / SEARCH_INDEX_FILE)
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_graph(cls, graph):
+        return cls(build_search_index(graph))
+
+    def expand(self, prefix, limit=MAX_PREFIX_TERMS):
+        """Vocabulary terms starting with prefix, in sorted order"""
+        start = bisect.bisect_left(self.terms, prefix)
+        matches = []
+        for term in self.terms[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def postings(self, term):
+        position = bisect.bisect_left(self.terms, term)
+        if position == len(self.terms) or self.terms[position] != term:
+            return []
+        if position not in self._decoded:
+            self._decoded[position] = decode_postings(self.index['postings'][position])
+        return self._decoded[position]
+
+    def search(self, query, limit=20, prefix=True):
+        """[(score, doc)] best first; doc has topicCode, topicName, category, csTopic
+
+        With prefix, the last query token also matches every term it starts
+        (so "backprop" finds "backpropagation"); a document scores its best
+        expansion once.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        docs = self.index['docs']
+        k1, b = self.index['k1'], self.index['b']
+        avg_length = self.index['avgLength'] or 1
+        scores = Counter()
+
+        for i, token in enumerate(tokens):
+            expansions = self.expand(token) if prefix and i == len(tokens) - 1 else [token]
+            best = {}
+            for term in expansions:
+                entries = self.postings(term)
+                idf = math.log(1 + (len(docs) - len(entries) + 0.5) / (len(entries) + 0.5))
+                for doc, tf in entries:
+                    length = docs[doc][3]
+                    score = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+                    if score > best.get(doc, 0):
+                        best[doc] = score
+            scores.update(best)
+
+        results = []
+        for doc, score in sorted(scores.items(), key=lambda entry: (-entry[1], entry[0]))[:limit]:
+            topic, category, cs_topic, _ = docs[doc]
+            topic_code, topic_name = self.index['topics'][topic]
+            results.append((round(score, 4), {
+                'topicCode': topic_code,
+                'topicName': topic_name,
+                'category': self.index['categories'][category] if category >= 0 else None,
+                'csTopic': self.index['csTopics'][cs_topic] if cs_topic >= 0 else None,
+            }))
+        return results
+
+
+def write_search_index(graph, base_path=None):
+    """Write search_index.json next to graph_data.json"""
+    output_file = Path(base_path or Path(__file__).parent) / SEARCH_INDEX_FILE
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(build_search_index(graph), f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build search_index.json, or query it')
+    parser.add_argument('query', nargs='*', help='search instead of building')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    base_path = Path(__file__).parent
+    if args.query:
+        for score, doc in SearchIndex.load(base_path / SEARCH_INDEX_FILE).search(' '.join(args.query), args.limit):
+            where = f"{doc['category']}: {doc['csTopic']}" if doc['category'] else 'topic name'
+            print(f"{score:7.3f}  {doc['topicCode']:<10} {doc['topicName']}  ({where})")
+        return
+
+    graph = load_graph(base_path / GRAPH_DATA_FILE)
+    output_file = write_search_index(graph, base_path)
+    print(f"Wrote {output_file.name} ({output_file.stat().st_size} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Split graph_data.json into an eager skeleton and lazily fetched rationale shards.
+
+graph_skeleton.json holds everything the page needs for first render: nodes
+(with topic codes, categories, strength aggregates and rationale items that
+reference their text by rationale_id), edges, and a shard index. Rationale
+text lives in rationale_shards/<core idea>.json and is fetched by app.js the
+first time a node from that core idea is opened.
+
+Skeleton extras:
+    "rationale_shards": {
+      "directory": "rationale_shards",
+      "files": ["derivatives.json", ...],
+      "nodes": {"<node id>": <index into files>}
+    }
+
+Shard format:
+    {"texts": {"<rationale_id>": "<text>", ...}}
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from build_cache import file_stamp, is_current
+from graph_io import RATIONALE_TABLE_KEY, load_graph, pack_rationales
+from ingest import GRAPH_DATA_FILE
+
+SKELETON_FILE = 'graph_skeleton.json'
+SHARD_DIR = 'rationale_shards'
+SHARD_INDEX_KEY = 'rationale_shards'
+
+
+def shard_name(node):
+    """Shard file name for a node: its core idea, else its course, as a slug"""
+    key = node.get('coreIdea') or node.get('course') or node.get('calc_level') or 'other'
+    slug = re.sub(r'[^a-z0-9]+', '-', key.lower()).strip('-')
+    return f'{slug or "other"}.json'
+
+
+def build_shards(graph):
+    """Return (skeleton, shards) for an in-memory graph
+
+    shards maps shard file name -> {rationale_id: text}.
+    """
+    packed = pack_rationales(graph)
+    texts = packed.pop(RATIONALE_TABLE_KEY)
+
+    shards = {}
+    node_shards = {}
+    for node in packed['nodes']:
+        ids = [
+            item['rationale_id']
+            for items in (node.get('rationales') or {}).values()
+            for item in items
+        ]
+        if not ids:
+            continue
+        name = shard_name(node)
+        shard = shards.setdefault(name, {})
+        for text_id in ids:
+            shard[text_id] = texts.get(text_id, '')
+        node_shards[node['id']] = name
+
+    files = sorted(shards)
+    file_index = {name: i for i, name in enumerate(files)}
+    packed[SHARD_INDEX_KEY] = {
+        'directory': SHARD_DIR,
+        'files': files,
+        'nodes': {node_id: file_index[name] for node_id, name in node_shards.items()},
+    }
+    return packed, shards
+
+
+def _members_key(node_ids):
+    return hashlib.sha1('\x1f'.join(sorted(node_ids)).encode('utf-8')).hexdigest()
+
+
+def write_shards(graph, base_path=None, changed_nodes=None, stamps=None, built=None):
+    """Write graph_skeleton.json and rationale_shards/, removing shards that no longer exist
+
+    With stamps (see build_cache.load_stamps) and the set of changed_nodes,
+    only shards that hold a changed node or whose member nodes changed are
+    rewritten; stamps is updated in place. built is build_shards(graph), when
+    the caller already has it. Returns (skeleton file, shard count).
+    """
+    base_path = Path(base_path or Path(__file__).parent)
+    skeleton, shards = built or build_shards(graph)
+
+    members = {}
+    if stamps is not None:
+        files = skeleton[SHARD_INDEX_KEY]['files']
+        for node_id, index in skeleton[SHARD_INDEX_KEY]['nodes'].items():
+            members.setdefault(files[index], []).append(node_id)
+        for name in list(stamps):
+            if name.startswith(SHARD_DIR + '/') and name[len(SHARD_DIR) + 1:] not in shards:
+                del stamps[name]
+    if changed_nodes is not None:
+        changed_nodes = set(changed_nodes)
+
+    shard_dir = base_path / SHARD_DIR
+    shard_dir.mkdir(exist_ok=True)
+    for stale in shard_dir.glob('*.json'):
+        if stale.name not in shards:
+            stale.unlink()
+    for name, texts in shards.items():
+        shard_file = shard_dir / name
+        if stamps is not None:
+            stamp_name = f'{SHARD_DIR}/{name}'
+            key = _members_key(members[name])
+            if (changed_nodes is not None and changed_nodes.isdisjoint(members[name])
+                    and is_current(stamps, stamp_name, shard_file, key)):
+                continue
+        with open(shard_file, 'w', encoding='utf-8') as f:
+            json.dump({'texts': texts}, f, ensure_ascii=False, separators=(',', ':'))
+        if stamps is not None:
+            stamps[stamp_name] = file_stamp(shard_file, key)
+
+    skeleton_file = base_path / SKELETON_FILE
+    with open(skeleton_file, 'w', encoding='utf-8') as f:
+        json.dump(skeleton, f, ensure_ascii=False, separators=(',', ':'))
+    return skeleton_file, len(shards)
+
+
+def main():
+    base_path = Path(__file__).parent
+    graph = load_graph(base_path / GRAPH_DATA_FILE)
+
+    skeleton_file, shard_count = write_shards(graph, base_path)
+    print(f"Wrote {skeleton_file.name} ({skeleton_file.stat().st_size} bytes) "
+          f"and {shard_count} shards in {SHARD_DIR}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Compile the calculus list, category CSVs and graph into one SQLite database.
+
+curriculum.db is the queryable form of everything the data scripts read:
+
+    topics      topic_code, topic_name, course, core_idea
+    categories  category_id, name, position (categories.json order)
+    rationales  one row per CSV row: topic_code (NULL when the calculus topic
+                is unknown), category_id, cs_topic, cs_topic_key
+                (normalize_text of cs_topic), strength, rationale, row_number
+    rationale_fts   FTS5 index over rationales.rationale
+    nodes       node_id, position, number_id, label, topic_code, data (the
+                node's other fields as JSON, with the rationales of nodes
+                the CSVs have no rows for)
+    edges       source, target, position
+    meta        version and build details
+
+topic_code, category and cs_topic are indexed, so the Store queries below
+answer from the indexes instead of scanning. The store is the compiled
+dataset: a build compiles it from the CSVs and the graph structure (node
+fields and edges of the current graph_data.json), then exports
+graph_data.json and its derived files from it with export_graph(), so the
+page always shows what the store holds. Node rationales come from the
+rationales table; nodes the CSVs have no rows for (no topic code, or a
+topic code without rows) keep the rationales stored in their data, as
+fix_all_topic_codes.sync_rationales() keeps them.
+
+Usage:
+    python3 build_store.py                                   # build curriculum.db, export graph_data.json
+    python3 build_store.py --no-export                       # build curriculum.db only
+    python3 build_store.py --cs-topic "Gradient descent" --min-strength 2 --course "Calculus II"
+    python3 build_store.py --search "chain rule"
+    python3 build_store.py --export                          # export graph_data.json from the existing store
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+from artifacts import write_artifacts
+from graph_io import load_graph
+from ingest import BASE_PATH, GRAPH_DATA_FILE, load_dataset, normalize_text, refresh_node_summary
+
+STORE_FILE = 'curriculum.db'
+STORE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE topics (
+    topic_code TEXT PRIMARY KEY,
+    topic_name TEXT NOT NULL,
+    course TEXT NOT NULL,
+    core_idea TEXT NOT NULL
+);
+CREATE TABLE categories (
+    category_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE TABLE rationales (
+    rationale_id INTEGER PRIMARY KEY,
+    topic_code TEXT REFERENCES topics (topic_code),
+    calc_topic TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories (category_id),
+    cs_topic TEXT NOT NULL,
+    cs_topic_key TEXT NOT NULL,
+    strength INTEGER NOT NULL,
+    rationale TEXT NOT NULL,
+    row_number INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE rationale_fts USING fts5 (
+    rationale, content='rationales', content_rowid='rationale_id'
+);
+CREATE TABLE nodes (
+    node_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    number_id INTEGER,
+    label TEXT,
+    topic_code TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE edges (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX topics_course ON topics (course);
+CREATE INDEX rationales_topic ON rationales (topic_code, category_id, row_number);
+CREATE INDEX rationales_category_cs_topic ON rationales (category_id, cs_topic_key);
+CREATE INDEX rationales_cs_topic ON rationales (cs_topic_key, strength);
+CREATE INDEX nodes_topic ON nodes (topic_code);
+CREATE INDEX edges_source ON edges (source);
+CREATE INDEX edges_target ON edges (target);
+"""
+
+
+def fts_query(text):
+    """FTS5 MATCH expression that finds rows containing every word of text
+
+    Each word is quoted as an FTS5 string, so punctuation such as the hyphen
+    in "chain-rule" or a stray quote is searched for instead of parsed as
+    query syntax. A trailing * still makes a word a prefix query.
+    """
+    terms = []
+    for term in text.split():
+        prefix = len(term) > 1 and term.endswith('*')
+        if prefix:
+            term = term[:-1]
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _node_data(node, by_topic_code):
+    data = dict(node)
+    if 'rationales' in data and data.get('topicCode') in by_topic_code:
+        # The rationales table supplies these; keep the key in place, so the
+        # export writes the fields in the same order
+        data['rationales'] = None
+    return data
+
+
+def build_store(dataset, graph, filepath):
+    """Write the database for a dataset and graph to filepath (replacing it atomically)"""
+    filepath = Path(filepath)
+    tmp = filepath.with_name(filepath.name + '.tmp')
+    if tmp.exists():
+        tmp.unlink()
+
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            'INSERT INTO topics VALUES (?, ?, ?, ?)',
+            ((code, info['topicName'], info['course'], info['coreIdea'])
+             for code, info in dataset.calculus_topics.items())
+        )
+        category_ids = {category: i + 1 for i, category in enumerate(dataset.categories)}
+        conn.executemany(
+            'INSERT INTO categories VALUES (?, ?, ?)',
+            ((category_id, category, category_id - 1) for category, category_id in category_ids.items())
+        )
+        conn.executemany(
+            'INSERT INTO rationales (topic_code, calc_topic, category_id, cs_topic, cs_topic_key,'
+            ' strength, rationale, row_number) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            ((row['topic_code'], row['calc_topic'], category_ids[row['category']], row['cs_topic'],
+              normalize_text(row['cs_topic']), row['strength'], row['rationale'], row_number)
+             for row_number, row in enumerate(dataset.rows))
+        )
+        conn.execute("INSERT INTO rationale_fts (rationale_fts) VALUES ('rebuild')")
+
+        conn.executemany(
+            'INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)',
+            ((node['id'], position, node.get('number_id'), node.get('label'), node.get('topicCode'),
+              json.dumps(_node_data(node, dataset.by_topic_code), ensure_ascii=False))
+             for position, node in enumerate(graph['nodes']))
+        )
+        conn.executemany(
+            'INSERT INTO edges VALUES (?, ?, ?)',
+            ((edge['source'], edge['target'], position) for position, edge in enumerate(graph['edges']))
+        )
+        extra = {key: value for key, value in graph.items() if key not in ('nodes', 'edges')}
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('version', str(STORE_VERSION)),
+            ('graph_keys', json.dumps(list(graph.keys()))),
+            ('graph_extra', json.dumps(extra, ensure_ascii=False)),
+        ])
+        conn.executescript(INDEXES)
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, filepath)
+    return filepath
+
+
+class Store:
+    """Read-only queries over curriculum.db"""
+
+    def __init__(self, filepath=None):
+        filepath = Path(filepath or BASE_PATH / STORE_FILE)
+        if not filepath.exists():
+            raise FileNotFoundError(f"{filepath} not found; run build_store.py first")
+        self.conn = sqlite3.connect(f'{filepath.resolve().as_uri()}?mode=ro', uri=True)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _dicts(self, sql, params=()):
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def categories(self):
+        return [row[0] for row in self.conn.execute('SELECT name FROM categories ORDER BY position')]
+
+    def topic(self, topic_code):
+        rows = self._dicts('SELECT * FROM topics WHERE topic_code = ?', (topic_code,))
+        return rows[0] if rows else None
+
+    def topics_for_cs_topic(self, cs_topic, min_strength=1, course=None, category=None):
+        """Calculus topics connected to a CS topic, strongest first
+
+        One entry per (topic, category), with the strongest row's strength and
+        the number of rows. cs_topic is matched after normalize_text, so case
+        and punctuation do not matter.
+        """
+        sql = """
+            SELECT t.topic_code, t.topic_name, t.course, t.core_idea, c.name AS category,
+                   r.cs_topic, MAX(r.strength) AS strength, COUNT(*) AS rows
+            FROM rationales r
+            JOIN topics t ON t.topic_code = r.topic_code
+            JOIN categories c ON c.category_id = r.category_id
+            WHERE r.cs_topic_key = ? AND r.strength >= ?
+        """
+        params = [normalize_text(cs_topic), min_strength]
+        if course:
+            sql += ' AND t.course = ?'
+            params.append(course)
+        if category:
+            sql += ' AND c.name = ?'
+            params.append(category)
+        sql += ' GROUP BY t.topic_code, c.category_id ORDER BY strength DESC, t.topic_code, c.position'
+        return self._dicts(sql, params)
+
+    def cs_topics(self, category=None):
+        """(category, cs_topic, rows) for every CS topic, optionally of one category"""
+        sql = """
+            SELECT c.name AS category, MIN(r.cs_topic) AS cs_topic, COUNT(*) AS rows
+            FROM rationales r JOIN categories c ON c.category_id = r.category_id
+        """
+        params = []
+        if category:
+            sql += ' WHERE c.name = ?'
+            params.append(category)
+        sql += ' GROUP BY c.category_id, r.cs_topic_key ORDER BY c.position, cs_topic'
+        return self._dicts(sql, params)
+
+    def rationales(self, topic_code, category=None):
+        """Rationale rows of a topic code, in category and file order"""
+        sql = """
+            SELECT c.name AS category, r.cs_topic, r.strength, r.rationale
+            FROM rationales r JOIN categories c ON c.category_id = r.category_id
+            WHERE r.topic_code = ?
+        """
+        params = [topic_code]
+        if category:
+            sql += ' AND c.name = ?'
+            params.append(category)
+        sql += ' ORDER BY c.position, r.row_number'
+        return self._dicts(sql, params)
+
+    def search(self, query, limit=20):
+        """Full-text search over rationale text for rows containing every word of query, best matches first"""
+        match = fts_query(query)
+        if not match:
+            return []
+        return self._dicts("""
+            SELECT r.topic_code, c.name AS category, r.cs_topic, r.strength,
+                   snippet(rationale_fts, 0, '[', ']', '…', 12) AS snippet
+            FROM rationale_fts
+            JOIN rationales r ON r.rationale_id = rationale_fts.rowid
+            JOIN categories c ON c.category_id = r.category_id
+            WHERE rationale_fts MATCH ?
+            ORDER BY rank LIMIT ?
+        """, (match, limit))
+
+    def prerequisites(self, node_id):
+        return [row[0] for row in self.conn.execute(
+            'SELECT source FROM edges WHERE target = ? ORDER BY position', (node_id,))]
+
+    def dependents(self, node_id):
+        return [row[0] for row in self.conn.execute(
+            'SELECT target FROM edges WHERE source = ? ORDER BY position', (node_id,))]
+
+    def export_graph(self):
+        """graph_data.json's in-memory shape, with node rationales from the rationales table
+
+        Nodes whose topic code has no rows keep the rationales stored with them.
+        """
+        by_topic = {}
+        for topic_code, category, cs_topic, rationale, strength in self.conn.execute("""
+            SELECT r.topic_code, c.name, r.cs_topic, r.rationale, r.strength
+            FROM rationales r JOIN categories c ON c.category_id = r.category_id
+            WHERE r.topic_code IS NOT NULL
+            ORDER BY c.position, r.row_number
+        """):
+            by_topic.setdefault(topic_code, {}).setdefault(category, []).append(
+                {'cs_topic': cs_topic, 'rationale': rationale, 'strength': strength}
+            )
+
+        nodes = []
+        for (data,) in self.conn.execute('SELECT data FROM nodes ORDER BY position'):
+            node = json.loads(data)
+            topic_code = node.get('topicCode')
+            if topic_code in by_topic:
+                node['rationales'] = {category: list(items) for category, items in by_topic[topic_code].items()}
+            refresh_node_summary(node)
+            nodes.append(node)
+        edges = [
+            {'source': source, 'target': target}
+            for source, target in self.conn.execute('SELECT source, target FROM edges ORDER BY position')
+        ]
+
+        meta = dict(self.conn.execute('SELECT key, value FROM meta'))
+        parts = {'nodes': nodes, 'edges': edges, **json.loads(meta['graph_extra'])}
+        return {key: parts[key] for key in json.loads(meta['graph_keys'])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the SQLite store (curriculum.db)')
+    parser.add_argument('--db', help=f'database path (default: {STORE_FILE} next to this script)')
+    parser.add_argument('--cs-topic', help='list the calculus topics connected to this CS topic')
+    parser.add_argument('--min-strength', type=int, default=1)
+    parser.add_argument('--course', help='with --cs-topic, only topics of this course')
+    parser.add_argument('--category', help='with --cs-topic, only this category')
+    parser.add_argument('--search', metavar='QUERY', help='full-text search over rationale text')
+    parser.add_argument('--export', action='store_true',
+                        help='export graph_data.json and its derived files from the existing store')
+    parser.add_argument('--no-export', action='store_true',
+                        help='build the store without exporting graph_data.json from it')
+    args = parser.parse_args()
+    if args.export and args.no_export:
+        parser.error('--export and --no-export cannot be used together')
+
+    base_path = BASE_PATH
+    db_file = Path(args.db or base_path / STORE_FILE)
+
+    if args.cs_topic or args.search:
+        with Store(db_file) as store:
+            if args.cs_topic:
+                for row in store.topics_for_cs_topic(args.cs_topic, args.min_strength, args.course, args.category):
+                    print(f"{row['topic_code']:<10} {row['strength']}  {row['rows']}x  "
+                          f"{row['category']:<24} {row['topic_name']} ({row['course']})")
+            if args.search:
+                for row in store.search(args.search):
+                    print(f"{row['topic_code'] or '-':<10} {row['category']:<24} {row['cs_topic']}: {row['snippet']}")
+        return
+
+    if not args.export:
+        dataset = load_dataset(base_path)
+        graph = load_graph(base_path / GRAPH_DATA_FILE)
+        build_store(dataset, graph, db_file)
+        print(f"Wrote {db_file.name}: {len(dataset.calculus_topics)} topics, {len(dataset.rows)} rationale rows, "
+              f"{len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
+        if args.no_export:
+            return
+
+    with Store(db_file) as store:
+        graph = store.export_graph()
+    print(f"Writing {GRAPH_DATA_FILE} from {db_file.name}...")
+    write_artifacts(graph, base_path)
+    print(f"  {len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
+
+
+if __name__ == '__main__':
+    main()
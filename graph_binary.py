@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Binary, mmap-able copy of graph_data.json.
+
+graph_data.bin holds the same graph as graph_data.json, laid out so a
+reader can map the file and look at a few nodes without parsing the rest:
+
+    header      MAGIC, version, section count, then (offset, length) of
+                every section in SECTIONS order (little-endian, 8-aligned)
+    strings     offset-indexed string table: SECTION 'string_offsets' has
+                n + 1 uint64 offsets into the UTF-8 bytes of 'string_data'
+    nodes       one NODE_RECORD per node: id, topicCode and label (string
+                ids), number_id, x, y, the node's other fields as a JSON
+                string id, and its ranges of associations and categories
+    node_ids, node_topic_codes
+                node indexes sorted by the UTF-8 bytes of id / topicCode,
+                for binary search
+    edges       (source, target) string id pairs
+    assoc_*     one slot per rationale association, as in graph_model:
+                node, category, CS topic, Strength, text and item layout
+    *_names     string ids of the categories, CS topics, texts and item
+                key layouts the association arrays refer to
+    meta        JSON: top-level key order and fields, non-standard item keys
+
+Opening a file only reads the header; node records, strings and
+association slots are read through memoryview/struct when asked for, so
+opening a large graph costs the same as opening a small one.
+graph_data.json stays the exchange format: the data scripts write both
+(artifacts.py), and --export turns a binary file back into JSON.
+
+Usage:
+    python3 graph_binary.py                  # build graph_data.bin from graph_data.json
+    python3 graph_binary.py --node Der1      # show a node (id or topic code) from graph_data.bin
+    python3 graph_binary.py --export out.json
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from graph_io import load_graph, rationale_id, write_graph
+from graph_model import NO_ID, NO_STRENGTH, GraphModel, Interner
+from ingest import BASE_PATH, GRAPH_DATA_FILE
+
+GRAPH_BINARY_FILE = 'graph_data.bin'
+MAGIC = b'CALCGRPH'
+BINARY_VERSION = 1
+
+HEADER = struct.Struct('<8sII')
+SECTION_ENTRY = struct.Struct('<QQ')
+# id, topicCode, number_id, label, x, y, fields, associations [start, stop), categories [start, stop)
+NODE_RECORD = struct.Struct('<IIiIddIIIII')
+EDGE_RECORD = struct.Struct('<II')
+
+# Section name -> array typecode of its items (None: raw bytes)
+SECTIONS = (
+    ('string_offsets', 'Q'),
+    ('string_data', None),
+    ('nodes', None),
+    ('node_categories', 'H'),
+    ('node_ids', 'I'),
+    ('node_topic_codes', 'I'),
+    ('edges', None),
+    ('category_names', 'I'),
+    ('cs_topic_names', 'I'),
+    ('text_names', 'I'),
+    ('layout_names', 'I'),
+    ('assoc_node', 'I'),
+    ('assoc_category', 'H'),
+    ('assoc_cs_topic', 'I'),
+    ('assoc_strength', 'h'),
+    ('assoc_text', 'i'),
+    ('assoc_layout', 'H'),
+    ('meta', None),
+)
+
+NO_STRING = 0xFFFFFFFF
+NO_NUMBER = -(1 << 31)
+ALIGN = 8
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _sorted_nodes(strings, string_ids):
+    """Node indexes that have a string, sorted by its UTF-8 bytes"""
+    keyed = [(strings[string_id].encode('utf-8'), index)
+             for index, string_id in enumerate(string_ids) if string_id != NO_STRING]
+    return array('I', (index for _, index in sorted(keyed)))
+
+
+def _has_plain_edges(edges):
+    return all(list(edge) == ['source', 'target'] and isinstance(edge['source'], str)
+               and isinstance(edge['target'], str) for edge in edges)
+
+
+def build_binary_graph(graph):
+    """The bytes of the binary form of a graph dict (load_graph() shape) or GraphModel"""
+    model = graph if isinstance(graph, GraphModel) else GraphModel.from_graph(graph)
+    strings = Interner()
+
+    def string_id(value):
+        return strings.intern(value) if isinstance(value, str) else NO_STRING
+
+    nodes = bytearray()
+    node_categories = array('H')
+    id_strings = []
+    code_strings = []
+    for node in model.nodes:
+        fields = node.fields
+        number_id = fields.get('number_id')
+        if not isinstance(number_id, int) or isinstance(number_id, bool) or not NO_NUMBER < number_id < 1 << 31:
+            number_id = NO_NUMBER
+        x, y = (fields.get(key) for key in ('x', 'y'))
+        id_strings.append(string_id(node.id))
+        code_strings.append(string_id(node.topic_code))
+        categories_start = len(node_categories)
+        node_categories.extend(node.categories)
+        nodes += NODE_RECORD.pack(
+            id_strings[-1], code_strings[-1], number_id, string_id(fields.get('label')),
+            x if isinstance(x, float) else math.nan, y if isinstance(y, float) else math.nan,
+            strings.intern(json.dumps(fields, ensure_ascii=False, separators=(',', ':'))),
+            node.start, node.stop, categories_start, len(node_categories),
+        )
+
+    edges = model.graph_fields.get('edges') or []
+    meta = {
+        'graph_keys': list(model.graph_fields),
+        'graph_fields': {key: value for key, value in model.graph_fields.items() if key not in ('nodes', 'edges')},
+        'item_extras': {str(index): extra for index, extra in model.extras.items()},
+    }
+    edge_records = bytearray()
+    if _has_plain_edges(edges):
+        for edge in edges:
+            edge_records += EDGE_RECORD.pack(strings.intern(edge['source']), strings.intern(edge['target']))
+    else:
+        meta['edges'] = edges
+
+    name_tables = {
+        'category_names': array('I', map(strings.intern, model.categories.values)),
+        'cs_topic_names': array('I', map(strings.intern, model.cs_topics.values)),
+        'text_names': array('I', map(strings.intern, model.texts.values)),
+        'layout_names': array('I', (strings.intern(json.dumps(list(layout), ensure_ascii=False))
+                                    for layout in model.layouts.values)),
+    }
+
+    encoded = [value.encode('utf-8') for value in strings.values]
+    offsets = array('Q', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    contents = {
+        'string_offsets': _little_endian(offsets),
+        'string_data': b''.join(encoded),
+        'nodes': bytes(nodes),
+        'node_categories': _little_endian(node_categories),
+        'node_ids': _little_endian(_sorted_nodes(strings, id_strings)),
+        'node_topic_codes': _little_endian(_sorted_nodes(strings, code_strings)),
+        'edges': bytes(edge_records),
+        'assoc_node': _little_endian(model.node_index),
+        'assoc_category': _little_endian(model.category_ids),
+        'assoc_cs_topic': _little_endian(model.cs_topic_ids),
+        'assoc_strength': _little_endian(model.strengths),
+        'assoc_text': _little_endian(model.text_ids),
+        'assoc_layout': _little_endian(model.layout_ids),
+        'meta': json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+    }
+    contents.update((name, _little_endian(values)) for name, values in name_tables.items())
+
+    offset = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    directory = []
+    body = bytearray()
+    for name, _ in SECTIONS:
+        padding = -offset % ALIGN
+        body += b'\0' * padding
+        offset += padding
+        directory.append(SECTION_ENTRY.pack(offset, len(contents[name])))
+        body += contents[name]
+        offset += len(contents[name])
+    return HEADER.pack(MAGIC, BINARY_VERSION, len(SECTIONS)) + b''.join(directory) + bytes(body)
+
+
+def write_binary_graph(graph, filepath):
+    """Write the binary form of a graph to filepath, replacing it atomically"""
+    filepath = Path(filepath)
+    tmp = filepath.with_name(filepath.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(build_binary_graph(graph))
+    os.replace(tmp, filepath)
+    return filepath
+
+
+class BinaryNode:
+    """Lazy view of one node record of a BinaryGraph"""
+
+    __slots__ = ('graph', 'index', '_record')
+
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+        self._record = NODE_RECORD.unpack_from(graph._nodes, index * NODE_RECORD.size)
+
+    @property
+    def id(self):
+        return self.graph.string(self._record[0])
+
+    @property
+    def topic_code(self):
+        return self.graph.string(self._record[1])
+
+    @property
+    def number_id(self):
+        number_id = self._record[2]
+        return None if number_id == NO_NUMBER else number_id
+
+    @property
+    def label(self):
+        return self.graph.string(self._record[3])
+
+    @property
+    def position(self):
+        """(x, y), or None when the node has no float position"""
+        x, y = self._record[4:6]
+        return None if math.isnan(x) or math.isnan(y) else (x, y)
+
+    @property
+    def associations(self):
+        """Range of the node's association indexes"""
+        return range(self._record[7], self._record[8])
+
+    def fields(self):
+        """The node's JSON fields, with 'rationales' (if present) as null or []"""
+        return json.loads(self.graph.string(self._record[6]))
+
+    def rationales(self):
+        """The node's rationales dict, as load_graph() has it"""
+        graph = self.graph
+        rationales = {graph.category(category_id): []
+                      for category_id in graph._node_categories[self._record[9]:self._record[10]]}
+        for association in self.associations:
+            rationales[graph.category(graph._assoc['assoc_category'][association])].append(graph.item(association))
+        return rationales
+
+    def to_dict(self):
+        """The node dict, as load_graph() has it"""
+        node = self.fields()
+        if node.get('rationales') == []:
+            node['rationales'] = self.rationales()
+        return node
+
+    def __repr__(self):
+        return f'BinaryNode({self.id!r}, topic_code={self.topic_code!r}, associations={len(self.associations)})'
+
+
+class BinaryGraph:
+    """Read-only, memory-mapped view of a graph_data.bin file"""
+
+    def __init__(self, filepath=None):
+        filepath = Path(filepath or BASE_PATH / GRAPH_BINARY_FILE)
+        if not filepath.exists():
+            raise FileNotFoundError(f"{filepath} not found; run graph_binary.py first")
+        with open(filepath, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        magic, version, count = HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filepath} is not a binary graph")
+        if version != BINARY_VERSION or count != len(SECTIONS):
+            self.close()
+            raise ValueError(f"{filepath} has binary graph version {version}, expected {BINARY_VERSION}")
+
+        self._sections = {}
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(self._view, HEADER.size + i * SECTION_ENTRY.size)
+            section = self._view[offset:offset + length]
+            if typecode is not None:
+                section = section.cast(typecode)
+                if sys.byteorder == 'big':
+                    section = array(typecode, section)
+                    section.byteswap()
+            self._sections[name] = section
+        self._offsets = self._sections['string_offsets']
+        self._strings = self._sections['string_data']
+        self._nodes = self._sections['nodes']
+        self._node_categories = self._sections['node_categories']
+        self._assoc = {name: section for name, section in self._sections.items() if name.startswith('assoc_')}
+        self._meta = None
+        self._layouts = {}
+
+    def close(self):
+        # The mapping can only be closed once no memoryview of it is left
+        for section in getattr(self, '_sections', {}).values():
+            if isinstance(section, memoryview):
+                section.release()
+        self._sections = {}
+        self._assoc = {}
+        self._offsets = self._strings = self._nodes = self._node_categories = None
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        """Number of nodes"""
+        return len(self._nodes) // NODE_RECORD.size
+
+    @property
+    def association_count(self):
+        return len(self._assoc['assoc_node'])
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = json.loads(bytes(self._sections['meta']))
+        return self._meta
+
+    def _string_bytes(self, string_id):
+        return bytes(self._strings[self._offsets[string_id]:self._offsets[string_id + 1]])
+
+    def string(self, string_id):
+        if string_id == NO_STRING:
+            return None
+        return self._string_bytes(string_id).decode('utf-8')
+
+    def category(self, category_id):
+        return self.string(self._sections['category_names'][category_id])
+
+    def node(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return BinaryNode(self, index)
+
+    def nodes(self):
+        return (BinaryNode(self, index) for index in range(len(self)))
+
+    def _search(self, section, field, value):
+        """Indexes of the nodes whose string field equals value, by binary search over section"""
+        order = self._sections[section]
+        target = value.encode('utf-8')
+
+        def key(position):
+            return self._string_bytes(NODE_RECORD.unpack_from(self._nodes, order[position] * NODE_RECORD.size)[field])
+
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        matches = []
+        while lo < len(order) and key(lo) == target:
+            matches.append(order[lo])
+            lo += 1
+        return sorted(matches)
+
+    def find(self, node_id):
+        """The node with this id, or None"""
+        matches = self._search('node_ids', 0, node_id)
+        return BinaryNode(self, matches[0]) if matches else None
+
+    def find_topic(self, topic_code):
+        """The nodes with this topic code, in graph order"""
+        return [BinaryNode(self, index) for index in self._search('node_topic_codes', 1, topic_code)]
+
+    def item(self, association):
+        """The rationale item dict of one association, as load_graph() has it"""
+        assoc = self._assoc
+        text_id = assoc['assoc_text'][association]
+        text = None if text_id == NO_ID else self.string(self._sections['text_names'][text_id])
+        extra = self.meta['item_extras'].get(str(association), {}) if self.meta['item_extras'] else {}
+        layout_id = assoc['assoc_layout'][association]
+        if layout_id not in self._layouts:
+            self._layouts[layout_id] = json.loads(self.string(self._sections['layout_names'][layout_id]))
+        item = {}
+        for key in self._layouts[layout_id]:
+            if key in extra:
+                item[key] = extra[key]
+            elif key == 'cs_topic':
+                item[key] = self.string(self._sections['cs_topic_names'][assoc['assoc_cs_topic'][association]])
+            elif key == 'strength':
+                strength = assoc['assoc_strength'][association]
+                item[key] = None if strength == NO_STRENGTH else strength
+            elif key == 'rationale':
+                item[key] = text
+            else:
+                item[key] = rationale_id(text)
+        return item
+
+    def edges(self):
+        """(source, target) node id pairs, in order"""
+        if 'edges' in self.meta:
+            for edge in self.meta['edges']:
+                yield edge.get('source'), edge.get('target')
+            return
+        for source, target in EDGE_RECORD.iter_unpack(self._sections['edges']):
+            yield self.string(source), self.string(target)
+
+    def to_graph(self):
+        """The whole graph dict, in the shape and key order load_graph() returns"""
+        meta = self.meta
+        graph = {}
+        for key in meta['graph_keys']:
+            if key == 'nodes':
+                graph[key] = [node.to_dict() for node in self.nodes()]
+            elif key == 'edges':
+                graph[key] = meta['edges'] if 'edges' in meta else [
+                    {'source': source, 'target': target} for source, target in self.edges()]
+            else:
+                graph[key] = meta['graph_fields'][key]
+        return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build graph_data.bin, or read a node or the whole graph from it')
+    parser.add_argument('--bin', help=f'binary graph path (default: {GRAPH_BINARY_FILE} next to this script)')
+    parser.add_argument('--node', metavar='ID', help='show the node with this id or topic code')
+    parser.add_argument('--export', metavar='PATH', help='write the binary graph back out as graph_data.json format')
+    args = parser.parse_args()
+
+    base_path = BASE_PATH
+    bin_file = Path(args.bin or base_path / GRAPH_BINARY_FILE)
+
+    if args.node or args.export:
+        with BinaryGraph(bin_file) as graph:
+            if args.node:
+                node = graph.find(args.node)
+                for node in [node] if node else graph.find_topic(args.node):
+                    print(f"{node.id}  {node.topic_code or '-'}  {node.label}")
+                    for category, items in node.rationales().items():
+                        for item in items:
+                            print(f"  {category}: {item.get('cs_topic')} ({item.get('strength')})")
+            if args.export:
+                write_graph(graph.to_graph(), args.export)
+                print(f"Wrote {args.export} from {bin_file.name}")
+        return
+
+    graph = load_graph(base_path / GRAPH_DATA_FILE)
+    write_binary_graph(graph, bin_file)
+    print(f"Wrote {bin_file.name} ({bin_file.stat().st_size} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Reading and writing graph_data.json.
+
+Rationale paragraphs are stored once in a content-addressed string table
+(graph['rationale_texts'], id -> text) and node rationale items refer to
+them by 'rationale_id'. A topic code shared by several nodes therefore
+ships its text only once.
+
+load_graph() resolves the ids back into each item's 'rationale' text so the
+data scripts keep working on the familiar in-memory shape; write_graph()
+rebuilds the table from whatever texts the items carry.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+RATIONALE_TABLE_KEY = 'rationale_texts'
+RATIONALE_ID_LENGTH = 12
+
+
+def rationale_id(text):
+    """Content address of a rationale text"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:RATIONALE_ID_LENGTH]
+
+
+def _iter_items(graph):
+    for node in graph.get('nodes', []):
+        for items in (node.get('rationales') or {}).values():
+            yield from items
+
+
+def pack_rationales(graph):
+    """Return a copy of graph with rationale texts moved into the string table
+
+    Items keep every other field; 'rationale' is replaced by 'rationale_id'.
+    """
+    table = {}
+    packed_nodes = []
+    for node in graph.get('nodes', []):
+        packed_node = dict(node)
+        if node.get('rationales'):
+            packed_node['rationales'] = {}
+            for category, items in node['rationales'].items():
+                packed_items = []
+                for item in items:
+                    packed_item = {key: value for key, value in item.items() if key not in ('rationale', 'rationale_id')}
+                    text = item.get('rationale')
+                    if text is None and item.get('rationale_id') is not None:
+                        # Never resolved, keep the existing reference
+                        packed_item['rationale_id'] = item['rationale_id']
+                    else:
+                        text = text or ''
+                        text_id = rationale_id(text)
+                        if table.get(text_id, text) != text:
+                            raise ValueError(f"rationale id collision on {text_id}")
+                        table[text_id] = text
+                        packed_item['rationale_id'] = text_id
+                    packed_items.append(packed_item)
+                packed_node['rationales'][category] = packed_items
+        packed_nodes.append(packed_node)
+
+    packed = {key: value for key, value in graph.items() if key != RATIONALE_TABLE_KEY}
+    packed['nodes'] = packed_nodes
+    packed[RATIONALE_TABLE_KEY] = table
+    return packed
+
+
+def unpack_rationales(graph):
+    """Resolve rationale ids to texts in place and drop the string table
+
+    Items keep their 'rationale_id' next to the resolved 'rationale', so
+    callers can compare ids instead of full strings. Graphs written before
+    the table existed (inline texts only) load unchanged.
+    """
+    table = graph.pop(RATIONALE_TABLE_KEY, None) or {}
+    for item in _iter_items(graph):
+        text_id = item.get('rationale_id')
+        if 'rationale' not in item and text_id is not None:
+            item['rationale'] = table.get(text_id, '')
+    return graph
+
+
+def load_graph(filepath):
+    """Load graph_data.json with rationale texts resolved"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return unpack_rationales(json.load(f))
+
+
+def write_graph(graph, filepath):
+    """Write graph_data.json with rationale texts deduplicated into the string table
+
+    The file is written to a temporary name and renamed into place, so a
+    failed run never leaves a half-written graph behind.
+    """
+    filepath = Path(filepath)
+    tmp = filepath.with_name(filepath.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(pack_rationales(graph), f, indent=2, ensure_ascii=False)
+    os.replace(tmp, filepath)
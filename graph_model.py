@@ -0,0 +1,258 @@
+"""
+Compact in-memory graph model for the Python tooling.
+
+load_graph() gives every rationale association its own dict (cs_topic,
+strength, rationale, rationale_id) with its own copies of the keys and
+strings. GraphModel keeps the same data as:
+
+- Interner tables for categories, CS topics, rationale texts and item key
+  layouts, so each distinct string is stored once and referred to by an
+  integer id (rationale ids are recomputed from the text, see graph_io);
+- parallel typed arrays (array module) with one slot per association:
+  node index, category id, CS topic id, Strength, text id and layout id,
+  18 bytes each instead of a dict of several hundred;
+- one Node record (__slots__) per node, holding the node's other JSON
+  fields and the range of its associations, which are stored in node order
+  and, within a node, in the order of its rationales dict.
+
+GraphModel.from_graph() and to_graph() convert from and to the dict shape
+of load_graph(), preserving key order, so write_graph() output is the same.
+"""
+
+from array import array
+
+from graph_io import load_graph, rationale_id
+
+# Strength stored for items without one (missing key or None)
+NO_STRENGTH = -1
+# Range of the 'h' strengths array; other strengths are kept in extras
+MIN_STRENGTH, MAX_STRENGTH = -2 ** 15, 2 ** 15 - 1
+NO_ID = -1
+
+
+class Interner:
+    """Two-way mapping between distinct values and dense integer ids"""
+
+    __slots__ = ('values', 'ids')
+
+    def __init__(self, values=()):
+        self.values = []
+        self.ids = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value):
+        if self.ids is None:
+            self.ids = {value: value_id for value_id, value in enumerate(self.values)}
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def get(self, value, default=NO_ID):
+        if self.ids is None:
+            self.ids = {value: value_id for value_id, value in enumerate(self.values)}
+        return self.ids.get(value, default)
+
+    def compact(self):
+        """Drop the value -> id index (rebuilt by the next intern() or get())"""
+        self.ids = None
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class Node:
+    """One graph node: its JSON fields and the range [start, stop) of its associations"""
+
+    __slots__ = ('index', 'id', 'topic_code', 'fields', 'start', 'stop', 'categories')
+
+    def __init__(self, index, fields, start, stop, categories):
+        self.index = index
+        self.id = fields.get('id')
+        self.topic_code = fields.get('topicCode')
+        # The node dict with 'rationales' (if present) set to None, kept for its other fields and key order
+        self.fields = fields
+        self.start = start
+        self.stop = stop
+        # Category ids in the order of the node's rationales dict, including empty ones
+        self.categories = categories
+
+    def __repr__(self):
+        return f'Node({self.id!r}, topic_code={self.topic_code!r}, associations={self.stop - self.start})'
+
+
+class Rationale:
+    """A view of one association of a GraphModel"""
+
+    __slots__ = ('model', 'index')
+
+    def __init__(self, model, index):
+        self.model = model
+        self.index = index
+
+    @property
+    def node(self):
+        return self.model.nodes[self.model.node_index[self.index]]
+
+    @property
+    def category(self):
+        return self.model.categories[self.model.category_ids[self.index]]
+
+    @property
+    def cs_topic(self):
+        return self.model.cs_topics[self.model.cs_topic_ids[self.index]]
+
+    @property
+    def strength(self):
+        extra = self.model.extras.get(self.index)
+        if extra and 'strength' in extra:
+            return extra['strength']
+        strength = self.model.strengths[self.index]
+        return None if strength == NO_STRENGTH else strength
+
+    @property
+    def rationale(self):
+        text_id = self.model.text_ids[self.index]
+        return None if text_id == NO_ID else self.model.texts[text_id]
+
+    def to_dict(self):
+        return self.model.item_dict(self.index)
+
+    def __repr__(self):
+        return f'Rationale({self.category!r}, {self.cs_topic!r}, strength={self.strength!r})'
+
+
+class GraphModel:
+    """Interned, array-backed form of a loaded graph (see the module docstring)"""
+
+    # Item keys stored in the arrays; any others are kept per association in extras
+    ITEM_KEYS = ('cs_topic', 'strength', 'rationale_id', 'rationale')
+
+    def __init__(self):
+        self.categories = Interner()
+        self.cs_topics = Interner()
+        self.texts = Interner()
+        self.layouts = Interner()
+        self.nodes = []
+        self.node_index = array('I')
+        self.category_ids = array('H')
+        self.cs_topic_ids = array('I')
+        self.strengths = array('h')
+        self.text_ids = array('i')
+        self.layout_ids = array('H')
+        # Association index -> {key: value} for item keys outside ITEM_KEYS, for
+        # the rare 'rationale_id' that is not the content address of the text, and
+        # for strengths the 'h' array can't hold
+        self.extras = {}
+        # Top-level graph fields with 'nodes' set to None, for key order and the edges
+        self.graph_fields = {}
+
+    @classmethod
+    def from_graph(cls, graph):
+        model = cls()
+        model.graph_fields = {key: (None if key == 'nodes' else value) for key, value in graph.items()}
+        for node in graph.get('nodes', []):
+            model.add_node(node)
+        # Rationale texts are nearly all distinct; their index would cost more than the arrays
+        model.texts.compact()
+        return model
+
+    @classmethod
+    def load(cls, filepath):
+        return cls.from_graph(load_graph(filepath))
+
+    def add_node(self, node):
+        """Append a node dict (in load_graph() shape) and its associations"""
+        start = len(self.node_index)
+        index = len(self.nodes)
+        categories = []
+        rationales = node.get('rationales')
+        for category, items in (rationales or {}).items():
+            category_id = self.categories.intern(category)
+            categories.append(category_id)
+            for item in items:
+                self._add_item(index, category_id, item)
+        fields = dict(node)
+        if 'rationales' in fields:
+            # None and {} both round-trip; keep which one it was
+            fields['rationales'] = None if rationales is None else ()
+        self.nodes.append(Node(index, fields, start, len(self.node_index), categories))
+
+    def _add_item(self, node_index, category_id, item):
+        association = len(self.node_index)
+        self.node_index.append(node_index)
+        self.category_ids.append(category_id)
+        self.cs_topic_ids.append(self.cs_topics.intern(item.get('cs_topic', '')))
+        strength = item.get('strength')
+        fits = (type(strength) is int and strength != NO_STRENGTH
+                and MIN_STRENGTH <= strength <= MAX_STRENGTH)
+        self.strengths.append(strength if fits else NO_STRENGTH)
+        text = item.get('rationale')
+        self.text_ids.append(NO_ID if text is None else self.texts.intern(text))
+        self.layout_ids.append(self.layouts.intern(tuple(item)))
+        extra = {key: value for key, value in item.items() if key not in self.ITEM_KEYS}
+        if strength is not None and not fits:
+            # Out of range, -1 or not an int: the array slot can't hold it
+            extra['strength'] = strength
+        text_id = item.get('rationale_id')
+        if text_id is not None and (text is None or text_id != rationale_id(text)):
+            extra['rationale_id'] = text_id
+        if extra:
+            self.extras[association] = extra
+
+    def __len__(self):
+        """Number of associations"""
+        return len(self.node_index)
+
+    def rationales(self, node):
+        """Rationale views of one Node, in order"""
+        return [Rationale(self, i) for i in range(node.start, node.stop)]
+
+    def item_dict(self, association):
+        """The rationale item dict of one association, as load_graph() has it"""
+        extra = self.extras.get(association, {})
+        text = None if self.text_ids[association] == NO_ID else self.texts[self.text_ids[association]]
+        item = {}
+        for key in self.layouts[self.layout_ids[association]]:
+            if key in extra:
+                item[key] = extra[key]
+            elif key == 'cs_topic':
+                item[key] = self.cs_topics[self.cs_topic_ids[association]]
+            elif key == 'strength':
+                strength = self.strengths[association]
+                item[key] = None if strength == NO_STRENGTH else strength
+            elif key == 'rationale':
+                item[key] = text
+            else:
+                item[key] = rationale_id(text)
+        return item
+
+    def node_dict(self, node):
+        """The node dict of one Node, as load_graph() has it"""
+        fields = dict(node.fields)
+        if 'rationales' in fields:
+            if fields['rationales'] is None:
+                return fields
+            rationales = {self.categories[category_id]: [] for category_id in node.categories}
+            for i in range(node.start, node.stop):
+                rationales[self.categories[self.category_ids[i]]].append(self.item_dict(i))
+            fields['rationales'] = rationales
+        return fields
+
+    def to_graph(self):
+        """The graph dict, in the shape and key order load_graph() returns"""
+        graph = dict(self.graph_fields)
+        if 'nodes' in graph:
+            graph['nodes'] = [self.node_dict(node) for node in self.nodes]
+        return graph
+
+    def memory_bytes(self):
+        """Bytes held by the association arrays (not counting the interned strings)"""
+        arrays = (self.node_index, self.category_ids, self.cs_topic_ids, self.strengths,
+                  self.text_ids, self.layout_ids)
+        return sum(a.itemsize * len(a) for a in arrays)
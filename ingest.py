@@ -0,0 +1,336 @@
+"""
+Shared CSV ingestion for the data scripts.
+
+Reads the Calculus topic list and every category rationale CSV once into a
+single in-memory model keyed by topic code. convert_data.py,
+fix_all_topic_codes.py, fix_duplicate_rationales.py and verify_sync.py all
+load their data through here, so they parse and match calculus topic names
+the same way.
+
+The category CSVs are listed in categories.json as [[file name, category],
+...]; a directory without one uses every file matching
+CATEGORY_FILE_PATTERN. Adding a CS discipline means adding its CSV and one
+manifest line. When the CSVs are large they are parsed and normalized on a
+process pool, one file per worker, and merged back in manifest order.
+"""
+
+import csv
+import json
+import math
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+BASE_PATH = Path(__file__).parent
+
+CALCULUS_LIST_FILE = 'Calculus topic list-Table 1.csv'
+GRAPH_DATA_FILE = 'graph_data.json'
+
+CATEGORY_MANIFEST_FILE = 'categories.json'
+
+# Category CSVs picked up when a directory has no categories.json; the
+# category is named after the file prefix
+CATEGORY_FILE_PATTERN = '*-Calc-Table 1.csv'
+CATEGORY_FILE_SUFFIX = '-Calc-Table 1.csv'
+CATEGORY_NAMES = {
+    'ML': 'Machine Learning',
+    'Alg': 'Algorithms',
+    'AI': 'Artificial Intelligence',
+    'CG': 'Computer Graphics',
+}
+
+# Below this many bytes of category CSVs, starting a process pool costs more
+# than parsing everything in this process
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+# Strength used when a row has no usable Strength value
+DEFAULT_STRENGTH = 1
+# Largest Strength kept; graph_model.py stores strengths in signed 16-bit arrays
+MAX_STRENGTH = 32767
+# How many CS topics each node lists in top_cs_topics
+TOP_CS_TOPICS = 5
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+@lru_cache(maxsize=65536)
+def normalize_text(text):
+    """Normalize text for matching (same result as normalizeText in app.js)
+
+    Lowercases, spells out '&' as 'and' and drops everything that is not
+    a-z or 0-9. Quotes and punctuation end up removed just like spaces, so a
+    single regex pass gives the same key as the old multi-step version.
+    """
+    if not text:
+        return ''
+    return _NON_ALNUM.sub('', text.lower().replace('&', 'and'))
+
+
+def _cell(row, column):
+    return (row.get(column) or '').strip()
+
+
+def parse_strength(value):
+    """Parse a Strength cell as a positive integer, at most MAX_STRENGTH
+
+    Blank, non-numeric, fractional, non-finite and non-positive values give
+    DEFAULT_STRENGTH; whole numbers written as floats ('3.0') are accepted.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_STRENGTH
+    if not math.isfinite(number) or not number.is_integer() or number < 1:
+        return DEFAULT_STRENGTH
+    return min(int(number), MAX_STRENGTH)
+
+
+def parse_calculus_csv(filepath):
+    """Parse Calculus topic list CSV into topic_code -> topic_info"""
+    topics = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            topic_code = _cell(row, 'Topic Code')
+            if topic_code:
+                topic_code = sys.intern(topic_code)
+                topics[topic_code] = {
+                    'course': sys.intern(_cell(row, 'Course')),
+                    'coreIdea': sys.intern(_cell(row, 'Core Idea')),
+                    'topicCode': topic_code,
+                    'topicName': _cell(row, 'Topic Name'),
+                }
+    return topics
+
+
+def iter_rationales_csv(filepath, category_name):
+    """Yield the usable rows of a category rationales CSV one at a time"""
+    category_name = sys.intern(category_name)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            calc_topic = _cell(row, 'Calculus topic')
+            cs_topic = _cell(row, 'CS topic')
+            rationale = _cell(row, 'Rationale')
+
+            if calc_topic and cs_topic and rationale:
+                yield {
+                    'calc_topic': sys.intern(calc_topic),
+                    'cs_topic': sys.intern(cs_topic),
+                    'rationale': rationale,
+                    'strength': parse_strength(_cell(row, 'Strength')),
+                    'category': category_name,
+                }
+
+
+def parse_rationales_csv(filepath, category_name):
+    """Parse a category rationales CSV (ML-Calc, Alg-Calc, etc.) into a list of rows"""
+    return list(iter_rationales_csv(filepath, category_name))
+
+
+class Dataset:
+    """Calculus topics plus every category's rationale rows, indexed by topic code
+
+    Attributes:
+        calculus_topics: topic_code -> {'course', 'coreIdea', 'topicCode', 'topicName'}
+        topic_code_by_name: normalized topic name -> topic_code
+        rows_by_category: category -> list of rows in file order; each row
+            carries 'calc_topic', 'cs_topic', 'rationale', 'strength',
+            'category' and the resolved 'topic_code' (None when the calculus
+            topic is unknown)
+        rows: all rows, categories in categories.json order
+        by_topic_code: topic_code -> {category -> [{'cs_topic', 'rationale', 'strength'}]}
+        by_name: normalized calculus topic -> {category -> [{'cs_topic', 'rationale', 'strength'}]}
+    """
+
+    def __init__(self, calculus_topics, rows_by_category, calc_keys=None):
+        """calc_keys optionally gives, per category, normalize_text of each row's calculus topic"""
+        self.calculus_topics = calculus_topics
+        self.topic_code_by_name = {
+            normalize_text(info['topicName']): code
+            for code, info in calculus_topics.items()
+        }
+        self.rows_by_category = rows_by_category
+        self.rows = []
+        self.by_topic_code = {}
+        self.by_name = {}
+
+        for category, rows in rows_by_category.items():
+            keys = calc_keys[category] if calc_keys else map(normalize_text, (row['calc_topic'] for row in rows))
+            for row, normalized in zip(rows, keys):
+                topic_code = self.topic_code_by_name.get(normalized)
+                row['topic_code'] = topic_code
+                self.rows.append(row)
+
+                item = {
+                    'cs_topic': row['cs_topic'],
+                    'rationale': row['rationale'],
+                    'strength': row['strength'],
+                }
+                self.by_name.setdefault(normalized, {}).setdefault(category, []).append(item)
+                if topic_code:
+                    self.by_topic_code.setdefault(topic_code, {}).setdefault(category, []).append(item)
+
+    @property
+    def categories(self):
+        return list(self.rows_by_category.keys())
+
+    def unmatched_rows(self):
+        """Rows whose calculus topic name is not in the Calculus topic list"""
+        return [row for row in self.rows if not row['topic_code']]
+
+    def node_rationales(self, topic_code):
+        """Fresh {category -> [items]} for a node, safe to mutate per node"""
+        return {
+            category: list(items)
+            for category, items in self.by_topic_code.get(topic_code, {}).items()
+        }
+
+
+def strength_aggregates(rationales, top_k=TOP_CS_TOPICS):
+    """Weighted strength totals for one node's {category -> [items]} rationales
+
+    Returns (strength_by_category, strength_by_cs_topic, top_cs_topics), where
+    top_cs_topics lists the top_k [category, cs_topic, strength] triples,
+    strongest first.
+    """
+    by_category = {}
+    by_cs_topic = {}
+    for category, items in rationales.items():
+        topics = {}
+        for item in items:
+            cs_topic = (item.get('cs_topic') or '').strip()
+            if not cs_topic:
+                continue
+            strength = item.get('strength') or DEFAULT_STRENGTH
+            topics[cs_topic] = topics.get(cs_topic, 0) + strength
+        if topics:
+            by_category[category] = sum(topics.values())
+            by_cs_topic[category] = topics
+
+    ranked = sorted(
+        ((category, cs_topic, strength)
+         for category, topics in by_cs_topic.items()
+         for cs_topic, strength in topics.items()),
+        key=lambda entry: -entry[2]
+    )
+    top = [list(entry) for entry in ranked[:top_k]]
+    return by_category, by_cs_topic, top
+
+
+def refresh_node_summary(node):
+    """Recompute cs_categories and the strength aggregates after node['rationales'] changed"""
+    rationales = node.get('rationales') or {}
+    node['cs_categories'] = list(rationales.keys())
+    by_category, by_cs_topic, top = strength_aggregates(rationales)
+    node['strength_by_category'] = by_category
+    node['strength_by_cs_topic'] = by_cs_topic
+    node['top_cs_topics'] = top
+
+
+def discover_category_files(base_path=None):
+    """(path, category) for every category CSV, in a stable order
+
+    Uses categories.json when base_path has one; otherwise every file matching
+    CATEGORY_FILE_PATTERN, sorted by name. A file listed in categories.json
+    that does not exist is an error, so a typo cannot drop a whole category.
+    """
+    base_path = Path(base_path or BASE_PATH)
+    manifest = base_path / CATEGORY_MANIFEST_FILE
+    if manifest.exists():
+        with open(manifest, 'r', encoding='utf-8') as f:
+            entries = [(base_path / filename, category) for filename, category in json.load(f)]
+    else:
+        entries = []
+        for path in sorted(base_path.glob(CATEGORY_FILE_PATTERN)):
+            prefix = path.name[:-len(CATEGORY_FILE_SUFFIX)]
+            entries.append((path, CATEGORY_NAMES.get(prefix, prefix)))
+
+    categories = [category for _, category in entries]
+    duplicates = sorted({category for category in categories if categories.count(category) > 1})
+    if duplicates:
+        raise ValueError(f"categories listed more than once: {', '.join(duplicates)}")
+    missing = [path.name for path, _ in entries if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"{CATEGORY_MANIFEST_FILE} lists missing files: {', '.join(missing)}")
+    return entries
+
+
+def source_files(base_path=None):
+    """Calculus list path plus (path, category) for each category CSV"""
+    base_path = Path(base_path or BASE_PATH)
+    return base_path / CALCULUS_LIST_FILE, discover_category_files(base_path)
+
+
+def _parse_category(source):
+    path, category = source
+    rows = parse_rationales_csv(path, category)
+    return rows, [normalize_text(row['calc_topic']) for row in rows]
+
+
+def parse_category_files(category_files, workers=None):
+    """Parse and normalize category CSVs; returns (rows_by_category, calc_keys)
+
+    Uses a process pool of up to one worker per file once the files add up to
+    PARALLEL_MIN_BYTES, so the time is about that of the largest file.
+    Results always come back in category_files order, with their repeated
+    strings interned in this process as parse_rationales_csv() does.
+    """
+    if workers is None:
+        workers = min(len(category_files), os.cpu_count() or 1)
+    total_bytes = sum(path.stat().st_size for path, _ in category_files)
+
+    parsed = None
+    if workers > 1 and total_bytes >= PARALLEL_MIN_BYTES:
+        # Largest files first, so a big file never starts last
+        by_size = sorted(category_files, key=lambda source: -source[0].stat().st_size)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = dict(zip(
+                (category for _, category in by_size),
+                pool.map(_parse_category, by_size),
+            ))
+        results = [parsed[category] for _, category in category_files]
+    else:
+        results = [_parse_category(source) for source in category_files]
+
+    rows_by_category = {}
+    calc_keys = {}
+    for (_, category), (rows, keys) in zip(category_files, results):
+        category = sys.intern(category)
+        if parsed is not None:
+            # Unpickled strings are new objects; share them again across files
+            for row in rows:
+                row['calc_topic'] = sys.intern(row['calc_topic'])
+                row['cs_topic'] = sys.intern(row['cs_topic'])
+                row['category'] = category
+            keys = [sys.intern(key) for key in keys]
+        rows_by_category[category] = rows
+        calc_keys[category] = keys
+    return rows_by_category, calc_keys
+
+
+_dataset_cache = {}
+
+
+def load_dataset(base_path=None):
+    """Read and index every source CSV once per process
+
+    Repeated calls with unchanged files return the same Dataset, so stages
+    chained in one process never re-read or re-normalize the CSVs.
+    """
+    calc_list_file, category_files = source_files(base_path)
+    paths = [calc_list_file] + [path for path, _ in category_files]
+    manifest = calc_list_file.parent / CATEGORY_MANIFEST_FILE
+    if manifest.exists():
+        paths.append(manifest)
+    key = tuple((str(path.resolve()), path.stat().st_mtime_ns) for path in paths)
+
+    dataset = _dataset_cache.get(key)
+    if dataset is None:
+        calculus_topics = parse_calculus_csv(calc_list_file)
+        rows_by_category, calc_keys = parse_category_files(category_files)
+        dataset = Dataset(calculus_topics, rows_by_category, calc_keys)
+        _dataset_cache.clear()
+        _dataset_cache[key] = dataset
+    return dataset
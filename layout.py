@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Offline force-directed layout for the concept map.
+
+Runs the same force model as initializeGraph in app.js (link distance 120,
+many-body charge -420, collision radius = node radius + 12, centering,
+alpha decay 0.025, velocity decay 0.4) with NumPy, and stores stable x/y
+coordinates on every node. The page then starts from a settled layout
+instead of simulating ~270 ticks on load, and every visitor sees the same
+positions.
+
+Charge is computed exactly for small graphs. Above GRID_THRESHOLD nodes it
+uses a Barnes–Hut approximation over a quadtree kept as one grid per level
+(O(n log n) per iteration, like d3's own forceManyBody): nodes in
+neighbouring leaf cells interact exactly, and farther cells act through
+their centre of mass.
+
+Coordinates are centred on (0, 0); app.js offsets them to the middle of the
+chart.
+
+The layout only depends on the node ids and edges, so apply_layout() keeps
+the last positions in .build_cache/layout.json under a hash of both and
+reuses them while neither has changed.
+
+Requires NumPy.
+"""
+
+import hashlib
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from build_cache import CACHE_DIR
+from graph_io import load_graph, write_graph
+from ingest import GRAPH_DATA_FILE
+
+# Bumped whenever the simulation changes, so cached positions are recomputed
+LAYOUT_VERSION = 2
+LAYOUT_CACHE_FILE = 'layout.json'
+
+LINK_DISTANCE = 120.0
+CHARGE_STRENGTH = -420.0
+COLLISION_PADDING = 12.0
+ALPHA_MIN = 0.001
+ALPHA_DECAY = 0.025
+VELOCITY_DECAY = 0.4
+GRID_THRESHOLD = 1500
+# About how many nodes share a cell at the finest Barnes–Hut level
+LEAF_SIZE = 1
+# Empty cells around each Barnes–Hut level, as far as a far-cell offset reaches
+FAR_PAD = 3
+NEIGHBOUR_ROWS = ((-1, -1, 1), (0, -1, 1), (1, -1, 1))
+
+
+def node_radii(degrees):
+    """Node radius as computeNodeRadius in app.js draws it on first load"""
+    max_degree = max(int(degrees.max()) if len(degrees) else 0, 1)
+    return 10.0 + degrees / max_degree * 10.0
+
+
+def initial_positions(n):
+    """d3's phyllotaxis arrangement for nodes without a position"""
+    i = np.arange(n, dtype=float)
+    radius = 10.0 * np.sqrt(0.5 + i)
+    angle = i * math.pi * (3.0 - math.sqrt(5.0))
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle)))
+
+
+def _link_force(pos, vel, sources, targets, strengths, bias, alpha):
+    delta = (pos[targets] + vel[targets]) - (pos[sources] + vel[sources])
+    length = np.sqrt((delta ** 2).sum(axis=1))
+    length = np.where(length == 0, 1e-6, length)
+    scale = (length - LINK_DISTANCE) / length * alpha * strengths
+    delta *= scale[:, None]
+    np.add.at(vel, targets, -delta * bias[:, None])
+    np.add.at(vel, sources, delta * (1.0 - bias)[:, None])
+
+
+def _pairwise_charge(pos_a, pos_b, strength, exclude_self=False):
+    """Charge on every point of pos_a from every point of pos_b"""
+    delta = pos_b[None, :, :] - pos_a[:, None, :]
+    dist2 = (delta ** 2).sum(axis=2)
+    dist2 = np.maximum(dist2, 1.0)
+    weight = strength / dist2
+    if exclude_self:
+        np.fill_diagonal(weight, 0.0)
+    return (delta * weight[:, :, None]).sum(axis=1)
+
+
+def _charge_exact(pos, alpha):
+    return _pairwise_charge(pos, pos, CHARGE_STRENGTH * alpha, exclude_self=True)
+
+
+def _cell_pairs(cells, rows):
+    """(i, j) index arrays of every node j in a cell near node i's cell
+
+    rows lists (dx, dy_min, dy_max): node j's cell is dx columns over and
+    dy_min..dy_max rows up from node i's. Nodes are sorted by cell key once;
+    each row of cells is then one contiguous range of the sorted keys, so
+    the cost is proportional to the number of pairs.
+    """
+    cells = cells - cells.min(axis=0) + 1
+    width = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    pairs_i, pairs_j = [], []
+    for dx, dy_min, dy_max in rows:
+        lo = np.searchsorted(keys, keys + (dx * width + dy_min), side='left')
+        counts = np.searchsorted(keys, keys + (dx * width + dy_max), side='right') - lo
+        total = int(counts.sum())
+        if not total:
+            continue
+        starts = np.cumsum(counts) - counts
+        pairs_i.append(np.repeat(np.arange(len(keys)), counts))
+        pairs_j.append(np.repeat(lo - starts, counts) + np.arange(total))
+    if not pairs_i:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return order[np.concatenate(pairs_i)], order[np.concatenate(pairs_j)]
+
+
+def _far_offsets(width):
+    """Flat grid offsets of the far cells of a node, one row per (x, y) parity of its cell
+
+    They are the 6 × 6 children of the 3 × 3 cells around the parent cell,
+    less the node's own 3 × 3 neighbourhood: 27 cells.
+    """
+    table = []
+    for parity_x in (0, 1):
+        for parity_y in (0, 1):
+            table.append([
+                dx * width + dy
+                for dx in range(-2 - parity_x, 4 - parity_x)
+                for dy in range(-2 - parity_y, 4 - parity_y)
+                if abs(dx) > 1 or abs(dy) > 1
+            ])
+    return np.array(table, dtype=np.int64)
+
+
+def _charge_tree(pos, alpha):
+    """Barnes–Hut charge over a quadtree stored as one dense grid per level
+
+    At level L the bounding square is split into 2^L × 2^L cells. A cell
+    acts through its centre of mass on every node whose own cell is not
+    next to it but whose parent cell is next to the cell's parent, so every
+    other node is counted at exactly one level, at a distance of at least
+    one cell width (about d3's theta of 0.9). Nodes in the 3 × 3 cells
+    around a node at the finest level interact exactly. The work per
+    iteration is O(n log n).
+    """
+    n = len(pos)
+    strength = CHARGE_STRENGTH * alpha
+    origin = pos.min(axis=0)
+    size = max(float(np.ptp(pos, axis=0).max()), 1e-6) * (1.0 + 1e-9)
+    levels = max(2, math.ceil(math.log(max(n / LEAF_SIZE, 1.0), 4)))
+
+    force = np.zeros_like(pos)
+    for level in range(2, levels + 1):
+        side = 1 << level
+        cells = np.minimum(((pos - origin) / size * side).astype(np.int64), side - 1)
+        # Cells are padded by FAR_PAD empty cells on every side, so no offset runs off the grid
+        width = side + 2 * FAR_PAD
+        flat = (cells[:, 0] + FAR_PAD) * width + cells[:, 1] + FAR_PAD
+        mass = np.bincount(flat, minlength=width * width).astype(float)
+        occupied = mass > 0
+        centre_x = np.bincount(flat, weights=pos[:, 0], minlength=width * width)
+        centre_y = np.bincount(flat, weights=pos[:, 1], minlength=width * width)
+        centre_x[occupied] /= mass[occupied]
+        centre_y[occupied] /= mass[occupied]
+
+        q = flat[:, None] + _far_offsets(width)[(cells[:, 0] & 1) * 2 + (cells[:, 1] & 1)]
+        dx = centre_x[q] - pos[:, 0:1]
+        dy = centre_y[q] - pos[:, 1:2]
+        # Empty cells have no mass, so whatever their delta is weighs nothing
+        weight = mass[q] / np.maximum(dx * dx + dy * dy, 1.0)
+        force[:, 0] += strength * (dx * weight).sum(axis=1)
+        force[:, 1] += strength * (dy * weight).sum(axis=1)
+
+    # Near field, exact; a node's pull on itself has a zero delta
+    i, j = _cell_pairs(cells, NEIGHBOUR_ROWS)
+    delta = pos[j] - pos[i]
+    weight = strength / np.maximum((delta ** 2).sum(axis=1), 1.0)
+    force[:, 0] += np.bincount(i, delta[:, 0] * weight, minlength=n)
+    force[:, 1] += np.bincount(i, delta[:, 1] * weight, minlength=n)
+    return force
+
+
+def _collide(pos, vel, radii):
+    """One iteration of d3.forceCollide (strength 1) over overlapping pairs"""
+    nxt = pos + vel
+    if len(pos) <= GRID_THRESHOLD:
+        i, j = np.triu_indices(len(pos), k=1)
+    else:
+        # Cells as wide as the largest reach: only the own and the next cells can overlap,
+        # and each unordered pair of cells is visited once
+        cells = np.floor(nxt / (2.0 * radii.max())).astype(np.int64)
+        i, j = _cell_pairs(cells, ((0, 0, 1), (1, -1, 1)))
+        keep = (i < j) | (cells[i] != cells[j]).any(axis=1)
+        i, j = i[keep], j[keep]
+    if not len(i):
+        return
+
+    delta = nxt[i] - nxt[j]
+    dist = np.sqrt((delta ** 2).sum(axis=1))
+    reach = radii[i] + radii[j]
+    overlap = dist < reach
+    if not overlap.any():
+        return
+    i, j, delta, dist, reach = i[overlap], j[overlap], delta[overlap], dist[overlap], reach[overlap]
+    dist = np.where(dist == 0, 1e-6, dist)
+    push = ((reach - dist) / dist)[:, None] * delta
+    ri2, rj2 = radii[i] ** 2, radii[j] ** 2
+    share = (rj2 / (ri2 + rj2))[:, None]
+    np.add.at(vel, i, push * share)
+    np.add.at(vel, j, -push * (1.0 - share))
+
+
+def compute_layout(node_ids, edges, iterations=None):
+    """Run the force simulation and return an (n, 2) array of positions"""
+    n = len(node_ids)
+    if n == 0:
+        return np.zeros((0, 2))
+
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    links = [(index[s], index[t]) for s, t in edges if s in index and t in index]
+    sources = np.array([s for s, _ in links], dtype=np.int64)
+    targets = np.array([t for _, t in links], dtype=np.int64)
+
+    degrees = np.bincount(np.concatenate((sources, targets)), minlength=n).astype(float)
+    link_count = np.maximum(degrees, 1.0)
+    strengths = 1.0 / np.minimum(link_count[sources], link_count[targets]) if links else np.zeros(0)
+    bias = link_count[sources] / (link_count[sources] + link_count[targets]) if links else np.zeros(0)
+    radii = node_radii(degrees) + COLLISION_PADDING
+
+    pos = initial_positions(n)
+    vel = np.zeros_like(pos)
+    if iterations is None:
+        iterations = math.ceil(math.log(ALPHA_MIN) / math.log(1.0 - ALPHA_DECAY))
+
+    alpha = 1.0
+    use_grid = n > GRID_THRESHOLD
+    for _ in range(iterations):
+        alpha += (0.0 - alpha) * ALPHA_DECAY
+        if links:
+            _link_force(pos, vel, sources, targets, strengths, bias, alpha)
+        if use_grid:
+            vel += _charge_tree(pos, alpha)
+        else:
+            vel += _charge_exact(pos, alpha)
+        _collide(pos, vel, radii)
+        vel *= 1.0 - VELOCITY_DECAY
+        pos += vel
+        # forceCenter: translate so the centroid stays at the origin
+        pos -= pos.mean(axis=0)
+
+    return pos
+
+
+def layout_key(node_ids, edges):
+    """Hash of everything compute_layout() depends on"""
+    payload = json.dumps([LAYOUT_VERSION, node_ids, edges], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _load_cached_positions(cache_file, key):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cache.get('positions') if cache.get('key') == key else None
+
+
+def _save_cached_positions(cache_file, key, positions):
+    cache_file.parent.mkdir(exist_ok=True)
+    tmp = cache_file.with_name(cache_file.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'positions': positions}, f, separators=(',', ':'))
+    tmp.replace(cache_file)
+
+
+def apply_layout(graph, base_path=None):
+    """Store x/y (rounded to 0.1) on every node of graph, in place
+
+    With base_path, positions cached in its .build_cache/ for the same node
+    ids and edges are reused instead of running the simulation again.
+    Returns True when the simulation ran.
+    """
+    node_ids = [node['id'] for node in graph['nodes']]
+    edges = [[edge['source'], edge['target']] for edge in graph.get('edges', [])]
+    key = layout_key(node_ids, edges)
+    cache_file = Path(base_path) / CACHE_DIR / LAYOUT_CACHE_FILE if base_path else None
+
+    positions = _load_cached_positions(cache_file, key) if cache_file else None
+    computed = positions is None or len(positions) != len(node_ids)
+    if computed:
+        positions = [[round(x, 1), round(y, 1)] for x, y in compute_layout(node_ids, edges).tolist()]
+        if cache_file:
+            _save_cached_positions(cache_file, key, positions)
+    for node, (x, y) in zip(graph['nodes'], positions):
+        node['x'] = x
+        node['y'] = y
+    return computed
+
+
+def main():
+    base_path = Path(__file__).parent
+    graph_file = base_path / GRAPH_DATA_FILE
+    graph = load_graph(graph_file)
+    apply_layout(graph)
+    write_graph(graph, graph_file)
+    print(f"Laid out {len(graph['nodes'])} nodes and {len(graph.get('edges', []))} edges")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Generate graph_data.json edges from the Mermaid flowchart in
+All_Computer_Science_Topics (3).mmd, and report how they differ from the
+current graph.
+
+The parser reads the file one line at a time and tokenizes each statement in
+a single left-to-right pass, so it stays linear in the size of the chart.
+It understands the flowchart subset the chart uses:
+
+    A(["Label"])                      node declaration (any bracket shape)
+    S@{ label: "L'Hopitals rule" }    node declaration, extended syntax
+    A --> B & C(["Label"]) --> D      chains and & groups (every pair is an edge)
+    -->|text|, ---, ==>, -.->          other link styles, text is ignored
+    A -- text --> B, == text ==>, -. text .->
+                                      link text between the dashes, ignored
+    A:::class, classDef, class, style, linkStyle, click, subgraph/end, %%
+                                      styling and comments, skipped
+
+Node ids resolve to labels, and labels resolve to calculus topic codes
+through the topic_code_map.json rules (using the graph's number_id) and
+TopicMatcher. Declared nodes without edges (the chart title) are not
+compared with the graph.
+
+Usage:
+    python3 mermaid_edges.py            # print the diff against graph_data.json
+    python3 mermaid_edges.py --write    # replace the graph's edges with the chart's
+"""
+
+import argparse
+import html
+import re
+from pathlib import Path
+
+from artifacts import write_artifacts
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE, load_dataset, normalize_text
+from topic_codes import resolve_topic
+from topic_matcher import TopicMatcher
+
+MERMAID_FILE = 'All_Computer_Science_Topics (3).mmd'
+
+SKIP_KEYWORDS = {
+    'flowchart', 'graph', 'classDef', 'class', 'style', 'linkStyle', 'click',
+    'subgraph', 'end', 'direction',
+}
+
+_QUOTED = r'"(?P<q{n}>(?:[^"\\]|\\.)*)"'
+# (open, close) pairs, longest openers first so ([ wins over (
+_SHAPES = [
+    (r'\(\[', r'\]\)'), (r'\[\[', r'\]\]'), (r'\[\(', r'\)\]'), (r'\(\(\(', r'\)\)\)'),
+    (r'\(\(', r'\)\)'), (r'\{\{', r'\}\}'), (r'\[/', r'/\]'), (r'\[\\', r'\\\]'),
+    (r'\(', r'\)'), (r'\[', r'\]'), (r'\{', r'\}'), (r'>', r'\]'),
+]
+
+
+def _shape_pattern():
+    parts = []
+    for n, (open_, close) in enumerate(_SHAPES):
+        parts.append(
+            f'{open_}\\s*(?:{_QUOTED.format(n=n)}|(?P<u{n}>[^"]*?))\\s*{close}'
+        )
+    return '|'.join(parts)
+
+
+# A -- text --> B: text right after an opener that is not itself a whole link
+_LINK_TEXT = (
+    r'--(?:\s+|(?![-ox>]))[^|]*?--+[>ox]?'
+    r'|==(?:\s+|(?![=>]))[^|]*?==+>?'
+    r'|-\.(?:\s+|(?![.-]))[^|]*?\.-+>?'
+)
+
+_TOKEN_RE = re.compile(
+    r'\s+'
+    r'|(?P<arrow><?(?:' + _LINK_TEXT + r'|-\.+->?|==+>?|--+[>ox]?)(?:\|[^|]*\|)?)'
+    r'|(?P<amp>&)'
+    r'|(?P<semi>;)'
+    r'|(?P<extended>@\{(?P<body>[^}]*)\})'
+    r'|(?P<cls>:::[\w-]+)'
+    r'|(?P<id>\w+)'
+    r'|(?P<shape>' + _shape_pattern() + ')'
+)
+_EXTENDED_LABEL_RE = re.compile(r'''label\s*:\s*(?:"((?:[^"\\]|\\.)*)"|'([^']*)'|([^,]*))''')
+
+
+class MermaidSyntaxError(ValueError):
+    pass
+
+
+def _shape_label(match):
+    for n in range(len(_SHAPES)):
+        for group in (f'q{n}', f'u{n}'):
+            value = match.group(group)
+            if value is not None:
+                return value
+    return ''
+
+
+def _clean_label(text):
+    return html.unescape(text.replace('\\"', '"')).strip()
+
+
+def iter_statements(lines):
+    """Yield each statement as a list of groups, each group a list of (id, label or None)
+
+    lines is any iterable of text lines, such as an open file.
+    """
+    in_frontmatter = False
+    for line_number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if line_number == 1 and stripped == '---':
+            in_frontmatter = True
+            continue
+        if in_frontmatter:
+            in_frontmatter = stripped != '---'
+            continue
+        if not stripped or stripped.startswith('%%'):
+            continue
+        keyword = stripped.split(None, 1)[0]
+        if keyword in SKIP_KEYWORDS:
+            continue
+        yield from _tokenize_line(stripped, line_number)
+
+
+def _tokenize_line(text, line_number):
+    groups, group = [], []
+    pos = 0
+    expect_node = True
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise MermaidSyntaxError(f"line {line_number}: unexpected {text[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        if kind == 'id':
+            if not expect_node:
+                raise MermaidSyntaxError(f"line {line_number}: missing link before {match.group('id')!r}")
+            group.append([match.group('id'), None])
+            expect_node = False
+        elif kind in ('shape', 'extended'):
+            if not group or expect_node:
+                raise MermaidSyntaxError(f"line {line_number}: node shape without an id")
+            if kind == 'shape':
+                group[-1][1] = _clean_label(_shape_label(match))
+            else:
+                label = _EXTENDED_LABEL_RE.search(match.group('body'))
+                if label:
+                    group[-1][1] = _clean_label(next(g for g in label.groups() if g is not None))
+        elif kind == 'cls':
+            continue
+        elif kind in ('amp', 'arrow'):
+            if expect_node:
+                raise MermaidSyntaxError(f"line {line_number}: {match.group(kind)!r} without a node")
+            if kind == 'arrow':
+                groups.append(group)
+                group = []
+            expect_node = True
+        elif kind == 'semi':
+            if group:
+                groups.append(group)
+                yield [[tuple(node) for node in g] for g in groups]
+            groups, group, expect_node = [], [], True
+    if expect_node and (group or groups):
+        raise MermaidSyntaxError(f"line {line_number}: statement ends with a link")
+    if group:
+        groups.append(group)
+        yield [[tuple(node) for node in g] for g in groups]
+
+
+def parse_mermaid(lines):
+    """Return (labels, edges): id -> label, and unique (source, target) pairs in file order"""
+    labels = {}
+    edges = {}
+    for groups in iter_statements(lines):
+        for group in groups:
+            for node_id, label in group:
+                if label is not None:
+                    labels[node_id] = label
+                else:
+                    labels.setdefault(node_id, None)
+        for sources, targets in zip(groups, groups[1:]):
+            for source, _ in sources:
+                for target, _ in targets:
+                    edges[(source, target)] = None
+    return labels, list(edges)
+
+
+def load_mermaid(filepath=None):
+    filepath = filepath or Path(__file__).parent / MERMAID_FILE
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return parse_mermaid(f)
+
+
+def resolve_topic_codes(labels, matcher, number_ids=None):
+    """id -> topic code (None when the label matches no calculus topic)
+
+    number_ids (id -> number_id, usually from the current graph) lets the
+    topic_code_map.json rules apply before label matching, as in the build.
+    """
+    number_ids = number_ids or {}
+    codes = {}
+    for node_id, label in labels.items():
+        node = {'label': label or '', 'number_id': number_ids.get(node_id)}
+        topic_info = resolve_topic(node, matcher.calculus_topics, matcher) if label else None
+        codes[node_id] = topic_info['topicCode'] if topic_info else None
+    return codes
+
+
+def diff_graph(graph, labels, edges, topic_codes=None):
+    """Set-based comparison of the chart against a loaded graph"""
+    nodes = {node['id']: node for node in graph['nodes']}
+    chart_edges = set(edges)
+    graph_edges = {(edge['source'], edge['target']) for edge in graph.get('edges', [])}
+    linked = {node_id for edge in chart_edges for node_id in edge}
+
+    label_mismatches = []
+    code_mismatches = []
+    # Labels neither the mapping table nor the matcher can place
+    unresolved = []
+    for node_id in sorted(linked & nodes.keys()):
+        node = nodes[node_id]
+        label = labels.get(node_id)
+        if label and normalize_text(label) != normalize_text(node.get('label', '')):
+            label_mismatches.append((node_id, node.get('label'), label))
+        if topic_codes is None:
+            continue
+        code = topic_codes.get(node_id)
+        if code is None:
+            unresolved.append((node_id, label))
+        elif code != node.get('topicCode'):
+            code_mismatches.append((node_id, node.get('topicCode'), code))
+
+    return {
+        'added_edges': sorted(chart_edges - graph_edges),
+        'removed_edges': sorted(graph_edges - chart_edges),
+        'missing_nodes': sorted(linked - nodes.keys()),
+        'unlinked_nodes': sorted(nodes.keys() - linked),
+        'label_mismatches': label_mismatches,
+        'topic_code_mismatches': code_mismatches,
+        'unresolved_labels': unresolved,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate graph edges from the Mermaid chart')
+    parser.add_argument('--mmd', help=f'flowchart to read (default: {MERMAID_FILE})')
+    parser.add_argument('--write', action='store_true',
+                        help="replace graph_data.json's edges with the chart's")
+    args = parser.parse_args()
+
+    base_path = Path(__file__).parent
+    graph_file = base_path / GRAPH_DATA_FILE
+    labels, edges = load_mermaid(args.mmd)
+    graph = load_graph(graph_file)
+    dataset = load_dataset(base_path)
+    number_ids = {node['id']: node.get('number_id') for node in graph['nodes']}
+    topic_codes = resolve_topic_codes(labels, TopicMatcher(dataset.calculus_topics), number_ids)
+    diff = diff_graph(graph, labels, edges, topic_codes)
+
+    print(f"Chart: {len(labels)} nodes, {len(edges)} edges")
+    print(f"Graph: {len(graph['nodes'])} nodes, {len(graph.get('edges', []))} edges")
+    for key, title in [
+        ('added_edges', 'Edges only in the chart'),
+        ('removed_edges', 'Edges only in the graph'),
+        ('missing_nodes', 'Chart nodes missing from the graph'),
+        ('unlinked_nodes', 'Graph nodes without chart edges'),
+        ('label_mismatches', 'Label mismatches (id, graph, chart)'),
+        ('topic_code_mismatches', 'Topic code mismatches (id, graph, chart)'),
+        ('unresolved_labels', 'Chart labels without a topic code match'),
+    ]:
+        if diff[key]:
+            print(f"\n{title}: {len(diff[key])}")
+            for entry in diff[key]:
+                print(f"  {entry}")
+
+    if not diff['added_edges'] and not diff['removed_edges']:
+        print("\n✓ Graph edges match the chart")
+    elif args.write:
+        if diff['missing_nodes']:
+            print(f"\nNot writing: {len(diff['missing_nodes'])} chart nodes are missing from the graph")
+            return
+        graph['edges'] = [{'source': source, 'target': target} for source, target in edges]
+        write_artifacts(graph, base_path, graph_file)
+        print(f"\nWrote {len(edges)} edges to {graph_file.name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Opt-in run metrics for the data scripts (--metrics / --profile).
+
+    with collect('convert_data', metrics_path, profile_path) as metrics:
+        with metrics.stage('load'):
+            ...
+        metrics.count('rows', len(dataset.rows))
+
+Each stage records wall time, normalize_text calls, the tracemalloc peak
+and the counters bumped while it ran. Library code bumps counters through
+count(), which does nothing unless a collection is active. TopicMatcher uses
+it to count matches per strategy. Everything is written to metrics_path as
+JSON. With profile_path, the whole run also goes through cProfile and the
+stats are dumped there (readable with `python -m pstats`). tracemalloc only
+runs when metrics_path is given, since it would slow down and skew a
+profile taken on its own.
+
+When neither path is given, collect() yields a disabled Metrics whose
+stage() and count() cost next to nothing.
+"""
+
+import cProfile
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from ingest import normalize_text
+
+METRICS_VERSION = 1
+
+_active = None
+
+
+def count(name, n=1):
+    """Add n to a counter of the active collection, if there is one"""
+    if _active is not None:
+        _active.counters[name] += n
+
+
+def _normalize_calls():
+    info = normalize_text.cache_info()
+    return info.hits + info.misses
+
+
+class Metrics:
+    def __init__(self, script, enabled=True):
+        self.script = script
+        self.enabled = enabled
+        self.stages = []
+        self.counters = Counter()
+        self._started = time.perf_counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        counters_before = Counter(self.counters)
+        normalize_before = _normalize_calls()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stage = {
+                'name': name,
+                'seconds': round(seconds, 6),
+                'normalize_calls': _normalize_calls() - normalize_before,
+            }
+            if tracing:
+                stage['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+            stage['counters'] = dict(self.counters - counters_before)
+            self.stages.append(stage)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def to_dict(self):
+        return {
+            'version': METRICS_VERSION,
+            'script': self.script,
+            'total_seconds': round(time.perf_counter() - self._started, 6),
+            'stages': self.stages,
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+@contextmanager
+def collect(script, metrics_path=None, profile_path=None):
+    """Collect metrics for the enclosed run and write them on exit"""
+    global _active
+    if not metrics_path and not profile_path:
+        yield Metrics(script, enabled=False)
+        return
+
+    metrics = Metrics(script)
+    profiler = cProfile.Profile() if profile_path else None
+    _active = metrics
+    if metrics_path:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if metrics_path:
+            tracemalloc.stop()
+        _active = None
+        if metrics_path:
+            data = metrics.to_dict()
+            if profile_path:
+                data['profile'] = str(profile_path)
+            with open(metrics_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+
+
+def add_arguments(parser):
+    """Add --metrics and --profile to an argparse parser"""
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='write per-stage timings, counters and memory peaks to PATH as JSON')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='run under cProfile and dump the stats to PATH')
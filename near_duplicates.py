@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate rationales across every category CSV.
+
+fix_duplicate_rationales.py only drops connections the CSVs no longer list;
+it cannot see the same paragraph pasted (or lightly reworded) under several
+topics. This finds them in roughly linear time:
+
+1. every rationale is cut into word SHINGLE_SIZE-shingles, and a MinHash
+   signature of NUM_PERMUTATIONS hashes is computed for all rows at once;
+2. LSH banding (BANDS bands of ROWS_PER_BAND hashes) puts rows whose
+   signatures agree on a whole band in the same bucket, so only rows that
+   share a bucket become candidate pairs (no all-pairs comparison);
+3. each candidate pair is confirmed with the cosine similarity of the two
+   rows' TF-IDF vectors, computed for all pairs together with NumPy;
+4. pairs at or above the threshold are joined into clusters.
+
+The defaults make pairs with about 0.5 shingle overlap likely candidates,
+well below the default cosine threshold of 0.8.
+
+Requires NumPy.
+
+Usage:
+    python3 near_duplicates.py                      # print clusters
+    python3 near_duplicates.py --threshold 0.9 --json clusters.json
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import zlib
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from build_search_index import tokenize
+from ingest import load_dataset
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+DEFAULT_THRESHOLD = 0.8
+# Buckets larger than this are chained (every row paired with the bucket's first
+# row) instead of paired all-to-all; exact copies share every band's bucket, so
+# skipping them would hide the biggest paste-duplication clusters
+MAX_BUCKET_SIZE = 200
+# Candidate pairs confirmed per vectorized batch, to bound memory
+PAIR_BATCH = 200_000
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """Distinct hashes of the word size-shingles of text (the whole text when shorter)"""
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) <= size:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) % _MERSENNE_PRIME for shingle in shingles),
+        dtype=np.int64, count=len(shingles),
+    )
+
+
+def minhash_signatures(texts, num_permutations=NUM_PERMUTATIONS, seed=0):
+    """(len(texts), num_permutations) int64 MinHash signatures"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _MERSENNE_PRIME, size=num_permutations, dtype=np.int64)
+    b = rng.integers(0, _MERSENNE_PRIME, size=num_permutations, dtype=np.int64)
+
+    hashes = [shingle_hashes(text) for text in texts]
+    lengths = np.fromiter((len(h) for h in hashes), dtype=np.int64, count=len(hashes))
+    signatures = np.empty((len(texts), num_permutations), dtype=np.int64)
+    if not len(texts):
+        return signatures
+    flat = np.concatenate(hashes)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # a * x + b stays below 2**63 because a, x < 2**31
+    for i in range(num_permutations):
+        permuted = (a[i] * flat + b[i]) % _MERSENNE_PRIME
+        signatures[:, i] = np.minimum.reduceat(permuted, starts)
+    return signatures
+
+
+def lsh_candidates(signatures, bands=BANDS, rows_per_band=ROWS_PER_BAND, max_bucket=MAX_BUCKET_SIZE):
+    """(n, 2) array of distinct row pairs i < j that share at least one band bucket
+
+    Buckets of up to max_bucket rows give all their pairs; larger ones give
+    a chain through their first row, which still joins them into one cluster.
+    """
+    count = len(signatures)
+    pair_keys = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows_per_band))).ravel()
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        # Bucket start and size for every position of the sorted order
+        is_start = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        bucket_starts = np.flatnonzero(is_start)
+        bucket_sizes = np.diff(np.append(bucket_starts, count))
+        bucket_of = np.cumsum(is_start) - 1
+        sizes = bucket_sizes[bucket_of]
+        rank = np.arange(count) - bucket_starts[bucket_of]
+
+        # Pair every row with the rows after it in its bucket
+        later = np.where((sizes > 1) & (sizes <= max_bucket), sizes - 1 - rank, 0)
+        if later.any():
+            positions = np.repeat(np.arange(count), later)
+            offsets = np.arange(len(positions)) - np.repeat(np.cumsum(later) - later, later)
+            left = order[positions]
+            right = order[positions + 1 + offsets]
+            pair_keys.append(np.minimum(left, right) * count + np.maximum(left, right))
+
+        # Oversized buckets: every other row with the bucket's first
+        chained = np.flatnonzero((sizes > max_bucket) & (rank > 0))
+        if len(chained):
+            left = order[bucket_starts[bucket_of[chained]]]
+            right = order[chained]
+            pair_keys.append(np.minimum(left, right) * count + np.maximum(left, right))
+    if not pair_keys:
+        return np.empty((0, 2), dtype=np.int64)
+    unique = np.unique(np.concatenate(pair_keys))
+    return np.stack((unique // count, unique % count), axis=1)
+
+
+def tfidf_vectors(texts):
+    """Sparse L2-normalized TF-IDF rows as (starts, lengths, term ids, weights), term ids sorted per row"""
+    tokenized = [Counter(tokenize(text)) for text in texts]
+    document_frequency = Counter(term for counts in tokenized for term in counts)
+    vocabulary = {term: i for i, term in enumerate(sorted(document_frequency))}
+    idf = {term: math.log((1 + len(texts)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+    term_ids = []
+    weights = []
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    for row, counts in enumerate(tokenized):
+        entries = sorted((vocabulary[term], tf * idf[term]) for term, tf in counts.items())
+        norm = math.sqrt(sum(weight * weight for _, weight in entries)) or 1.0
+        term_ids.extend(term for term, _ in entries)
+        weights.extend(weight / norm for _, weight in entries)
+        lengths[row] = len(entries)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else lengths
+    return starts, lengths, np.array(term_ids, dtype=np.int64), np.array(weights), len(vocabulary)
+
+
+def pair_cosines(vectors, pairs):
+    """Cosine similarity of every (i, j) pair of rows, as one vectorized join per batch"""
+    starts, lengths, term_ids, weights, vocabulary_size = vectors
+    row_of_entry = np.repeat(np.arange(len(lengths)), lengths)
+    # (row, term) keys are sorted because term ids are sorted within each row
+    keys = row_of_entry * max(vocabulary_size, 1) + term_ids
+
+    cosines = np.zeros(len(pairs))
+    for batch_start in range(0, len(pairs), PAIR_BATCH):
+        batch = pairs[batch_start:batch_start + PAIR_BATCH]
+        left, right = batch[:, 0], batch[:, 1]
+        counts = lengths[left]
+        pair_of_entry = np.repeat(np.arange(len(batch)), counts)
+        # Positions of every entry of each left row
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = starts[left][pair_of_entry] + offsets
+        wanted = right[pair_of_entry] * max(vocabulary_size, 1) + term_ids[entries]
+        found = np.searchsorted(keys, wanted)
+        found = np.minimum(found, len(keys) - 1)
+        matched = keys[found] == wanted
+        products = np.where(matched, weights[entries] * weights[found], 0.0)
+        cosines[batch_start:batch_start + len(batch)] = np.bincount(pair_of_entry, products, minlength=len(batch))
+    return cosines
+
+
+def cluster_pairs(count, pairs, similarities):
+    """Join (i, j) pairs into clusters: [{'rows', 'min_similarity', 'max_similarity'}], largest first"""
+    parent = list(range(count))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = {}
+    for (i, j), similarity in zip(pairs, similarities):
+        group = groups.setdefault(find(i), {'rows': set(), 'scores': []})
+        group['rows'].update((i, j))
+        group['scores'].append(similarity)
+    clusters = [
+        {
+            'rows': sorted(group['rows']),
+            'min_similarity': round(min(group['scores']), 4),
+            'max_similarity': round(max(group['scores']), 4),
+        }
+        for group in groups.values()
+    ]
+    clusters.sort(key=lambda cluster: (-len(cluster['rows']), cluster['rows'][0]))
+    return clusters
+
+
+def find_near_duplicates(rows, threshold=DEFAULT_THRESHOLD):
+    """Clusters of rows whose rationales are near-duplicates
+
+    Returns (clusters, stats). Each cluster is {'rows': [row indexes],
+    'min_similarity', 'max_similarity'} over its confirmed pairs; clusters
+    are sorted largest first.
+    """
+    texts = [row['rationale'] for row in rows]
+    stats = {'rows': len(rows), 'candidate_pairs': 0, 'confirmed_pairs': 0, 'clusters': 0}
+    if len(texts) < 2:
+        return [], stats
+
+    candidates = lsh_candidates(minhash_signatures(texts))
+    stats['candidate_pairs'] = len(candidates)
+    if not len(candidates):
+        return [], stats
+    cosines = pair_cosines(tfidf_vectors(texts), candidates)
+    keep = cosines >= threshold
+    confirmed = candidates[keep]
+    similarities = cosines[keep]
+    stats['confirmed_pairs'] = len(confirmed)
+
+    clusters = cluster_pairs(len(texts), confirmed.tolist(), similarities.tolist())
+    stats['clusters'] = len(clusters)
+    return clusters, stats
+
+
+def describe_row(row):
+    return {
+        'category': row['category'],
+        'topic_code': row['topic_code'],
+        'calc_topic': row['calc_topic'],
+        'cs_topic': row['cs_topic'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate rationales across the category CSVs')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'minimum TF-IDF cosine similarity (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--json', metavar='PATH', help="write the clusters as JSON ('-' for stdout)")
+    args = parser.parse_args()
+
+    dataset = load_dataset(Path(__file__).parent)
+    clusters, stats = find_near_duplicates(dataset.rows, args.threshold)
+
+    if args.json:
+        report = {
+            'threshold': args.threshold,
+            'stats': stats,
+            'clusters': [
+                {**cluster, 'rows': [describe_row(dataset.rows[i]) for i in cluster['rows']]}
+                for cluster in clusters
+            ],
+        }
+        if args.json == '-':
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{stats['rows']} rationales, {stats['candidate_pairs']} candidate pairs, "
+          f"{stats['confirmed_pairs']} at cosine >= {args.threshold}")
+    for cluster in clusters:
+        print(f"\n{len(cluster['rows'])} rows, similarity {cluster['min_similarity']:.2f}-{cluster['max_similarity']:.2f}:")
+        for i in cluster['rows']:
+            row = dataset.rows[i]
+            print(f"  {row['topic_code'] or '?':<10} {row['category']:<24} {row['cs_topic']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Refresh graph_data.json in one pass.
+
+Runs the work of fix_all_topic_codes.py, fix_duplicate_rationales.py,
+convert_data.py and verify_sync.py as stages over a single in-memory graph:
+the CSVs and graph_data.json are read once, every stage mutates the same
+graph object, and the result is written once at the end (atomically, via
+write_artifacts). If any stage fails, nothing is written.
+
+A stage is called with the graph, the dataset and a StageContext (the
+base path and verbosity of the run). It returns a summary, or (summary,
+problem count) when it checks the graph, as verify does. The exit status is 1 when any problems were found;
+with --strict the run also stops before the write.
+
+Usage:
+    python3 pipeline.py                                  # default stages
+    python3 pipeline.py --stages fix_topic_codes,verify  # a custom list
+    python3 pipeline.py --dry-run                        # run stages, skip the write
+    python3 pipeline.py --strict                         # do not write if verify finds problems
+    python3 pipeline.py --verbose                        # also list every node a stage fixes
+    python3 pipeline.py --list                           # show available stages
+    python3 pipeline.py --metrics run.json --profile run.prof
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import metrics
+from artifacts import write_artifacts
+from convert_data import update_graph_data
+from fix_all_topic_codes import fix_topic_codes, sync_rationales
+from fix_duplicate_rationales import build_correct_connections, remove_stale_rationales
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE, load_dataset
+from mermaid_edges import MERMAID_FILE, diff_graph, load_mermaid
+from verify_sync import check_sync, problem_count
+
+try:
+    from near_duplicates import find_near_duplicates
+except ImportError:  # optional: the near_duplicates stage needs NumPy
+    find_near_duplicates = None
+
+
+class StageContext:
+    """What a stage may need besides the graph and the dataset"""
+
+    __slots__ = ('base_path', 'verbose')
+
+    def __init__(self, base_path, verbose=False):
+        self.base_path = Path(base_path)
+        # Per-node progress lines from the scripts' functions; off so the stage table stays readable
+        self.verbose = verbose
+
+
+def stage_fix_topic_codes(graph, dataset, context):
+    fixed = fix_topic_codes(graph, dataset.calculus_topics, verbose=context.verbose)
+    updated = sync_rationales(graph, dataset)
+    return f"{fixed} topic codes fixed, {updated} nodes resynced"
+
+
+def stage_dedupe_rationales(graph, dataset, context):
+    fixed = remove_stale_rationales(graph, build_correct_connections(dataset), verbose=context.verbose)
+    return f"{fixed} nodes fixed"
+
+
+def stage_convert(graph, dataset, context):
+    update_graph_data(graph, dataset)
+    return f"{len(graph['nodes'])} nodes updated"
+
+
+def stage_edges(graph, dataset, context):
+    labels, edges = load_mermaid(context.base_path / MERMAID_FILE)
+    diff = diff_graph(graph, labels, edges)
+    if diff['missing_nodes']:
+        raise ValueError(f"chart nodes missing from the graph: {diff['missing_nodes']}")
+    graph['edges'] = [{'source': source, 'target': target} for source, target in edges]
+    return f"{len(edges)} edges (+{len(diff['added_edges'])} -{len(diff['removed_edges'])})"
+
+
+def stage_near_duplicates(graph, dataset, context):
+    if find_near_duplicates is None:
+        raise RuntimeError("the near_duplicates stage needs NumPy")
+    clusters, stats = find_near_duplicates(dataset.rows)
+    rows = sum(len(cluster['rows']) for cluster in clusters)
+    return (f"{stats['candidate_pairs']} candidate pairs, {stats['confirmed_pairs']} confirmed, "
+            f"{len(clusters)} clusters covering {rows} rows (report only)")
+
+
+def stage_verify(graph, dataset, context):
+    result = check_sync(graph, dataset)
+    problems = problem_count(result)
+    status = "in sync" if problems == 0 else f"{problems} associations need fixing"
+    return (f"{result['found']} synced, {len(result['missing'])} missing, {len(result['extra'])} extra, "
+            f"{len(result['changed'])} changed, {len(result['not_found_topic'])} unknown topics: {status}"), problems
+
+
+# name -> (stage function, description)
+STAGES = {
+    'fix_topic_codes': (stage_fix_topic_codes, 'topic codes from number_id, then CSV rationales (fix_all_topic_codes.py)'),
+    'dedupe_rationales': (stage_dedupe_rationales, 'drop connections the CSVs do not list (fix_duplicate_rationales.py)'),
+    'convert': (stage_convert, 'match labels to topics and attach rationales (convert_data.py)'),
+    'edges': (stage_edges, 'replace edges with the Mermaid chart (mermaid_edges.py)'),
+    'near_duplicates': (stage_near_duplicates, 'report near-duplicate rationales across rows (near_duplicates.py)'),
+    'verify': (stage_verify, 'compare the graph with the CSVs (verify_sync.py)'),
+}
+DEFAULT_STAGES = ['fix_topic_codes', 'dedupe_rationales', 'convert', 'verify']
+
+
+def run_pipeline(stage_names, base_path=None, graph_file=None, write=True, run=None, strict=False,
+                 verbose=False):
+    """Run stage_names over one graph; returns ([(name, seconds, summary)] including load and write, problems)
+
+    problems is the total reported by checking stages; with strict, any
+    problems skip the write. run is an optional metrics.Metrics that records
+    each stage as well. verbose lets stages print every node they fix.
+    """
+    unknown = [name for name in stage_names if name not in STAGES]
+    if unknown:
+        raise ValueError(f"unknown stages: {', '.join(unknown)}")
+
+    base_path = Path(base_path or Path(__file__).parent)
+    graph_file = Path(graph_file or base_path / GRAPH_DATA_FILE)
+    run = run or metrics.Metrics('pipeline', enabled=False)
+    context = StageContext(base_path, verbose)
+    timings = []
+    problems = 0
+
+    start = time.perf_counter()
+    with run.stage('load'):
+        dataset = load_dataset(base_path)
+        graph = load_graph(graph_file)
+    run.count('rationale_rows', len(dataset.rows))
+    run.count('nodes', len(graph['nodes']))
+    timings.append(('load', time.perf_counter() - start,
+                    f"{len(dataset.rows)} CSV rows, {len(graph['nodes'])} nodes"))
+
+    for name in stage_names:
+        stage, _ = STAGES[name]
+        start = time.perf_counter()
+        with run.stage(name):
+            summary = stage(graph, dataset, context)
+        if isinstance(summary, tuple):
+            summary, stage_problems = summary
+            problems += stage_problems
+        timings.append((name, time.perf_counter() - start, summary))
+    run.count('problems', problems)
+
+    if write and strict and problems:
+        timings.append(('write', 0.0, f"skipped: {problems} problems (--strict)"))
+    elif write:
+        start = time.perf_counter()
+        with run.stage('write'):
+            write_artifacts(graph, base_path, graph_file)
+        timings.append(('write', time.perf_counter() - start, graph_file.name))
+    return timings, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh graph_data.json with one load and one write')
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES),
+                        help=f"comma-separated stages to run in order (default: {','.join(DEFAULT_STAGES)})")
+    parser.add_argument('--dry-run', action='store_true', help='run the stages without writing anything')
+    parser.add_argument('--strict', action='store_true',
+                        help='skip the write when a checking stage (verify) finds problems')
+    parser.add_argument('--verbose', action='store_true', help='print every node a stage fixes')
+    parser.add_argument('--list', action='store_true', help='list the available stages and exit')
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, description) in STAGES.items():
+            print(f"  {name:<18} {description}")
+        return
+
+    stage_names = [name.strip() for name in args.stages.split(',') if name.strip()]
+    with metrics.collect('pipeline', args.metrics, args.profile) as run:
+        timings, problems = run_pipeline(stage_names, write=not args.dry_run, run=run, strict=args.strict,
+                                         verbose=args.verbose)
+
+    print(f"\n{'stage':<18} {'ms':>9}  summary")
+    for name, seconds, summary in timings:
+        print(f"{name:<18} {seconds * 1000:>9.1f}  {summary}")
+    print(f"{'total':<18} {sum(seconds for _, seconds, _ in timings) * 1000:>9.1f}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
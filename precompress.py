@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Write .gz (and .br when the brotli package is installed) copies of the
+site's text assets next to the originals, for serve.py to send as-is.
+
+Only files that compress well are written, and a variant is refreshed only
+when its original is newer. Run this after the data scripts, or let
+start-server.sh do it.
+"""
+
+import argparse
+import gzip
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is enough
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = {'.html', '.css', '.js', '.json', '.csv', '.mmd', '.md', '.svg', '.txt'}
+# Smaller files are not worth a round trip through a compressed variant
+MIN_SIZE = 1024
+SKIP_DIRS = {'.git', '.build_cache', '__pycache__'}
+
+
+def iter_assets(root):
+    for path in sorted(Path(root).rglob('*')):
+        if any(part in SKIP_DIRS or part.startswith('.') for part in path.relative_to(root).parts):
+            continue
+        if path.is_file() and path.suffix.lower() in COMPRESSIBLE_SUFFIXES and path.stat().st_size >= MIN_SIZE:
+            yield path
+
+
+def _write_variant(path, suffix, compress):
+    variant = path.with_name(path.name + suffix)
+    if variant.exists() and variant.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+        return False
+    data = path.read_bytes()
+    compressed = compress(data)
+    if len(compressed) >= len(data):
+        if variant.exists():
+            variant.unlink()
+        return False
+    tmp = variant.with_name(variant.name + '.tmp')
+    tmp.write_bytes(compressed)
+    tmp.replace(variant)
+    return True
+
+
+def precompress(root):
+    """Refresh compressed variants under root; returns the number of files written"""
+    written = 0
+    for path in iter_assets(root):
+        written += _write_variant(path, '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            written += _write_variant(path, '.br', lambda data: brotli.compress(data, quality=11))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompress static assets for serve.py')
+    parser.add_argument('root', nargs='?', default=str(Path(__file__).parent),
+                        help='site directory (default: this repository)')
+    args = parser.parse_args()
+
+    written = precompress(args.root)
+    encodings = 'gzip and brotli' if brotli is not None else 'gzip (install brotli for .br)'
+    print(f"Wrote {written} compressed variants ({encodings})")
+
+
+if __name__ == '__main__':
+    main()
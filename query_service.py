@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Optional JSON query service for CS-topic connection filtering.
+
+app.js filters and ranks in the browser over the whole payload
+(applyCourseFilter, recomputeCalcConnections, renderCalcTopicList). This
+answers the same question on the server: the calculus topics connected to
+a set of CS topics, within a set of courses, at or above a Strength
+threshold, sorted by one of the sidebar's modes, a page at a time.
+
+The graph is indexed once at start (and again when graph_data.json
+changes) into the CS-topic postings of build_postings.py, so a query only
+walks the posting lists of its CS topics. Ranked results are kept in an LRU
+cache keyed by the normalized query (topic and course order, duplicates and
+pagination do not matter), so paging and repeated queries skip the ranking.
+The server is a single asyncio loop with HTTP/1.1 keep-alive, which keeps
+hundreds of open student connections cheap. graph_data.json is reloaded on
+a worker thread, so a reload never stalls the other connections; until it
+finishes they are answered from the previous index.
+
+Endpoints (GET):
+    /api/connections?cs=<category>|<topic>&cs=...&course=Calculus I&course=...
+                    &threshold=1&sort=default|alpha|connections|strength
+                    &offset=0&limit=50
+    /api/stats
+
+Usage:
+    python3 query_service.py [--port 8001] [--bind 127.0.0.1] [--cache-size 1024]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import math
+import os
+import re
+import time
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from build_postings import build_postings
+from ingest import GRAPH_DATA_FILE
+
+SORT_MODES = ('default', 'alpha', 'connections', 'strength')
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+DEFAULT_CACHE_SIZE = 1024
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADER_BYTES = 16 * 1024
+# Request bodies are read and discarded; larger ones are refused with 413
+MAX_BODY_BYTES = 64 * 1024
+# graph_data.json is checked for changes at most this often (seconds)
+RELOAD_INTERVAL = 2.0
+
+_TOPIC_CODE_RE = re.compile(r'^([A-Za-z]+)(\d+)$')
+
+
+class QueryError(ValueError):
+    """A malformed query; answered with 400"""
+
+
+def _topic_code_key(code):
+    # Same order as parseTopicCode in app.js: "Lim2" before "Lim10"
+    match = _TOPIC_CODE_RE.match(code or '')
+    if match:
+        return match.group(1).casefold(), int(match.group(2))
+    return (code or '').casefold(), 0
+
+
+class ConnectionIndex:
+    """CS-topic postings over one graph, with an LRU cache of ranked queries"""
+
+    def __init__(self, graph, cache_size=DEFAULT_CACHE_SIZE):
+        postings = build_postings(graph)
+        self.nodes = [
+            {
+                'id': node['id'],
+                'topicCode': node.get('topicCode'),
+                'topicName': node.get('topicName') or node.get('label') or '',
+                'course': node.get('course') or node.get('calc_level') or '',
+                'coreIdea': node.get('coreIdea') or '',
+            }
+            for node in graph['nodes']
+        ]
+        # (category, topic) -> {node index: (rationale rows, summed Strength)}
+        self.postings = {
+            (category, topic): dict(zip(posting['nodes'], zip(posting['counts'], posting['weights'])))
+            for category, topics in postings['postings'].items()
+            for topic, posting in topics.items()
+        }
+        # Each node's position in the 'alpha' and 'default' orders (ties keep graph order),
+        # so ranking a query sorts integers instead of building string keys
+        self.sort_rank = {
+            'alpha': self._positions(lambda node: node['topicName'].casefold()),
+            'default': self._positions(lambda node: (
+                node['course'].casefold(), node['coreIdea'].casefold(), _topic_code_key(node['topicCode']),
+            )),
+        }
+        self._ranked = functools.lru_cache(maxsize=cache_size)(self._rank)
+        # Encoded pages of the most requested queries, ready to send
+        self.page_json = functools.lru_cache(maxsize=cache_size)(self._page_json)
+
+    def _positions(self, key):
+        positions = [0] * len(self.nodes)
+        ordered = sorted(range(len(self.nodes)), key=lambda index: key(self.nodes[index]))
+        for position, index in enumerate(ordered):
+            positions[index] = position
+        return positions
+
+    @staticmethod
+    def normalize(cs_topics, courses=None, threshold=1, sort='default'):
+        """Hashable cache key: sorted distinct topics and courses, threshold and sort mode"""
+        if sort not in SORT_MODES:
+            raise QueryError(f"sort must be one of {', '.join(SORT_MODES)}")
+        topics = tuple(sorted({(category.strip(), topic.strip()) for category, topic in cs_topics}))
+        course_set = tuple(sorted({course.strip() for course in courses})) if courses else None
+        return topics, course_set, float(threshold), sort
+
+    def _rank(self, key):
+        """([(node index, connections, strength)], max strength, applied threshold), like app.js"""
+        topics, courses, threshold, sort = key
+        course_set = set(courses) if courses else None
+        connections = {}
+        strengths = {}
+        for topic_key in topics:
+            for node_index, (count, weight) in self.postings.get(topic_key, {}).items():
+                if course_set is not None and self.nodes[node_index]['course'] not in course_set:
+                    continue
+                connections[node_index] = connections.get(node_index, 0) + count
+                strengths[node_index] = strengths.get(node_index, 0) + weight
+
+        max_strength = max(strengths.values(), default=0)
+        applied = max(1, min(threshold, max(max_strength, 1)))
+        # Graph node order first, so ties sort the same way as in the browser
+        entries = [
+            (node_index, connections[node_index], strength)
+            for node_index, strength in sorted(strengths.items())
+            if strength >= applied
+        ]
+        if sort == 'connections':
+            entries.sort(key=lambda entry: -entry[1])
+        elif sort == 'strength':
+            entries.sort(key=lambda entry: -entry[2])
+        else:
+            positions = self.sort_rank[sort]
+            entries.sort(key=lambda entry: positions[entry[0]])
+        return entries, max_strength, applied
+
+    def query(self, cs_topics, courses=None, threshold=1, sort='default', offset=0, limit=DEFAULT_LIMIT):
+        """One page of connected calculus topics, as the JSON-ready response dict"""
+        return self.page(self.normalize(cs_topics, courses, threshold, sort), offset, limit)
+
+    def page(self, key, offset, limit):
+        """One page of a normalized query's ranking"""
+        entries, max_strength, applied = self._ranked(key)
+        results = []
+        for node_index, connections, strength in entries[offset:offset + limit]:
+            filters = []
+            for category, topic in key[0]:
+                found = self.postings.get((category, topic), {}).get(node_index)
+                if found:
+                    filters.append({'category': category, 'topic': topic, 'count': found[0]})
+            results.append({
+                **self.nodes[node_index],
+                'totalConnections': connections,
+                'totalStrength': strength,
+                'filters': filters,
+            })
+        return {
+            'total': len(entries),
+            'offset': offset,
+            'limit': limit,
+            'maxStrength': max_strength,
+            'threshold': applied,
+            'results': results,
+        }
+
+    def _page_json(self, key, offset, limit):
+        return encode_json(self.page(key, offset, limit))
+
+    def stats(self):
+        return {
+            'nodes': len(self.nodes),
+            'csTopics': len(self.postings),
+            'rankingCache': _cache_stats(self._ranked),
+            'pageCache': _cache_stats(self.page_json),
+        }
+
+
+def _cache_stats(cached):
+    info = cached.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxSize': info.maxsize}
+
+
+def encode_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def parse_connection_query(query_string):
+    """Keyword arguments for ConnectionIndex.query from a URL query string"""
+    params = parse_qs(query_string, keep_blank_values=False)
+    cs_topics = []
+    for value in params.get('cs', []):
+        category, separator, topic = value.partition('|')
+        if not separator or not category.strip() or not topic.strip():
+            raise QueryError("cs must be '<category>|<topic>'")
+        cs_topics.append((category, topic))
+    try:
+        threshold = float(params.get('threshold', ['1'])[-1])
+        offset = int(params.get('offset', ['0'])[-1])
+        limit = int(params.get('limit', [str(DEFAULT_LIMIT)])[-1])
+    except ValueError:
+        raise QueryError('threshold, offset and limit must be numbers') from None
+    if not math.isfinite(threshold):
+        raise QueryError('threshold must be a finite number')
+    if offset < 0 or not 1 <= limit <= MAX_LIMIT:
+        raise QueryError(f'offset must be >= 0 and limit between 1 and {MAX_LIMIT}')
+    return {
+        'cs_topics': cs_topics,
+        'courses': params.get('course') or None,
+        'threshold': threshold,
+        'sort': params.get('sort', ['default'])[-1],
+        'offset': offset,
+        'limit': limit,
+    }
+
+
+class QueryService:
+    """Keeps a ConnectionIndex in step with graph_data.json and answers HTTP requests"""
+
+    def __init__(self, graph_file, cache_size=DEFAULT_CACHE_SIZE, quiet=False):
+        self.graph_file = Path(graph_file)
+        self.cache_size = cache_size
+        self.quiet = quiet
+        self.index = None
+        self._mtime_ns = None
+        self._checked_at = 0.0
+        self._reloading = False
+        self.reload()
+
+    def _load_index(self):
+        # The service only needs cs_topic and strength, so rationale ids are left unresolved
+        with open(self.graph_file, 'r', encoding='utf-8') as f:
+            graph = json.load(f)
+        return ConnectionIndex(graph, self.cache_size)
+
+    def reload(self):
+        mtime_ns = os.stat(self.graph_file).st_mtime_ns
+        self.index = self._load_index()
+        self._mtime_ns = mtime_ns
+
+    async def check_reload(self):
+        """Reload on a worker thread when graph_data.json changed; one reload at a time"""
+        now = time.monotonic()
+        if self._reloading or now - self._checked_at < RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            mtime_ns = os.stat(self.graph_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns == self._mtime_ns:
+            return
+        self._reloading = True
+        try:
+            self.index = await asyncio.to_thread(self._load_index)
+            self._mtime_ns = mtime_ns
+        finally:
+            self._reloading = False
+
+    def handle(self, method, target):
+        """(status, payload) for one request; payload is a dict or already-encoded JSON"""
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'method not allowed'}
+        url = urlsplit(target)
+        if url.path == '/api/stats':
+            return HTTPStatus.OK, self.index.stats()
+        if url.path != '/api/connections':
+            return HTTPStatus.NOT_FOUND, {'error': 'not found'}
+        try:
+            query = parse_connection_query(url.query)
+            key = self.index.normalize(query['cs_topics'], query['courses'], query['threshold'], query['sort'])
+            return HTTPStatus.OK, self.index.page_json(key, query['offset'], query['limit'])
+        except QueryError as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 'GET', HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {'error': 'headers too large'}, keep_alive=False)
+                    return
+
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split()
+                if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+                    await self._respond(writer, 'GET', HTTPStatus.BAD_REQUEST, {'error': 'bad request'},
+                                        keep_alive=False)
+                    return
+                method, target, version = parts
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                # Bodies are not used; read them off so the next request parses cleanly
+                try:
+                    length = int(headers.get('content-length', '0') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, method, HTTPStatus.BAD_REQUEST, {'error': 'bad content-length'},
+                                        keep_alive=False)
+                    return
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, method, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {'error': 'request body too large'}, keep_alive=False)
+                    return
+                if length:
+                    await reader.readexactly(length)
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                if method == 'OPTIONS':
+                    status, payload = HTTPStatus.NO_CONTENT, None
+                else:
+                    try:
+                        await self.check_reload()
+                        status, payload = self.handle(method, target)
+                    except Exception as error:
+                        # A failed reload or a bug answers this request, not the whole connection
+                        status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'internal error'}
+                        if not self.quiet:
+                            print(f'{method} {target}: {type(error).__name__}: {error}')
+                await self._respond(writer, method, status, payload, keep_alive)
+                if not self.quiet:
+                    print(f'{method} {target} {status.value}')
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, method, status, payload, keep_alive):
+        if payload is None:
+            body = b''
+        else:
+            body = payload if isinstance(payload, bytes) else encode_json(payload)
+        head = [
+            f'HTTP/1.1 {status.value} {status.phrase}',
+            'Content-Type: application/json; charset=utf-8',
+            f'Content-Length: {len(body)}',
+            'Cache-Control: no-cache',
+            # The explorer is usually served by serve.py on another port
+            'Access-Control-Allow-Origin: *',
+            'Access-Control-Allow-Methods: GET, HEAD, OPTIONS',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        if keep_alive:
+            head.append(f'Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT}')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD':
+            writer.write(body)
+        await writer.drain()
+
+
+async def run_service(service, bind, port):
+    server = await asyncio.start_server(service.serve_connection, bind, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve CS-topic connection queries as JSON')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--bind', default='127.0.0.1', help='address to bind (default: 127.0.0.1)')
+    parser.add_argument('--graph', default=str(Path(__file__).parent / GRAPH_DATA_FILE), help='graph file')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f'ranked queries kept in the LRU cache (default: {DEFAULT_CACHE_SIZE})')
+    parser.add_argument('--quiet', action='store_true', help='do not log each request')
+    args = parser.parse_args()
+
+    service = QueryService(args.graph, args.cache_size, args.quiet)
+    print(f"Serving connection queries for {len(service.index.nodes)} nodes at http://{args.bind}:{args.port}/api/connections")
+    try:
+        asyncio.run(run_service(service, args.bind, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
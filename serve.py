@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Static file server for hosting the explorer to a whole lecture hall.
+
+Compared with `python3 -m http.server` it:
+- handles requests on a fixed-size thread pool; idle keep-alive connections
+  wait in a selector instead of holding a worker, so a hall full of open
+  browser connections never starves new requests,
+- sends the .br/.gz variants written by precompress.py when the client accepts them,
+- sets strong ETags and Cache-Control, and answers If-None-Match with 304,
+- supports single byte-range requests (206) with If-Range,
+- keeps small files in memory, re-reading them only when they change on disk.
+
+Usage:
+    python3 serve.py [--port 8000] [--bind 0.0.0.0] [--workers 32]
+"""
+
+import argparse
+import hashlib
+import mimetypes
+import os
+import re
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from urllib.parse import unquote, urlsplit
+
+# Files up to this size are kept in memory
+MEMORY_LIMIT = 2 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+# Keep-alive connections with no request for this many seconds are closed
+KEEPALIVE_TIMEOUT = 30
+# (Content-Encoding, file suffix), in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+# Data and pages are revalidated on every load; the ETag makes that a cheap 304
+NO_CACHE_SUFFIXES = {'.html', '.json', '.csv'}
+
+mimetypes.add_type('application/json', '.json')
+mimetypes.add_type('text/csv', '.csv')
+mimetypes.add_type('text/plain', '.mmd')
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileEntry:
+    """Metadata (and, for small files, content) for one file on disk"""
+
+    __slots__ = ('path', 'size', 'mtime_ns', 'etag', 'last_modified', 'body')
+
+    def __init__(self, path, stat, body, etag):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = etag
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.body = body
+
+
+class FileCache:
+    """Thread-safe cache of FileEntry objects, validated against mtime and size"""
+
+    def __init__(self, memory_limit=MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+
+        if stat.st_size <= self.memory_limit:
+            body = path.read_bytes()
+            digest = hashlib.sha1(body).hexdigest()
+        else:
+            body = None
+            h = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+            digest = h.hexdigest()
+        entry = FileEntry(path, stat, body, f'"{digest}"')
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that runs requests on a fixed-size thread pool
+
+    A worker only ever gets a connection that has a request to read. Between
+    requests, keep-alive connections are parked in a selector watched by one
+    thread, which hands them back to the pool when they become readable and
+    closes them after KEEPALIVE_TIMEOUT seconds of silence.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, server_address, handler_class, root, workers, keepalive_timeout=KEEPALIVE_TIMEOUT):
+        super().__init__(server_address, handler_class)
+        self.root = Path(root).resolve()
+        self.cache = FileCache()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='serve')
+        self.keepalive_timeout = keepalive_timeout
+        self._parked = SimpleQueue()
+        self._closing = False
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_read, self._wakeup_write = socket.socketpair()
+        self._wakeup_read.setblocking(False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._watcher = threading.Thread(target=self._watch_parked, name='serve-keepalive', daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request, client_address):
+        # A new connection may not have sent its request yet; wait for it in the selector
+        self._park(request, client_address)
+
+    def _park(self, request, client_address):
+        self._parked.put((request, client_address))
+        try:
+            self._wakeup_write.send(b'\0')
+        except OSError:
+            pass
+
+    def _process(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection or self._closing:
+            self.shutdown_request(request)
+        else:
+            self._park(request, client_address)
+
+    def _watch_parked(self):
+        """Selector loop: readable connections go to the pool, idle ones are closed"""
+        idle_since = {}
+        while not self._closing:
+            for key, _ in self._selector.select(timeout=1.0):
+                if key.fileobj is self._wakeup_read:
+                    try:
+                        while self._wakeup_read.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                self._selector.unregister(key.fileobj)
+                del idle_since[key.fileobj]
+                self.pool.submit(self._process, key.fileobj, key.data)
+
+            now = time.monotonic()
+            while True:
+                try:
+                    request, client_address = self._parked.get_nowait()
+                except Empty:
+                    break
+                try:
+                    self._selector.register(request, selectors.EVENT_READ, client_address)
+                except (OSError, ValueError):
+                    self.shutdown_request(request)
+                    continue
+                idle_since[request] = now
+            for request, since in list(idle_since.items()):
+                if now - since > self.keepalive_timeout:
+                    self._selector.unregister(request)
+                    del idle_since[request]
+                    self.shutdown_request(request)
+
+        for request in idle_since:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._closing = True
+        self._wakeup_write.send(b'\0')
+        self._watcher.join()
+        self._selector.close()
+        self._wakeup_read.close()
+        self._wakeup_write.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'CalcExplorer'
+    # Most seconds a worker waits for the rest of a request that has started to arrive
+    timeout = 10
+
+    def handle(self):
+        """Answer the request that made the connection readable, and any pipelined after it
+
+        The server parks the connection again afterwards unless close_connection is set.
+        """
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._request_pending():
+            self.handle_one_request()
+
+    def _request_pending(self):
+        """True when more request bytes are buffered or can be read without waiting"""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _resolve(self):
+        """Map the request path to a file under the root, or None"""
+        rel = unquote(urlsplit(self.path).path)
+        parts = [part for part in rel.split('/') if part]
+        # Dotfiles (.git, .build_cache, ...) are never served
+        if any(part.startswith('.') for part in parts):
+            return None
+        path = self.server.root.joinpath(*parts)
+        if path.is_dir():
+            path = path / 'index.html'
+        try:
+            path = path.resolve()
+            path.relative_to(self.server.root)
+        except (OSError, ValueError):
+            return None
+        return path if path.is_file() else None
+
+    def _accepted_encodings(self):
+        accepted = set()
+        for token in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = token.strip().partition(';')
+            if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(name.strip().lower())
+        return accepted
+
+    def _serve(self, send_body):
+        path = self._resolve()
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+            return
+
+        cache = self.server.cache
+        entry = cache.get(path)
+        if entry is None:
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+            return
+
+        range_header = self.headers.get('Range')
+        encoding = None
+        if not range_header:
+            accepted = self._accepted_encodings()
+            for name, suffix in ENCODINGS:
+                if name in accepted:
+                    variant = cache.get(path.with_name(path.name + suffix))
+                    # A variant older than its original is stale; skip it
+                    if variant is not None and variant.mtime_ns >= entry.mtime_ns:
+                        entry, encoding = variant, name
+                        break
+
+        if self._not_modified(entry.etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_common_headers(path, entry, encoding)
+            self.end_headers()
+            return
+
+        start, end = 0, entry.size - 1
+        status = HTTPStatus.OK
+        if range_header and self._range_applies(entry.etag):
+            parsed = self._parse_range(range_header, entry.size)
+            if parsed is None:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{entry.size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if parsed is not False:
+                start, end = parsed
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        length = max(0, end - start + 1)
+        self.send_response(status)
+        self._send_common_headers(path, entry, encoding)
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{entry.size}')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+        if not send_body or length == 0:
+            return
+        if entry.body is not None:
+            self.wfile.write(entry.body[start:end + 1])
+            return
+        with open(entry.path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _send_common_headers(self, path, entry, encoding):
+        content_type, _ = mimetypes.guess_type(path.name)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/json', 'application/javascript'):
+            content_type += '; charset=utf-8'
+        self.send_header('Content-Type', content_type)
+        self.send_header('ETag', entry.etag)
+        self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Vary', 'Accept-Encoding')
+        if path.suffix.lower() in NO_CACHE_SUFFIXES:
+            self.send_header('Cache-Control', 'no-cache')
+        else:
+            self.send_header('Cache-Control', f'public, max-age={self.server.max_age}')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+
+    def _not_modified(self, etag):
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = {tag.strip() for tag in header.split(',')}
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+    def _range_applies(self, etag):
+        if_range = self.headers.get('If-Range')
+        return if_range is None or if_range.strip() == etag
+
+    @staticmethod
+    def _parse_range(header, size):
+        """(start, end) for a single satisfiable range, None if unsatisfiable, False to ignore"""
+        match = _RANGE_RE.match(header.strip())
+        if not match:
+            # Multiple or malformed ranges: send the whole file
+            return False
+        first, last = match.groups()
+        if not first and not last:
+            return False
+        if not first:
+            length = int(last)
+            if length == 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+        if start >= size or end < start:
+            return None
+        return start, min(end, size - 1)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(root, bind='', port=8000, workers=32, max_age=300, quiet=False, keepalive_timeout=KEEPALIVE_TIMEOUT):
+    server = PooledHTTPServer((bind, port), StaticHandler, root, workers, keepalive_timeout)
+    server.max_age = max_age
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Calculus Connections Explorer')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--bind', default='', help='address to bind (default: all interfaces)')
+    parser.add_argument('--root', default=str(Path(__file__).parent), help='site directory')
+    parser.add_argument('--workers', type=int, default=32, help='request-handling threads')
+    parser.add_argument('--max-age', type=int, default=300,
+                        help='Cache-Control max-age in seconds for scripts and styles')
+    parser.add_argument('--quiet', action='store_true', help='do not log each request')
+    args = parser.parse_args()
+
+    server = make_server(args.root, args.bind, args.port, args.workers, args.max_age, args.quiet)
+    print(f"Serving {server.root} at http://localhost:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
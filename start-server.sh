@@ -13,4 +13,6 @@ echo "按 Ctrl+C 停止服务器"
 echo ""
 
 cd "$(dirname "$0")"
-python3 -m http.server $PORT
+# 预先生成 .gz/.br 压缩文件，再用带线程池、ETag 和缓存的 serve.py 提供服务
+python3 precompress.py
+python3 serve.py --port "$PORT"
@@ -0,0 +1,318 @@
+"""
+Bounded-memory ingestion for rationale CSVs too large to hold in memory.
+
+load_dataset() keeps every row, rationale text included, in memory, and the
+graph then holds a second copy. This path never holds more than a memory
+budget's worth of rows:
+
+1. the category CSVs are streamed row by row; each row is matched to its
+   topic code and buffered until the buffer passes the budget, then the
+   buffer is sorted by (topic code, category, file order) and spilled to a
+   run file on disk;
+2. the runs are combined with a k-way merge (heapq.merge), which yields one
+   topic code's rows at a time, in the order Dataset.by_topic_code has them;
+3. write_graph_streaming() turns each group into node rationales and writes
+   graph_data.json node by node. The rationale text table is deduplicated
+   through two more external sorts (by rationale id, then by where each
+   text first appears), so it comes out in the same order as from
+   graph_io.write_graph().
+
+Memory then depends on the budget, the number of nodes and the largest
+single topic group, not on the number of rows. The previous graph is only
+read for its structure: node rationales are dropped while it is parsed.
+Every node gets the rationales of its topic code from the CSVs, as
+fix_all_topic_codes.sync_rationales() does; nodes without a topic code, or
+whose topic code has no rows, keep the rationales they had, which a second
+pass over the old file reads for those nodes only.
+
+fix_all_topic_codes.py --stream writes to a temporary file this way and
+then loads the result once to write it with every derived artifact
+(artifacts.write_artifacts), so the CSV rows and the graph are never in
+memory together.
+"""
+
+import heapq
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from graph_io import RATIONALE_TABLE_KEY, pack_rationales, unpack_rationales
+from ingest import (
+    BASE_PATH, CALCULUS_LIST_FILE, discover_category_files, iter_rationales_csv, normalize_text,
+    parse_calculus_csv, refresh_node_summary,
+)
+
+DEFAULT_MEMORY_MB = 256
+# Size of each pickled chunk of a run file; a merge holds one chunk per run
+RUN_CHUNK_BYTES = 256 * 1024
+# Runs merged at once; beyond this, runs are first merged into longer ones
+MERGE_FAN_IN = 32
+# Rough per-record cost of the tuple, its ints and the string headers
+RECORD_OVERHEAD = 240
+
+# Stands in for the rationales load_graph_structure() dropped, until they are written
+NOT_LOADED = object()
+
+
+def _record_size(record):
+    return RECORD_OVERHEAD + sum(len(field) for field in record if isinstance(field, str))
+
+
+def _write_run(path, records):
+    with open(path, 'wb') as f:
+        chunk = []
+        chunk_bytes = 0
+        for record in records:
+            chunk.append(record)
+            chunk_bytes += _record_size(record)
+            if chunk_bytes >= RUN_CHUNK_BYTES:
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+                chunk = []
+                chunk_bytes = 0
+        if chunk:
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+class ExternalSorter:
+    """Sort more tuples than fit in memory: sorted runs spilled to disk, then a k-way merge"""
+
+    def __init__(self, directory, budget_bytes, name='run'):
+        self.directory = Path(directory)
+        self.budget_bytes = budget_bytes
+        self.name = name
+        self.runs = []
+        self.run_count = 0
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.count = 0
+
+    def add(self, record):
+        self.buffer.append(record)
+        self.buffered_bytes += _record_size(record)
+        self.count += 1
+        if self.buffered_bytes >= self.budget_bytes:
+            self._spill()
+
+    def _new_run(self, records):
+        path = self.directory / f'{self.name}-{self.run_count}.pickle'
+        self.run_count += 1
+        _write_run(path, records)
+        self.runs.append(path)
+
+    def _spill(self):
+        self.buffer.sort()
+        self._new_run(self.buffer)
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    def merged(self):
+        """Every record added so far, in sorted order"""
+        while len(self.runs) > MERGE_FAN_IN:
+            batch, self.runs = self.runs[:MERGE_FAN_IN], self.runs[MERGE_FAN_IN:]
+            self._new_run(heapq.merge(*(_read_run(path) for path in batch)))
+            for path in batch:
+                path.unlink()
+        self.buffer.sort()
+        return heapq.merge(*(_read_run(path) for path in self.runs), self.buffer)
+
+
+def sort_rationale_rows(base_path, sorter):
+    """Stream every category CSV row into sorter; returns (categories, unmatched row count)
+
+    Records are (topic code, category index, row number, cs_topic, strength, rationale).
+    """
+    base_path = Path(base_path or BASE_PATH)
+    calculus_topics = parse_calculus_csv(base_path / CALCULUS_LIST_FILE)
+    topic_code_by_name = {normalize_text(info['topicName']): code for code, info in calculus_topics.items()}
+
+    categories = []
+    unmatched = 0
+    row_number = 0
+    for index, (path, category) in enumerate(discover_category_files(base_path)):
+        categories.append(category)
+        for row in iter_rationales_csv(path, category):
+            topic_code = topic_code_by_name.get(normalize_text(row['calc_topic']))
+            if topic_code is None:
+                unmatched += 1
+                continue
+            sorter.add((topic_code, index, row_number, row['cs_topic'], row['strength'], row['rationale']))
+            row_number += 1
+    return categories, unmatched
+
+
+def iter_topic_groups(records, categories):
+    """Yield (topic_code, {category -> [{'cs_topic', 'rationale', 'strength'}]}) from sorted records"""
+    current = None
+    group = {}
+    for topic_code, index, _, cs_topic, strength, rationale in records:
+        if topic_code != current:
+            if current is not None:
+                yield current, group
+            current = topic_code
+            group = {}
+        group.setdefault(categories[index], []).append(
+            {'cs_topic': cs_topic, 'rationale': rationale, 'strength': strength}
+        )
+    if current is not None:
+        yield current, group
+
+
+def load_graph_structure(filepath):
+    """Load graph_data.json without rationale items or texts
+
+    Non-empty rationales become NOT_LOADED, so the writer knows which nodes
+    had some; RATIONALE_TABLE_KEY is dropped.
+    """
+    def drop_rationales(pairs):
+        obj = dict(pairs)
+        if obj.get('rationales'):
+            # Keep the key where it is, so the node's fields are written in the same order
+            obj['rationales'] = NOT_LOADED
+        obj.pop(RATIONALE_TABLE_KEY, None)
+        return obj
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f, object_pairs_hook=drop_rationales)
+
+
+def load_node_rationales(filepath, node_ids):
+    """{node id -> rationales with texts resolved} for node_ids only, as load_graph() has them"""
+    node_ids = set(node_ids)
+    if not node_ids:
+        return {}
+    kept_ids = set()
+
+    def keep_rationales(pairs):
+        obj = dict(pairs)
+        if 'rationales' in obj and obj.get('id') not in node_ids:
+            obj['rationales'] = None
+        elif obj.get('rationales'):
+            kept_ids.update(item.get('rationale_id') for items in obj['rationales'].values() for item in items)
+        if RATIONALE_TABLE_KEY in obj:
+            table = obj.pop(RATIONALE_TABLE_KEY) or {}
+            obj[RATIONALE_TABLE_KEY] = {text_id: table[text_id] for text_id in kept_ids if text_id in table}
+        return obj
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        graph = unpack_rationales(json.load(f, object_pairs_hook=keep_rationales))
+    return {node['id']: node['rationales'] for node in graph['nodes'] if node.get('id') in node_ids}
+
+
+def _indented(value, depth):
+    text = json.dumps(value, indent=2, ensure_ascii=False)
+    return text.replace('\n', '\n' + '  ' * depth)
+
+
+def write_graph_streaming(graph, base_path, filepath, memory_mb=DEFAULT_MEMORY_MB, spill_dir=None,
+                          source_file=None):
+    """Sync every node's rationales from the CSVs and write graph_data.json in bounded memory
+
+    graph is a structure-only graph (see load_graph_structure) loaded from
+    source_file (default: filepath). Nodes are synced as
+    fix_all_topic_codes.sync_rationales() does, and the file is the same,
+    byte for byte, as graph_io.write_graph() would write. Returns a summary
+    dict.
+    """
+    filepath = Path(filepath)
+    source_file = Path(source_file or filepath)
+    budget = memory_mb * 1024 * 1024 // 2
+    with tempfile.TemporaryDirectory(dir=spill_dir, prefix='stream_ingest-') as tmp:
+        tmp = Path(tmp)
+        rows = ExternalSorter(tmp, budget, 'rows')
+        categories, unmatched = sort_rationale_rows(base_path, rows)
+
+        # One JSON line of rationales per topic code; only the offsets stay in memory
+        offsets = {}
+        with open(tmp / 'groups.jsonl', 'wb') as groups:
+            for topic_code, group in iter_topic_groups(rows.merged(), categories):
+                line = json.dumps(group, ensure_ascii=False).encode('utf-8') + b'\n'
+                offsets[topic_code] = (groups.tell(), len(line))
+                groups.write(line)
+
+        # Nodes the CSVs have no rows for keep their rationales; read them in a second pass
+        nodes = graph.get('nodes') or []
+        kept = load_node_rationales(source_file, [
+            node.get('id') for node in nodes
+            if node.get('rationales') is NOT_LOADED and node.get('topicCode') not in offsets
+        ])
+
+        # (rationale id, first position, text) of every item as it is written; sorted by id,
+        # the first record of each id gives its place in the table, as in pack_rationales()
+        texts = ExternalSorter(tmp, budget, 'texts')
+        position = 0
+        tmp_output = filepath.with_name(filepath.name + '.tmp')
+        synced = 0
+        with open(tmp / 'groups.jsonl', 'rb') as groups, open(tmp_output, 'w', encoding='utf-8') as out:
+            out.write('{')
+            first_key = True
+            for key, value in graph.items():
+                out.write('\n' if first_key else ',\n')
+                first_key = False
+                out.write(f'  {json.dumps(key)}: ')
+                if key != 'nodes':
+                    out.write(_indented(value, 1))
+                    continue
+                if not value:
+                    out.write('[]')
+                    continue
+                out.write('[')
+                for i, node in enumerate(value):
+                    topic_code = node.get('topicCode')
+                    location = offsets.get(topic_code) if topic_code else None
+                    if location:
+                        groups.seek(location[0])
+                        node['rationales'] = json.loads(groups.read(location[1]))
+                        synced += 1
+                    elif node.get('rationales') is NOT_LOADED:
+                        node['rationales'] = kept[node.get('id')]
+                    if topic_code:
+                        refresh_node_summary(node)
+                    packed = pack_rationales({'nodes': [node]})
+                    for text_id, text in packed[RATIONALE_TABLE_KEY].items():
+                        texts.add((text_id, position, text))
+                        position += 1
+                    out.write(('\n' if i == 0 else ',\n') + '    ' + _indented(packed['nodes'][0], 2))
+                    if 'rationales' in node:
+                        node['rationales'] = NOT_LOADED
+                out.write('\n  ]')
+
+            table = ExternalSorter(tmp, budget, 'table')
+            previous_id = previous_text = None
+            for text_id, first, text in texts.merged():
+                if text_id == previous_id:
+                    if text != previous_text:
+                        raise ValueError(f"rationale id collision on {text_id}")
+                    continue
+                table.add((first, text_id, text))
+                previous_id, previous_text = text_id, text
+
+            out.write(f'{"" if first_key else ","}\n  {json.dumps(RATIONALE_TABLE_KEY)}: ')
+            text_count = 0
+            for _, text_id, text in table.merged():
+                out.write(('{\n' if text_count == 0 else ',\n')
+                          + f'    {json.dumps(text_id)}: {json.dumps(text, ensure_ascii=False)}')
+                text_count += 1
+            out.write('\n  }\n}' if text_count else '{}\n}')
+        os.replace(tmp_output, filepath)
+
+        return {
+            'rows': rows.count,
+            'unmatched_rows': unmatched,
+            'runs': rows.run_count + texts.run_count + table.run_count,
+            'topic_codes': len(offsets),
+            'nodes_synced': synced,
+            'kept_nodes': len(kept),
+            'texts': text_count,
+        }
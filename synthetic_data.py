@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic curriculum at any scale for benchmark.py.
+
+Writes, into one directory, the same files the data scripts read:
+
+    Calculus topic list-Table 1.csv     topic list (Course, Core Idea, Topic Code, Topic Name)
+    <Category>-Calc-Table 1.csv         one rationale CSV per category
+    graph_data.json                     nodes labelled after the topics, plus a prerequisite DAG
+    categories.json                     [[file name, category name], ...] for the rationale CSVs
+
+Topic names, CS topics and rationale paragraphs are assembled from fixed
+vocabularies with a seeded random generator, so the same arguments always
+produce the same files. Rationales run to about 90 words, like the real
+ones. About one node in ten gets a reworded label, so label matching
+exercises the partial matcher as well as exact lookups.
+
+Usage:
+    python3 synthetic_data.py OUT_DIR --scale large
+    python3 synthetic_data.py OUT_DIR --topics 2000 --rows 100000 --categories 12
+"""
+
+import argparse
+import csv
+import json
+import random
+from pathlib import Path
+
+from ingest import CALCULUS_LIST_FILE, CATEGORY_MANIFEST_FILE, GRAPH_DATA_FILE
+
+# name -> (topics, rationale rows, categories)
+SCALES = {
+    'today': (65, 175, 4),
+    'small': (500, 20_000, 8),
+    'medium': (2_000, 100_000, 12),
+    'large': (10_000, 1_000_000, 16),
+}
+
+CORE_IDEAS = [
+    ('Calculus I', 'Limits and Continuity', 'Lim'),
+    ('Calculus I', 'Derivatives', 'Der'),
+    ('Calculus I', 'Integrals', 'Int'),
+    ('Calculus II', 'Advanced Integration', 'AdvInt'),
+    ('Calculus II', 'Differential Equations', 'DiffEq'),
+    ('Calculus II', 'Sequences and Series', 'SeqSer'),
+    ('Calculus II', 'Parametric Equations and Polar Coordinates', 'ParamPol'),
+    ('Calculus III', 'Vector Calculus', 'Vec'),
+]
+CATEGORIES = [
+    'Machine Learning', 'Algorithms', 'Artificial Intelligence', 'Computer Graphics',
+    'Robotics', 'Computer Vision', 'Data Science', 'Scientific Computing',
+    'Networking', 'Cryptography', 'Databases', 'Human-Computer Interaction',
+    'Computational Biology', 'Game Development', 'Signal Processing', 'Quantum Computing',
+]
+TOPIC_PATTERNS = [
+    '{concept} of {object}',
+    'Using {concept} to find {quantity}',
+    '{concept} and {quantity}',
+    'Applications of {concept} to {field}',
+    'Motivating the need for {concept}',
+    '{object} with {concept}',
+]
+CONCEPTS = [
+    'limits', 'derivatives', 'integrals', 'series', 'approximations', 'differentials',
+    'substitutions', 'transforms', 'gradients', 'continuity', 'convergence', 'optimization',
+    'linearization', 'parametrizations', 'rates of change', 'antiderivatives',
+]
+OBJECTS = [
+    'polynomial functions', 'exponential models', 'trigonometric functions', 'vector fields',
+    'power series', 'polar curves', 'logarithmic functions', 'piecewise functions',
+    'implicit curves', 'rational functions', 'sequences', 'surfaces',
+]
+QUANTITIES = [
+    'area', 'volume', 'arc length', 'work', 'probability', 'error bounds', 'extreme values',
+    'average value', 'center of mass', 'surface area', 'growth rates', 'curvature',
+]
+FIELDS = [
+    'physics', 'economics', 'biology', 'engineering', 'statistics', 'graphics',
+    'finance', 'chemistry', 'networks', 'control systems',
+]
+REWORDINGS = ['Introducing {}', 'Understanding {}', '{} in context', 'Exploring {}']
+CS_TERMS = [
+    'gradient', 'loss', 'shader', 'kernel', 'heuristic', 'policy', 'embedding', 'spline',
+    'filter', 'estimator', 'search', 'sampling', 'rendering', 'scheduling', 'clustering',
+    'regression', 'ray', 'mesh', 'signal', 'graph', 'tree', 'hash', 'cache', 'network',
+]
+CS_SUFFIXES = ['descent', 'functions', 'analysis', 'methods', 'models', 'pipelines', 'tracing', 'design']
+SENTENCE_PARTS = [
+    ('Calculus provides', 'The derivative gives', 'Integration supplies', 'Limits formalize',
+     'Series expansions offer', 'Rates of change describe', 'Approximation theory yields'),
+    ('a precise way to reason about', 'the tools needed to analyze', 'a model for',
+     'the foundation for understanding', 'an efficient method to estimate', 'a bound on'),
+    ('continuous change in data', 'the behavior of iterative algorithms', 'smooth surfaces and curves',
+     'the cost of a computation', 'error in numerical methods', 'the shape of an objective',
+     'probabilistic outcomes', 'motion and transformation'),
+    ('in practice.', 'for real systems.', 'when inputs grow.', 'across many applications.',
+     'with measurable accuracy.', 'in modern software.'),
+]
+
+
+def _column_name(index):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA', like the ids in graph_data.json"""
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def generate_topics(count, rng):
+    """[(course, core idea, topic code, topic name)] with unique names"""
+    topics = []
+    seen = set()
+    per_core_idea = {}
+    for i in range(count):
+        course, core_idea, prefix = CORE_IDEAS[i * len(CORE_IDEAS) // max(count, 1)]
+        name = rng.choice(TOPIC_PATTERNS).format(
+            concept=rng.choice(CONCEPTS), object=rng.choice(OBJECTS),
+            quantity=rng.choice(QUANTITIES), field=rng.choice(FIELDS),
+        )
+        name = name[0].upper() + name[1:]
+        base, suffix = name, 2
+        while name.lower() in seen:
+            name = f'{base} {suffix}'
+            suffix += 1
+        seen.add(name.lower())
+        per_core_idea[prefix] = per_core_idea.get(prefix, 0) + 1
+        topics.append((course, core_idea, f'{prefix}{per_core_idea[prefix]}', name))
+    return topics
+
+
+def _rationale(rng, words, serial):
+    sentences = []
+    length = 0
+    while length < words:
+        sentence = ' '.join(rng.choice(part) for part in SENTENCE_PARTS)
+        sentences.append(sentence)
+        length += len(sentence.split())
+    # A serial keeps every paragraph distinct, as real rationales are
+    sentences.append(f'See example {serial}.')
+    return ' '.join(sentences)
+
+
+def write_synthetic_dataset(out_dir, topics=65, rows=175, categories=4, seed=0,
+                            rationale_words=90, edges_per_node=1.5):
+    """Write a synthetic dataset into out_dir; returns a summary dict"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    topic_rows = generate_topics(topics, rng)
+
+    with open(out_dir / CALCULUS_LIST_FILE, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Course', 'Core Idea', 'Topic Code', 'Topic Name'])
+        writer.writerows(topic_rows)
+
+    category_names = [
+        CATEGORIES[i] if i < len(CATEGORIES) else f'Category {i + 1}'
+        for i in range(categories)
+    ]
+    category_files = [(f'{name.replace(" ", "")}-Calc-Table 1.csv', name) for name in category_names]
+    cs_topics = {
+        name: sorted({f'{rng.choice(CS_TERMS).capitalize()} {rng.choice(CS_SUFFIXES)}'
+                      for _ in range(40)})
+        for name in category_names
+    }
+
+    # Earlier topics get more rationales, like the introductory ones do today
+    weights = [1.0 / (1 + i * 0.05) for i in range(len(topic_rows))]
+    writers = []
+    handles = []
+    try:
+        for filename, _ in category_files:
+            handle = open(out_dir / filename, 'w', encoding='utf-8', newline='')
+            handles.append(handle)
+            writer = csv.writer(handle)
+            writer.writerow(['Calculus course', 'Calculus topic', 'CS topic', 'Strength', 'Rationale', 'Retrieval Sources'])
+            writers.append(writer)
+
+        chosen_topics = rng.choices(range(len(topic_rows)), weights=weights, k=rows)
+        for serial, topic_index in enumerate(chosen_topics):
+            category_index = serial % categories
+            course, _, _, topic_name = topic_rows[topic_index]
+            writers[category_index].writerow([
+                course,
+                topic_name,
+                rng.choice(cs_topics[category_names[category_index]]),
+                rng.choice((1, 1, 2, 2, 3)),
+                _rationale(rng, rationale_words, serial),
+                'Synthetic.pdf (p.1)',
+            ])
+    finally:
+        for handle in handles:
+            handle.close()
+
+    with open(out_dir / CATEGORY_MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(category_files, f, ensure_ascii=False, indent=2)
+
+    nodes = []
+    for i, (course, _, _, topic_name) in enumerate(topic_rows):
+        label = topic_name
+        if rng.random() < 0.1:
+            label = rng.choice(REWORDINGS).format(topic_name[0].lower() + topic_name[1:])
+        # number_ids above the real ones, so topic_code_map.json never applies
+        nodes.append({'id': _column_name(i), 'number_id': 100_000 + i, 'label': label, 'calc_level': course})
+
+    edges = set()
+    for target in range(1, len(nodes)):
+        for _ in range(max(1, round(rng.expovariate(1 / edges_per_node)))):
+            source = rng.randrange(max(0, target - 50), target)
+            edges.add((nodes[source]['id'], nodes[target]['id']))
+    graph = {
+        'nodes': nodes,
+        'edges': [{'source': source, 'target': target} for source, target in sorted(edges)],
+    }
+    with open(out_dir / GRAPH_DATA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False)
+
+    return {
+        'topics': len(topic_rows),
+        'rows': rows,
+        'categories': categories,
+        'nodes': len(nodes),
+        'edges': len(graph['edges']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic curriculum dataset')
+    parser.add_argument('out_dir', help='directory to write the files into')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='today')
+    parser.add_argument('--topics', type=int, help='override the number of calculus topics')
+    parser.add_argument('--rows', type=int, help='override the number of rationale rows')
+    parser.add_argument('--categories', type=int, help='override the number of categories')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    topics, rows, categories = SCALES[args.scale]
+    summary = write_synthetic_dataset(
+        args.out_dir,
+        topics=args.topics or topics,
+        rows=args.rows or rows,
+        categories=args.categories or categories,
+        seed=args.seed,
+    )
+    print(f"Wrote {summary['topics']} topics, {summary['rows']} rationale rows in "
+          f"{summary['categories']} categories, {summary['nodes']} nodes and "
+          f"{summary['edges']} edges to {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# The scripts are top-level modules in the repository root
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+DATA_FILES = ('*.csv', 'categories.json', 'topic_code_map.json', 'graph_data.json', '*.mmd')
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A scratch copy of the CSVs, chart and graph_data.json the data scripts read"""
+    for pattern in DATA_FILES:
+        for path in REPO_ROOT.glob(pattern):
+            shutil.copy2(path, tmp_path / path.name)
+    return tmp_path
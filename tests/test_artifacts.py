@@ -0,0 +1,25 @@
+import pytest
+
+import artifacts
+from artifacts import write_artifacts
+from build_postings import POSTINGS_FILE
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE
+
+
+def test_failed_build_leaves_the_files_untouched(data_dir, monkeypatch):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    graph = load_graph(graph_file)
+    write_artifacts(graph, data_dir)
+    before = {path.name: path.read_bytes() for path in (graph_file, data_dir / POSTINGS_FILE)}
+
+    def fail(graph):
+        raise OverflowError('builder failed')
+
+    graph['nodes'][0]['label'] = 'changed'
+    monkeypatch.setattr(artifacts, 'build_postings', fail)
+    monkeypatch.setattr(artifacts, 'postings_key', lambda graph: 'new key')
+    with pytest.raises(OverflowError):
+        write_artifacts(graph, data_dir)
+    assert {name: (data_dir / name).read_bytes() for name in before} == before
+    assert not list(data_dir.glob('*.tmp'))
@@ -0,0 +1,99 @@
+import csv
+import json
+
+from artifacts import write_artifacts
+from build_cache import IncrementalBuild
+from build_postings import POSTINGS_FILE
+from build_reachability import REACHABILITY_FILE
+from build_shards import SHARD_DIR
+from convert_data import update_graph_data
+from graph_io import load_graph, write_graph
+from ingest import CATEGORY_MANIFEST_FILE, GRAPH_DATA_FILE, load_dataset
+from topic_codes import TOPIC_CODE_MAP_FILE
+
+EDITED_FILE = 'ML-Calc-Table 1.csv'
+
+
+def _edit_first_rationale(data_dir):
+    path = data_dir / EDITED_FILE
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    rows[1][4] += ' (edited)'
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def _full_build(data_dir):
+    """What convert_data.py writes after a full rebuild; returns the graph file"""
+    build = IncrementalBuild(data_dir)
+    graph_file = data_dir / GRAPH_DATA_FILE
+    graph = update_graph_data(load_graph(graph_file), build.dataset)
+    write_artifacts(graph, data_dir, graph_file)
+    build.commit(graph_file)
+    return graph_file
+
+
+def test_unchanged_csvs_are_served_from_cache(data_dir):
+    graph_file = _full_build(data_dir)
+
+    build = IncrementalBuild(data_dir)
+    assert build.can_patch(graph_file)
+    assert not build.has_changes
+    assert build.cache_hits == len(build.file_entries)
+
+
+def test_patch_matches_full_rebuild(data_dir, tmp_path_factory):
+    graph_file = _full_build(data_dir)
+    original = load_graph(graph_file)
+    _edit_first_rationale(data_dir)
+
+    build = IncrementalBuild(data_dir)
+    assert build.can_patch(graph_file)
+    assert build.cache_hits == len(build.file_entries) - 1
+    assert len(build.changed_groups) == 1
+    patched = load_graph(graph_file)
+    changed_nodes = build.patch(patched)
+    assert changed_nodes
+
+    full = update_graph_data(original, load_dataset(data_dir))
+    out = tmp_path_factory.mktemp('out')
+    write_graph(patched, out / 'patched.json')
+    write_graph(full, out / 'full.json')
+    assert (out / 'patched.json').read_bytes() == (out / 'full.json').read_bytes()
+
+
+def test_incremental_write_skips_unaffected_artifacts(data_dir):
+    graph_file = _full_build(data_dir)
+    _edit_first_rationale(data_dir)
+
+    def mtimes():
+        files = [data_dir / POSTINGS_FILE, data_dir / REACHABILITY_FILE, *(data_dir / SHARD_DIR).glob('*.json')]
+        return {path.name: path.stat().st_mtime_ns for path in files}
+
+    before = mtimes()
+    build = IncrementalBuild(data_dir)
+    graph = load_graph(graph_file)
+    changed_nodes = build.patch(graph)
+    write_artifacts(graph, data_dir, graph_file, changed_nodes)
+    after = mtimes()
+
+    rewritten = {name for name in before if before[name] != after[name]}
+    # Only a rationale text changed: postings and reachability stay, one shard is rewritten
+    assert len(rewritten) == 1
+    assert POSTINGS_FILE not in rewritten and REACHABILITY_FILE not in rewritten
+
+
+def test_config_changes_force_a_full_rebuild(data_dir):
+    graph_file = _full_build(data_dir)
+    assert IncrementalBuild(data_dir).can_patch(graph_file)
+
+    map_file = data_dir / TOPIC_CODE_MAP_FILE
+    map_file.write_text(map_file.read_text(encoding='utf-8') + '\n', encoding='utf-8')
+    build = IncrementalBuild(data_dir)
+    assert build.config_changed
+    assert not build.can_patch(graph_file)
+
+    build.commit(graph_file)
+    categories = json.loads((data_dir / CATEGORY_MANIFEST_FILE).read_text(encoding='utf-8'))
+    (data_dir / CATEGORY_MANIFEST_FILE).write_text(json.dumps(categories[::-1]), encoding='utf-8')
+    assert not IncrementalBuild(data_dir).can_patch(graph_file)
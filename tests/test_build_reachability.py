@@ -0,0 +1,53 @@
+import pytest
+
+from artifacts import write_artifacts
+from build_reachability import Reachability, build_reachability, write_reachability
+
+
+def _graph(node_ids, edges):
+    return {
+        'nodes': [{'id': node_id} for node_id in node_ids],
+        'edges': [{'source': source, 'target': target} for source, target in edges],
+    }
+
+
+# A -> B -> C and A -> D; E stands alone
+DIAMOND = _graph('ABCDE', [('A', 'B'), ('B', 'C'), ('A', 'D')])
+
+
+def test_closure_levels_and_critical_path():
+    reach = Reachability.from_graph(DIAMOND)
+    assert reach.is_ancestor('A', 'C')
+    assert not reach.is_ancestor('C', 'A')
+    assert not reach.is_ancestor('D', 'C')
+    assert reach.is_descendant('C', 'A')
+    assert reach.ancestors('C') == ['A', 'B']
+    assert reach.descendants('A') == ['B', 'C', 'D']
+    assert reach.descendants('E') == []
+    assert [reach.level(node) for node in 'ABCDE'] == [0, 1, 2, 1, 0]
+    assert reach.height('A') == 2
+    assert reach.critical_path == ['A', 'B', 'C']
+
+
+def test_bitsets_past_a_byte_boundary():
+    node_ids = [f'N{i}' for i in range(20)]
+    reach = Reachability.from_graph(_graph(node_ids, zip(node_ids, node_ids[1:])))
+    assert reach.is_ancestor('N0', 'N19')
+    assert reach.is_ancestor('N8', 'N9')
+    assert not reach.is_ancestor('N19', 'N0')
+    assert reach.ancestors('N10') == node_ids[:10]
+
+
+def test_written_file_round_trips(tmp_path):
+    reach = Reachability.load(write_reachability(DIAMOND, tmp_path))
+    assert reach.ancestors('C') == ['A', 'B']
+    assert reach.critical_path == ['A', 'B', 'C']
+
+
+def test_cycle_is_rejected_before_anything_is_written(tmp_path):
+    cyclic = _graph('ABC', [('A', 'B'), ('B', 'C'), ('C', 'A')])
+    with pytest.raises(ValueError, match='cycle'):
+        build_reachability(cyclic)
+    with pytest.raises(ValueError, match='cycle'):
+        write_artifacts(cyclic, tmp_path)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,88 @@
+import sys
+
+import pytest
+
+import build_store as build_store_module
+from build_shards import SKELETON_FILE
+from build_store import STORE_FILE, Store, build_store, fts_query
+from graph_io import load_graph, write_graph
+from ingest import GRAPH_DATA_FILE, load_dataset
+
+
+@pytest.fixture
+def store(data_dir):
+    db_file = data_dir / 'curriculum.db'
+    build_store(load_dataset(data_dir), load_graph(data_dir / GRAPH_DATA_FILE), db_file)
+    with Store(db_file) as store:
+        yield store
+
+
+def test_fts_query_quotes_every_word():
+    assert fts_query('chain-rule') == '"chain-rule"'
+    assert fts_query('say "hi') == '"say" """hi"'
+    assert fts_query('gradien* OR') == '"gradien"* "OR"'
+    assert fts_query('   ') == ''
+
+
+@pytest.mark.parametrize('query', ['chain-rule', 'say "hi', 'OR', 'NEAR(', '*', '   '])
+def test_search_never_raises_on_user_input(store, query):
+    store.search(query)
+
+
+def test_search_matches_words_and_prefixes(store):
+    hyphenated = store.search('chain-rule')
+    assert hyphenated
+    assert all('[chain' in row['snippet'].lower() for row in hyphenated)
+    assert store.search('chain rule')
+    assert store.search('gradien*')
+
+
+def test_topics_for_cs_topic(store):
+    rows = store.topics_for_cs_topic('gradient DESCENT', min_strength=2)
+    assert rows
+    assert all(row['strength'] >= 2 for row in rows)
+    assert [row['strength'] for row in rows] == sorted((row['strength'] for row in rows), reverse=True)
+
+
+def test_export_writes_the_same_graph(store, data_dir):
+    write_graph(store.export_graph(), data_dir / 'exported.json')
+    assert (data_dir / 'exported.json').read_bytes() == (data_dir / GRAPH_DATA_FILE).read_bytes()
+
+
+def test_nodes_without_csv_rows_keep_their_rationales(data_dir):
+    dataset = load_dataset(data_dir)
+    graph = load_graph(data_dir / GRAPH_DATA_FILE)
+    without_rows = next(node for node in graph['nodes']
+                        if node.get('topicCode') and node['topicCode'] not in dataset.by_topic_code)
+    without_rows['rationales'] = {'Machine Learning': [
+        {'cs_topic': 'Kept topic', 'strength': 2, 'rationale': 'A rationale the CSVs do not have.'}]}
+    graph['nodes'].append({'id': 'Extra', 'label': 'No topic code', 'rationales': {
+        'Algorithms': [{'cs_topic': 'Loose end', 'strength': 3, 'rationale': 'Only in the graph.'}]}})
+    db_file = data_dir / 'curriculum.db'
+    build_store(dataset, graph, db_file)
+    with Store(db_file) as store:
+        exported = store.export_graph()
+
+    nodes = {node['id']: node for node in exported['nodes']}
+    assert nodes[without_rows['id']]['rationales']['Machine Learning'][0]['cs_topic'] == 'Kept topic'
+    extra = nodes['Extra']
+    assert extra['rationales']['Algorithms'][0]['rationale'] == 'Only in the graph.'
+    assert extra['cs_categories'] == ['Algorithms']
+    assert extra['strength_by_cs_topic'] == {'Algorithms': {'Loose end': 3}}
+
+
+def test_build_exports_graph_data_from_the_store(data_dir, monkeypatch):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    before = graph_file.read_bytes()
+    monkeypatch.setattr(build_store_module, 'BASE_PATH', data_dir)
+    monkeypatch.setattr(sys, 'argv', ['build_store.py'])
+    build_store_module.main()
+    assert (data_dir / STORE_FILE).exists()
+    assert (data_dir / SKELETON_FILE).exists()
+    assert graph_file.read_bytes() == before
+
+    # --export alone rewrites graph_data.json from the store
+    graph_file.write_text('{}', encoding='utf-8')
+    monkeypatch.setattr(sys, 'argv', ['build_store.py', '--export'])
+    build_store_module.main()
+    assert graph_file.read_bytes() == before
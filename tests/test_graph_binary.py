@@ -0,0 +1,39 @@
+from graph_binary import BinaryGraph, write_binary_graph
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE
+
+
+def test_round_trip_of_the_bundled_graph(data_dir):
+    graph = load_graph(data_dir / GRAPH_DATA_FILE)
+    with BinaryGraph(write_binary_graph(graph, data_dir / 'graph_data.bin')) as binary:
+        assert len(binary) == len(graph['nodes'])
+        assert binary.to_graph() == graph
+
+
+def test_lookups(data_dir):
+    graph = load_graph(data_dir / GRAPH_DATA_FILE)
+    node = next(node for node in graph['nodes'] if node.get('topicCode') and node.get('rationales'))
+    with BinaryGraph(write_binary_graph(graph, data_dir / 'graph_data.bin')) as binary:
+        found = binary.find(node['id'])
+        assert found.topic_code == node['topicCode']
+        assert found.to_dict() == node
+        assert node['id'] in [match.id for match in binary.find_topic(node['topicCode'])]
+        assert binary.find('no such node') is None
+        assert list(binary.edges()) == [(edge['source'], edge['target']) for edge in graph['edges']]
+
+
+def test_extra_fields_survive(tmp_path):
+    graph = {
+        'nodes': [{
+            'id': 'A', 'label': 'Limits', 'x': 1.5, 'y': -2.0, 'custom': [1, 2],
+            'rationales': {'Algorithms': [
+                {'cs_topic': 'Sorting', 'strength': 3, 'rationale': 'text', 'note': 'kept'},
+                {'cs_topic': 'Search', 'strength': None, 'rationale': ''},
+            ]},
+        }],
+        'edges': [{'source': 'A', 'target': 'A', 'kind': 'self'}],
+        'title': 'extra top-level field',
+    }
+    with BinaryGraph(write_binary_graph(graph, tmp_path / 'g.bin')) as binary:
+        assert binary.to_graph() == graph
+        assert binary.find('A').position == (1.5, -2.0)
@@ -0,0 +1,27 @@
+from graph_binary import BinaryGraph, build_binary_graph
+from graph_model import GraphModel
+
+GRAPH = {
+    'nodes': [{
+        'id': 'A', 'topicCode': 'Lim1',
+        'rationales': {'Algorithms': [
+            {'cs_topic': 'Sorting', 'strength': 3, 'rationale': 'fits'},
+            {'cs_topic': 'Search', 'strength': 40000, 'rationale': 'too large'},
+            {'cs_topic': 'Graphs', 'strength': -1, 'rationale': 'the sentinel'},
+            {'cs_topic': 'Hashing', 'strength': None, 'rationale': 'none'},
+            {'cs_topic': 'Heaps', 'strength': 2.5, 'rationale': 'fractional'},
+        ]},
+    }],
+    'edges': [],
+}
+
+
+def test_strengths_outside_the_array_round_trip(tmp_path):
+    model = GraphModel.from_graph(GRAPH)
+    assert model.to_graph() == GRAPH
+    assert [item.strength for item in model.rationales(model.nodes[0])] == [3, 40000, -1, None, 2.5]
+
+    path = tmp_path / 'graph_data.bin'
+    path.write_bytes(build_binary_graph(GRAPH))
+    with BinaryGraph(path) as binary:
+        assert binary.to_graph() == GRAPH
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import ingest
+from ingest import (
+    CATEGORY_MANIFEST_FILE,
+    DEFAULT_STRENGTH,
+    MAX_STRENGTH,
+    discover_category_files,
+    load_dataset,
+    normalize_text,
+    parse_category_files,
+    parse_strength,
+)
+
+
+def test_normalize_text_matches_app_js():
+    assert normalize_text('Limits & Continuity') == 'limitsandcontinuity'
+    assert normalize_text(' "The Chain-Rule" ') == 'thechainrule'
+    assert normalize_text(None) == ''
+
+
+def test_rows_are_indexed_by_topic_code(data_dir):
+    dataset = load_dataset(data_dir)
+    assert dataset.categories == ['Machine Learning', 'Algorithms', 'Artificial Intelligence', 'Computer Graphics']
+    matched = [row for row in dataset.rows if row['topic_code']]
+    assert matched
+    for row in matched:
+        items = dataset.by_topic_code[row['topic_code']][row['category']]
+        assert any(item['cs_topic'] == row['cs_topic'] and item['rationale'] == row['rationale'] for item in items)
+    assert len(dataset.unmatched_rows()) == len(dataset.rows) - len(matched)
+
+
+def test_dataset_is_reused_while_the_files_are_unchanged(data_dir):
+    dataset = load_dataset(data_dir)
+    assert load_dataset(data_dir) is dataset
+    # Repeated strings are shared between rows
+    cs_topics = {}
+    for row in dataset.rows:
+        assert cs_topics.setdefault(row['cs_topic'], row['cs_topic']) is row['cs_topic']
+
+
+def test_category_files_without_a_manifest(data_dir):
+    listed = discover_category_files(data_dir)
+    (data_dir / CATEGORY_MANIFEST_FILE).unlink()
+    found = discover_category_files(data_dir)
+    assert sorted(found) == sorted(listed)
+    assert [path.name for path, _ in found] == sorted(path.name for path, _ in found)
+
+
+def test_parse_strength():
+    assert [parse_strength(value) for value in ('3', ' 2 ', '4.0', '1e2')] == [3, 2, 4, 100]
+    for invalid in ('', None, 'high', '2.5', '0', '-3', 'nan', 'inf', '1e400'):
+        assert parse_strength(invalid) == DEFAULT_STRENGTH
+    assert parse_strength('40000') == MAX_STRENGTH
+    assert parse_strength('1e300') == MAX_STRENGTH
+
+
+def test_missing_manifest_file_is_an_error(data_dir):
+    manifest = data_dir / CATEGORY_MANIFEST_FILE
+    entries = json.loads(manifest.read_text(encoding='utf-8'))
+    entries[1][0] = 'Alg-Calc-Tabel 1.csv'
+    manifest.write_text(json.dumps(entries), encoding='utf-8')
+    with pytest.raises(FileNotFoundError, match='Alg-Calc-Tabel 1.csv'):
+        discover_category_files(data_dir)
+
+
+def test_process_pool_gives_the_same_rows_with_shared_strings(data_dir, monkeypatch):
+    files = discover_category_files(data_dir)
+    serial, serial_keys = parse_category_files(files, workers=1)
+    monkeypatch.setattr(ingest, 'PARALLEL_MIN_BYTES', 0)
+    parallel, parallel_keys = parse_category_files(files, workers=2)
+    assert parallel == serial
+    assert parallel_keys == serial_keys
+    rows = [row for rows in parallel.values() for row in rows]
+    by_value = {}
+    for row in rows:
+        for field in ('calc_topic', 'cs_topic', 'category'):
+            assert by_value.setdefault(row[field], row[field]) is row[field]
@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from layout import _charge_exact, _charge_tree, apply_layout, compute_layout
+
+
+def _graph(count):
+    node_ids = [f'N{i}' for i in range(count)]
+    return {
+        'nodes': [{'id': node_id} for node_id in node_ids],
+        'edges': [{'source': node_ids[i // 2], 'target': node_ids[i]} for i in range(1, count)],
+    }
+
+
+def test_tree_charge_approximates_the_exact_sum():
+    pos = np.random.default_rng(0).uniform(-2000, 2000, size=(3000, 2))
+    exact = _charge_exact(pos, 1.0)
+    approx = _charge_tree(pos, 1.0)
+    error = np.linalg.norm(approx - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.median(error) < 0.02
+
+
+def test_layout_is_deterministic_and_spread_out():
+    graph = _graph(30)
+    node_ids = [node['id'] for node in graph['nodes']]
+    edges = [(edge['source'], edge['target']) for edge in graph['edges']]
+    first = compute_layout(node_ids, edges)
+    assert np.array_equal(first, compute_layout(node_ids, edges))
+    assert np.isfinite(first).all()
+    gaps = np.linalg.norm(first[:, None, :] - first[None, :, :], axis=2)[np.triu_indices(30, 1)]
+    assert gaps.min() > 1.0
+
+
+def test_positions_are_cached_until_the_edges_change(tmp_path):
+    graph = _graph(20)
+    assert apply_layout(graph, tmp_path)
+    positions = [(node['x'], node['y']) for node in graph['nodes']]
+
+    again = _graph(20)
+    assert not apply_layout(again, tmp_path)
+    assert [(node['x'], node['y']) for node in again['nodes']] == positions
+
+    again['edges'].pop()
+    assert apply_layout(again, tmp_path)
@@ -0,0 +1,54 @@
+import pytest
+
+from mermaid_edges import MermaidSyntaxError, load_mermaid, parse_mermaid
+
+
+def _edges(*lines):
+    return parse_mermaid(lines)[1]
+
+
+def test_declarations_and_labels():
+    labels, edges = parse_mermaid([
+        'flowchart TD',
+        'A(["Limits"]) --> B["Chain &amp; rule"]',
+        'S@{ label: "L\'Hopitals rule" }',
+        'classDef big font-size:20px',
+        'B:::big --> S',
+    ])
+    assert labels == {'A': 'Limits', 'B': 'Chain & rule', 'S': "L'Hopitals rule"}
+    assert edges == [('A', 'B'), ('B', 'S')]
+
+
+def test_chains_and_groups():
+    assert _edges('A --> B & C --> D') == [('A', 'B'), ('A', 'C'), ('B', 'D'), ('C', 'D')]
+
+
+@pytest.mark.parametrize('link', ['-->', '---', '==>', '-.->', '-->|why|', '--o', '--x'])
+def test_link_styles(link):
+    assert _edges(f'A {link} B') == [('A', 'B')]
+
+
+@pytest.mark.parametrize('line', [
+    'A -- needs --> B',
+    'A--needs-->B',
+    'A -- two words --- B',
+    'A == needs ==> B',
+    'A -. needs .-> B',
+])
+def test_link_text_between_dashes_is_one_edge(line):
+    assert _edges(line) == [('A', 'B')]
+
+
+def test_comments_frontmatter_and_semicolons():
+    assert _edges('---', 'title: Chart', '---', '%% note', 'A --> B; B --> C') == [('A', 'B'), ('B', 'C')]
+
+
+def test_dangling_link_is_an_error():
+    with pytest.raises(MermaidSyntaxError):
+        _edges('A -->')
+
+
+def test_bundled_chart_parses():
+    labels, edges = load_mermaid()
+    assert edges
+    assert all(source in labels and target in labels for source, target in edges)
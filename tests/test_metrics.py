@@ -0,0 +1,28 @@
+import json
+import tracemalloc
+
+import metrics
+
+
+def test_profile_alone_does_not_trace_memory(tmp_path):
+    with metrics.collect('test', profile_path=tmp_path / 'run.prof') as run:
+        assert not tracemalloc.is_tracing()
+        with run.stage('work'):
+            sum(range(1000))
+    assert (tmp_path / 'run.prof').exists()
+    assert 'traced_peak_mb' not in run.stages[0]
+
+
+def test_metrics_file_has_stages_and_counters(tmp_path):
+    with metrics.collect('test', tmp_path / 'run.json') as run:
+        assert tracemalloc.is_tracing()
+        with run.stage('work'):
+            metrics.count('rows', 3)
+            bytes(200 * 1024)
+    assert not tracemalloc.is_tracing()
+    report = json.loads((tmp_path / 'run.json').read_text(encoding='utf-8'))
+    stage = report['stages'][0]
+    assert stage['name'] == 'work'
+    assert stage['counters'] == {'rows': 3}
+    assert stage['traced_peak_mb'] >= 0.1
+    assert report['counters'] == {'rows': 3}
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from near_duplicates import MAX_BUCKET_SIZE, find_near_duplicates, lsh_candidates, minhash_signatures
+
+WORDS = ('limit derivative integral series vector matrix gradient descent network graph '
+         'tree search sort hash probability entropy kernel curve surface volume').split()
+PASTED = ('The gradient of the loss is computed with the chain rule, so backpropagation '
+          'needs the derivative of every layer with respect to its inputs.')
+
+
+def _unique_rows(count, seed=0):
+    rng = random.Random(seed)
+    return [{'rationale': ' '.join(rng.choices(WORDS, k=25))} for _ in range(count)]
+
+
+def test_reworded_copy_is_clustered():
+    rows = _unique_rows(40) + [
+        {'rationale': PASTED},
+        {'rationale': PASTED.replace('every layer', 'each layer')},
+    ]
+    clusters, stats = find_near_duplicates(rows)
+    assert [cluster['rows'] for cluster in clusters] == [[40, 41]]
+    assert stats['confirmed_pairs'] == 1
+
+
+def test_oversized_bucket_of_exact_copies_is_still_found():
+    copies = MAX_BUCKET_SIZE + 50
+    rows = [{'rationale': PASTED} for _ in range(copies)] + _unique_rows(50)
+    clusters, _ = find_near_duplicates(rows)
+    assert clusters[0]['rows'] == list(range(copies))
+    assert clusters[0]['min_similarity'] == pytest.approx(1.0)
+
+
+def test_oversized_bucket_is_chained_not_expanded():
+    signatures = minhash_signatures([PASTED] * 10)
+    pairs = lsh_candidates(signatures, max_bucket=4)
+    assert sorted(map(tuple, pairs.tolist())) == [(0, i) for i in range(1, 10)]
+
+
+def test_unrelated_rows_give_no_clusters():
+    clusters, stats = find_near_duplicates(_unique_rows(30, seed=1)[:1] + [{'rationale': PASTED}])
+    assert clusters == []
+    assert stats['clusters'] == 0
@@ -0,0 +1,50 @@
+from graph_io import load_graph, write_graph
+from ingest import GRAPH_DATA_FILE
+from mermaid_edges import MERMAID_FILE, load_mermaid
+from pipeline import run_pipeline
+
+
+def test_verify_problems_are_counted_and_strict_skips_the_write(data_dir):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    _, problems = run_pipeline(['verify'], data_dir, write=False)
+    assert problems == 0
+
+    graph = load_graph(graph_file)
+    node = next(node for node in graph['nodes'] if node.get('topicCode') and node.get('rationales'))
+    next(iter(node['rationales'].values()))[0]['cs_topic'] = 'Not a CS topic'
+    write_graph(graph, graph_file)
+    before = graph_file.read_bytes()
+
+    timings, problems = run_pipeline(['verify'], data_dir, strict=True)
+    assert problems == 2
+    assert timings[-1][0] == 'write' and 'skipped' in timings[-1][2]
+    assert graph_file.read_bytes() == before
+
+
+def test_edges_come_from_the_chart_under_base_path(data_dir):
+    chart = data_dir / MERMAID_FILE
+    _, edges = load_mermaid(chart)
+    source, target = edges[0]
+    lines = chart.read_text(encoding='utf-8').splitlines()
+    # Drop every line that mentions the first edge's source node
+    chart.write_text('\n'.join(line for line in lines if source not in line) + '\n', encoding='utf-8')
+    _, fewer = load_mermaid(chart)
+    assert len(fewer) < len(edges)
+
+    timings, _ = run_pipeline(['edges'], data_dir)
+    assert timings[1][2].startswith(f"{len(fewer)} edges")
+    assert len(load_graph(data_dir / GRAPH_DATA_FILE)['edges']) == len(fewer)
+
+
+def test_per_node_lines_only_when_verbose(data_dir, capsys):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    graph = load_graph(graph_file)
+    node = next(node for node in graph['nodes'] if node.get('number_id') is not None and node.get('topicCode'))
+    node['topicCode'] = 'Wrong1'
+    write_graph(graph, graph_file)
+
+    timings, _ = run_pipeline(['fix_topic_codes'], data_dir, write=False)
+    assert timings[1][2].startswith('1 topic codes fixed')
+    assert capsys.readouterr().out == ''
+    run_pipeline(['fix_topic_codes'], data_dir, write=False, verbose=True)
+    assert node['id'] in capsys.readouterr().out
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+from http import HTTPStatus
+
+import pytest
+
+from graph_io import write_graph
+from query_service import ConnectionIndex, QueryError, QueryService, parse_connection_query
+
+ML = 'Machine Learning'
+
+
+def _node(node_id, topic_code, name, course, items):
+    return {
+        'id': node_id, 'topicCode': topic_code, 'topicName': name, 'course': course, 'coreIdea': 'Core',
+        'rationales': {ML: [{'cs_topic': topic, 'strength': strength, 'rationale': f'{name} {topic}'}
+                            for topic, strength in items]},
+    }
+
+
+GRAPH = {
+    'nodes': [
+        _node('A', 'Der2', 'Power rule', 'Calculus I', [('Gradient descent', 1)]),
+        _node('B', 'Der1', 'Chain rule', 'Calculus I', [('Gradient descent', 3), ('Backpropagation', 2)]),
+        _node('C', 'Int1', 'Area', 'Calculus II', [('Backpropagation', 1)]),
+    ],
+    'edges': [],
+}
+
+
+def test_query_filters_and_sorts():
+    index = ConnectionIndex(GRAPH)
+    page = index.query([(ML, 'Gradient descent'), (ML, 'Backpropagation')], sort='strength')
+    assert [result['id'] for result in page['results']] == ['B', 'A', 'C']
+    assert page['results'][0]['totalStrength'] == 5
+    assert page['results'][0]['totalConnections'] == 2
+    assert page['maxStrength'] == 5
+
+    page = index.query([(ML, 'Gradient descent')], courses=['Calculus I'], sort='default')
+    # Within a course and core idea, topic codes sort by prefix then number
+    assert [result['topicCode'] for result in page['results']] == ['Der1', 'Der2']
+
+    page = index.query([(ML, 'Backpropagation')], threshold=2)
+    assert [result['id'] for result in page['results']] == ['B']
+
+
+def test_normalized_key_is_order_insensitive_and_pages_share_a_ranking():
+    index = ConnectionIndex(GRAPH)
+    first = index.normalize([(ML, 'Backpropagation'), (ML, 'Gradient descent')])
+    second = index.normalize([(ML, ' Gradient descent '), (ML, 'Backpropagation'), (ML, 'Backpropagation')])
+    assert first == second
+
+    assert index.page(first, 0, 2)['total'] == 3
+    assert [result['id'] for result in index.page(first, 2, 2)['results']] == ['C']
+    assert index.stats()['rankingCache']['hits'] == 1
+
+
+def test_parse_connection_query():
+    query = parse_connection_query('cs=Machine Learning|Gradient descent&course=Calculus I&limit=5&sort=alpha')
+    assert query['cs_topics'] == [(ML, 'Gradient descent')]
+    assert query['courses'] == ['Calculus I']
+    assert (query['limit'], query['sort']) == (5, 'alpha')
+    for bad in ('cs=no-separator', 'limit=0', 'offset=x', 'threshold=nan', 'threshold=inf'):
+        with pytest.raises(QueryError):
+            parse_connection_query(bad)
+
+
+def test_service_responses(tmp_path):
+    graph_file = tmp_path / 'graph_data.json'
+    write_graph(GRAPH, graph_file)
+    service = QueryService(graph_file, quiet=True)
+
+    status, payload = service.handle('GET', '/api/connections?cs=Machine%20Learning|Backpropagation')
+    assert status == HTTPStatus.OK
+    assert [result['id'] for result in json.loads(payload)['results']] == ['B', 'C']
+    assert service.handle('GET', '/api/connections?sort=nope')[0] == HTTPStatus.BAD_REQUEST
+    assert service.handle('GET', '/elsewhere')[0] == HTTPStatus.NOT_FOUND
+    assert service.handle('POST', '/api/stats')[0] == HTTPStatus.METHOD_NOT_ALLOWED
+    assert service.handle('GET', '/api/stats')[1]['nodes'] == 3
+
+
+async def _exchange(service, requests):
+    """Send raw requests on one connection; returns (statuses, closed by the server)"""
+    server = await asyncio.start_server(service.serve_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    statuses = []
+    for request in requests:
+        writer.write(request)
+        head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+        length = int(next(line.split(':')[1] for line in head.split('\r\n')
+                          if line.lower().startswith('content-length')))
+        await reader.readexactly(length)
+        statuses.append(int(head.split()[1]))
+    closed = await reader.read() == b''
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return statuses, closed
+
+
+def _get(target, connection='close'):
+    return f'GET {target} HTTP/1.1\r\nHost: x\r\nConnection: {connection}\r\n\r\n'.encode()
+
+
+def test_keep_alive_connection_serves_several_requests(tmp_path):
+    graph_file = tmp_path / 'graph_data.json'
+    write_graph(GRAPH, graph_file)
+    service = QueryService(graph_file, quiet=True)
+    requests = [_get('/api/stats', 'keep-alive'), _get('/missing')]
+    assert asyncio.run(_exchange(service, requests)) == ([200, 404], True)
+
+
+def test_oversized_body_is_refused(tmp_path):
+    graph_file = tmp_path / 'graph_data.json'
+    write_graph(GRAPH, graph_file)
+    service = QueryService(graph_file, quiet=True)
+    request = b'GET /api/stats HTTP/1.1\r\nHost: x\r\nContent-Length: 1000000000\r\n\r\n'
+    assert asyncio.run(_exchange(service, [request])) == ([413], True)
+
+
+def test_reload_failure_answers_500_and_recovers(tmp_path):
+    graph_file = tmp_path / 'graph_data.json'
+    write_graph(GRAPH, graph_file)
+    service = QueryService(graph_file, quiet=True)
+    mtime_ns = graph_file.stat().st_mtime_ns
+
+    graph_file.write_text('{"nodes": [', encoding='utf-8')
+    os.utime(graph_file, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+    service._checked_at = 0.0
+    assert asyncio.run(_exchange(service, [_get('/api/stats')])) == ([500], True)
+
+    write_graph({'nodes': GRAPH['nodes'][:2], 'edges': []}, graph_file)
+    os.utime(graph_file, ns=(mtime_ns + 2 * 10**9, mtime_ns + 2 * 10**9))
+    service._checked_at = 0.0
+    assert asyncio.run(_exchange(service, [_get('/api/stats')])) == ([200], True)
+    assert service.handle('GET', '/api/stats')[1]['nodes'] == 2
@@ -0,0 +1,102 @@
+import gzip
+import http.client
+import socket
+import threading
+import time
+
+import pytest
+
+from serve import make_server
+
+BODY = b'0123456789' * 10
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'data.json').write_bytes(BODY)
+    (tmp_path / 'app.js').write_bytes(b'console.log(1)' * 20)
+    (tmp_path / '.secret').write_bytes(b'hidden')
+    server = make_server(tmp_path, bind='127.0.0.1', port=0, workers=2, quiet=True, keepalive_timeout=0.5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _get(server, path, headers=None, connection=None):
+    conn = connection or http.client.HTTPConnection(*server.server_address, timeout=5)
+    conn.request('GET', path, headers=headers or {})
+    response = conn.getresponse()
+    return response, response.read()
+
+
+def test_etag_and_not_modified(server):
+    response, body = _get(server, '/data.json')
+    assert response.status == 200
+    assert body == BODY
+    assert response.getheader('Cache-Control') == 'no-cache'
+    etag = response.getheader('ETag')
+
+    response, body = _get(server, '/data.json', {'If-None-Match': etag})
+    assert response.status == 304
+    assert body == b''
+    assert _get(server, '/data.json', {'If-None-Match': '"other"'})[0].status == 200
+
+
+def test_ranges(server):
+    response, body = _get(server, '/data.json', {'Range': 'bytes=2-5'})
+    assert response.status == 206
+    assert body == BODY[2:6]
+    assert response.getheader('Content-Range') == f'bytes 2-5/{len(BODY)}'
+
+    response, body = _get(server, '/data.json', {'Range': 'bytes=-3'})
+    assert (response.status, body) == (206, BODY[-3:])
+
+    response, _ = _get(server, '/data.json', {'Range': f'bytes={len(BODY)}-'})
+    assert response.status == 416
+    assert response.getheader('Content-Range') == f'bytes */{len(BODY)}'
+
+
+def test_if_range_with_a_stale_etag_sends_the_whole_file(server):
+    etag = _get(server, '/data.json')[0].getheader('ETag')
+    assert _get(server, '/data.json', {'Range': 'bytes=0-1', 'If-Range': etag})[0].status == 206
+    response, body = _get(server, '/data.json', {'Range': 'bytes=0-1', 'If-Range': '"stale"'})
+    assert (response.status, body) == (200, BODY)
+
+
+def test_precompressed_variant(server):
+    root = server.root
+    (root / 'app.js.gz').write_bytes(gzip.compress((root / 'app.js').read_bytes()))
+    response, body = _get(server, '/app.js', {'Accept-Encoding': 'gzip, br;q=0'})
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert gzip.decompress(body) == (root / 'app.js').read_bytes()
+    assert _get(server, '/app.js')[0].getheader('Content-Encoding') is None
+
+
+def test_dotfiles_and_escapes_are_not_served(server):
+    assert _get(server, '/.secret')[0].status == 404
+    assert _get(server, '/../etc/passwd')[0].status == 404
+
+
+def test_keep_alive_reuses_the_connection(server):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    _get(server, '/data.json', connection=conn)
+    sock = conn.sock
+    for _ in range(3):
+        response, body = _get(server, '/data.json', {'Range': 'bytes=0-0'}, connection=conn)
+        assert (response.status, body) == (206, b'0')
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_idle_keep_alive_connection_is_closed(server):
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(b'GET /data.json HTTP/1.1\r\nHost: x\r\n\r\n')
+        received = b''
+        while not received.endswith(BODY):
+            received += sock.recv(65536)
+        start = time.monotonic()
+        assert sock.recv(1) == b''
+        assert time.monotonic() - start < 4
@@ -0,0 +1,67 @@
+import pytest
+
+import metrics
+from build_postings import POSTINGS_FILE
+from build_shards import SKELETON_FILE
+from fix_all_topic_codes import fix_topic_codes, stream_fix, sync_rationales
+from graph_binary import BinaryGraph
+from graph_io import load_graph, write_graph
+from ingest import GRAPH_DATA_FILE, load_dataset
+from stream_ingest import load_graph_structure, write_graph_streaming
+
+KEPT = {'Machine Learning': [{'cs_topic': 'Kept topic', 'strength': 2, 'rationale': 'A rationale the CSVs do not have.'}]}
+
+
+def _add_rationales_the_csvs_do_not_have(graph_file, dataset):
+    graph = load_graph(graph_file)
+    without_rows = next(node for node in graph['nodes']
+                        if node.get('topicCode') and node['topicCode'] not in dataset.by_topic_code)
+    without_rows['rationales'] = KEPT
+    graph['nodes'].append({'id': 'Extra', 'label': 'No topic code', 'rationales': {
+        'Algorithms': [{'cs_topic': 'Loose end', 'strength': 1, 'rationale': 'Only in the graph.'}]}})
+    write_graph(graph, graph_file)
+
+
+def test_stream_writes_what_the_in_memory_sync_writes(data_dir, tmp_path_factory):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    dataset = load_dataset(data_dir)
+    _add_rationales_the_csvs_do_not_have(graph_file, dataset)
+    out = tmp_path_factory.mktemp('out')
+
+    graph = load_graph(graph_file)
+    fix_topic_codes(graph, dataset.calculus_topics, verbose=False)
+    sync_rationales(graph, dataset)
+    write_graph(graph, out / 'in_memory.json')
+
+    structure = load_graph_structure(graph_file)
+    fix_topic_codes(structure, dataset.calculus_topics, verbose=False)
+    # A budget of a few KiB, so every sort spills runs to disk
+    summary = write_graph_streaming(structure, data_dir, out / 'streamed.json', memory_mb=0.01,
+                                    source_file=graph_file)
+    assert summary['runs'] > 3
+    assert summary['kept_nodes'] == 2
+    assert (out / 'streamed.json').read_bytes() == (out / 'in_memory.json').read_bytes()
+
+
+def test_stream_fix_writes_the_derived_artifacts(data_dir):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    stream_fix(data_dir, graph_file, 1, metrics.Metrics('test', enabled=False))
+    graph = load_graph(graph_file)
+    assert (data_dir / SKELETON_FILE).exists() and (data_dir / POSTINGS_FILE).exists()
+    with BinaryGraph(graph_file.with_suffix('.bin')) as binary:
+        assert binary.to_graph() == graph
+    assert not list(data_dir.glob('*.stream'))
+
+
+def test_stream_fix_rejects_a_cycle_before_writing(data_dir):
+    graph_file = data_dir / GRAPH_DATA_FILE
+    graph = load_graph(graph_file)
+    edge = graph['edges'][0]
+    graph['edges'].append({'source': edge['target'], 'target': edge['source']})
+    write_graph(graph, graph_file)
+    before = graph_file.read_bytes()
+
+    with pytest.raises(ValueError, match='cycle'):
+        stream_fix(data_dir, graph_file, 1, metrics.Metrics('test', enabled=False))
+    assert graph_file.read_bytes() == before
+    assert not (data_dir / SKELETON_FILE).exists()
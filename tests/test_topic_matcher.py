@@ -0,0 +1,45 @@
+from topic_matcher import EXACT, MANUAL, PARTIAL, TopicMatcher, qgrams
+
+
+def _topic(code, name):
+    return {'topicCode': code, 'topicName': name, 'course': 'Calculus I', 'coreIdea': 'Derivatives'}
+
+
+TOPICS = {
+    'Der7': _topic('Der7', 'The chain rule'),
+    'Der9': _topic('Der9', 'Implicit differentiation and related rates'),
+    'Lim1': _topic('Lim1', 'Introduction to calculus and limits'),
+}
+
+
+def test_qgrams():
+    assert qgrams('chain') == {'cha', 'hai', 'ain'}
+    assert qgrams('ab') == {'ab'}
+    assert qgrams('') == set()
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    matcher = TopicMatcher(TOPICS)
+    topic, strategy = matcher.match_with_strategy('The Chain-Rule')
+    assert topic['topicCode'] == 'Der7'
+    assert strategy == EXACT
+
+
+def test_manual_mapping():
+    matcher = TopicMatcher(TOPICS, manual_mappings={'whyweneedlimits': 'Lim1'})
+    topic, strategy = matcher.match_with_strategy('Why we need limits')
+    assert topic['topicCode'] == 'Lim1'
+    assert strategy == MANUAL
+
+
+def test_partial_match_above_threshold():
+    matcher = TopicMatcher(TOPICS)
+    topic, strategy = matcher.match_with_strategy('Implicit differentiation')
+    assert topic['topicCode'] == 'Der9'
+    assert strategy == PARTIAL
+
+
+def test_short_or_unrelated_labels_do_not_match():
+    matcher = TopicMatcher(TOPICS)
+    assert matcher.match_with_strategy('chain') == (None, None)
+    assert matcher.match('Fourier series and transforms') is None
@@ -0,0 +1,33 @@
+from graph_io import load_graph
+from ingest import GRAPH_DATA_FILE, load_dataset
+from verify_sync import build_report, changed_texts, check_sync, problem_count
+
+
+def test_bundled_data_is_in_sync(data_dir):
+    result = check_sync(load_graph(data_dir / GRAPH_DATA_FILE), load_dataset(data_dir))
+    assert problem_count(result) == 0
+    assert build_report(result)['in_sync']
+
+
+def test_missing_extra_and_changed(data_dir):
+    dataset = load_dataset(data_dir)
+    graph = load_graph(data_dir / GRAPH_DATA_FILE)
+    node = next(node for node in graph['nodes']
+                if node.get('topicCode') and any(len(items) > 1 for items in node['rationales'].values()))
+    category, items = next((category, items) for category, items in node['rationales'].items() if len(items) > 1)
+    moved, edited = items[0], items[1]
+    missing_key = (node['topicCode'], category, moved['cs_topic'])
+    changed_key = (node['topicCode'], category, edited['cs_topic'])
+    moved['cs_topic'] = 'Not a CS topic'
+    edited['rationale'] += ' (edited)'
+
+    result = check_sync(graph, dataset)
+    assert result['missing'] == [missing_key]
+    assert result['extra'] == [(node['topicCode'], category, 'Not a CS topic')]
+    assert result['changed'] == [changed_key]
+    assert problem_count(result) == 3
+
+    texts = changed_texts(graph, dataset, {changed_key})
+    assert edited['rationale'] in texts['graph'][changed_key]
+    assert edited['rationale'] not in texts['csv'][changed_key]
+    assert build_report(result)['changed'][0]['cs_topic'] == changed_key[2]
@@ -0,0 +1,78 @@
+"""
+The number_id -> topic code mapping, shared by every data script.
+
+The rules live in topic_code_map.json:
+
+    "label_rules": {"<number_id>": [{"contains": [...], "topicCode": ...}, ...]}
+        for number_ids shared by several nodes; the first rule with a
+        substring of the lower-cased label wins (an empty list always does)
+    "number_ids": {"<number_id>": "<topic code>"}
+        the plain mapping, used when no label rule applies
+
+The build resolves every node's topicCode, topicName, course and coreIdea
+with resolve_topic() and stores them in graph_data.json, so app.js reads
+them as they are instead of repeating the rules in the browser.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import metrics
+from ingest import normalize_text
+
+TOPIC_CODE_MAP_FILE = 'topic_code_map.json'
+
+
+@lru_cache(maxsize=None)
+def load_topic_code_map(filepath=None):
+    """(label_rules, number_ids) keyed by int number_id"""
+    filepath = filepath or Path(__file__).parent / TOPIC_CODE_MAP_FILE
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    label_rules = {
+        int(number_id): [(tuple(rule['contains']), rule['topicCode']) for rule in rules]
+        for number_id, rules in data['label_rules'].items()
+    }
+    number_ids = {int(number_id): code for number_id, code in data['number_ids'].items()}
+    return label_rules, number_ids
+
+
+def topic_code_for(node_label, number_id):
+    """Topic code the mapping table gives a node, or None"""
+    if not number_id:
+        return None
+    label_rules, number_ids = load_topic_code_map()
+
+    label_lower = (node_label or '').lower()
+    for needles, topic_code in label_rules.get(number_id, ()):
+        if not needles or any(needle in label_lower for needle in needles):
+            return topic_code
+    return number_ids.get(number_id)
+
+
+def resolve_topic(node, calculus_topics, matcher=None):
+    """Topic info for a node: the mapping table first, then its label
+
+    matcher is an optional TopicMatcher; without one the label must match a
+    topic name exactly (after normalization), as app.js used to require.
+    """
+    topic_code = topic_code_for(node.get('label'), node.get('number_id'))
+    if topic_code in calculus_topics:
+        metrics.count('match.table')
+        return calculus_topics[topic_code]
+    if matcher is not None:
+        return matcher.match(node.get('label', ''))
+    normalized = normalize_text(node.get('label', ''))
+    for topic_info in calculus_topics.values():
+        if normalize_text(topic_info['topicName']) == normalized:
+            return topic_info
+    return None
+
+
+def apply_topic(node, topic_info):
+    """Copy a topic's code, name, course and core idea onto a node"""
+    node['topicCode'] = topic_info['topicCode']
+    node['topicName'] = topic_info['topicName']
+    node['course'] = topic_info['course']
+    node['coreIdea'] = topic_info['coreIdea']
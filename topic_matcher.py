@@ -0,0 +1,116 @@
+"""
+Indexed matching of graph node labels to Calculus topic list entries.
+
+Exact matches are a dict lookup on the normalized topic name. Manual
+mappings for known label mismatches come from MANUAL_MAPPINGS. Partial
+matches go through a trigram index: only topics that share a trigram with
+the label are scored, and the score is the fraction of the shorter string's
+trigrams found in the longer one (always between 0 and 1).
+"""
+
+import metrics
+from ingest import normalize_text
+
+# Normalized old node label -> topic code, for labels no longer close to the new topic name
+MANUAL_MAPPINGS = {
+    # "Motivating the need for calculus & limits" -> "Introduction to calculus and limits"
+    'motivatingtheneedforcalculuslimits': 'Lim1',
+    # "Sketching and graphing functions using information from derivatives" -> Der15
+    'sketchingandgraphingfunctionsusinginformationfromderivatives': 'Der15',
+    # "Application to physics" -> "Advanced physical applications" (AdvInt9, not Int10)
+    'applicationtophysics': 'AdvInt9',
+}
+
+EXACT = 'exact'
+MANUAL = 'manual'
+PARTIAL = 'partial'
+
+
+def qgrams(text, q=3):
+    """Set of overlapping q-character substrings of a normalized string"""
+    if len(text) < q:
+        return {text} if text else set()
+    return {text[i:i + q] for i in range(len(text) - q + 1)}
+
+
+class TopicMatcher:
+    """Precomputed exact, manual and trigram indexes over the calculus topics
+
+    Args:
+        calculus_topics: topic_code -> topic_info, as from ingest.parse_calculus_csv
+        manual_mappings: normalized label -> topic code overrides
+        min_partial_length: labels this short or shorter never use partial matching
+        threshold: minimum partial score to accept a match
+        q: q-gram length used by the partial index
+    """
+
+    def __init__(self, calculus_topics, manual_mappings=None, min_partial_length=10,
+                 threshold=0.7, q=3):
+        self.calculus_topics = calculus_topics
+        self.manual_mappings = MANUAL_MAPPINGS if manual_mappings is None else manual_mappings
+        self.min_partial_length = min_partial_length
+        self.threshold = threshold
+        self.q = q
+
+        self.by_name = {}
+        self._names = []
+        self._gram_counts = []
+        self._postings = {}
+        for topic_code, topic_info in calculus_topics.items():
+            normalized = normalize_text(topic_info['topicName'])
+            self.by_name.setdefault(normalized, topic_info)
+
+            topic_id = len(self._names)
+            grams = qgrams(normalized, q)
+            self._names.append(topic_code)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(topic_id)
+
+    def match_with_strategy(self, node_label):
+        """Return (topic_info, strategy) for a label, or (None, None) when nothing matches"""
+        normalized_label = normalize_text(node_label)
+
+        topic_info = self.by_name.get(normalized_label)
+        if topic_info:
+            metrics.count('match.exact')
+            return topic_info, EXACT
+
+        topic_code = self.manual_mappings.get(normalized_label)
+        if topic_code in self.calculus_topics:
+            metrics.count('match.manual')
+            return self.calculus_topics[topic_code], MANUAL
+
+        if len(normalized_label) > self.min_partial_length:
+            topic_info = self._partial_match(normalized_label)
+            if topic_info:
+                metrics.count('match.partial')
+                return topic_info, PARTIAL
+
+        metrics.count('match.miss')
+        return None, None
+
+    def match(self, node_label):
+        """Match a node label to a calculus topic"""
+        return self.match_with_strategy(node_label)[0]
+
+    def _partial_match(self, normalized_label):
+        label_grams = qgrams(normalized_label, self.q)
+        if not label_grams:
+            return None
+
+        shared = {}
+        for gram in label_grams:
+            for topic_id in self._postings.get(gram, ()):
+                shared[topic_id] = shared.get(topic_id, 0) + 1
+
+        best_id, best_score = None, self.threshold
+        for topic_id, count in shared.items():
+            score = count / min(len(label_grams), self._gram_counts[topic_id])
+            # Ties keep the earlier topic in list order
+            if score > best_score or (score == best_score and (best_id is None or topic_id < best_id)):
+                best_id, best_score = topic_id, score
+
+        if best_id is None:
+            return None
+        return self.calculus_topics[self._names[best_id]]
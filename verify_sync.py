@@ -1,196 +1,264 @@
 #!/usr/bin/env python3
 """
 Verify that all CSV associations are correctly synced to graph_data.json
+
+Both sources are reduced to sets of (topicCode, category, cs_topic,
+rationale_id) entries, rationale_id being the content hash from graph_io,
+and compared in both directions with set operations, per (topicCode,
+category, cs_topic) key:
+
+    missing   in the CSVs, not in the graph
+    extra     in the graph, no longer in the CSVs
+    changed   in both, but the rationale texts differ
+
+CSV rows whose calculus topic has no topic code are reported separately.
+
+Usage:
+    python3 verify_sync.py                    # human-readable report
+    python3 verify_sync.py --json report.json # also write a JSON report ('-' for stdout)
+
+Exit status: 0 when everything is in sync, 1 when anything needs fixing.
 """
 
+import argparse
 import json
-import csv
+import sys
+from collections import Counter
 from pathlib import Path
-from collections import defaultdict
-
-def normalize_text(text):
-    """Normalize text for matching"""
-    import re
-    if not text:
-        return ''
-    normalized = text.lower()
-    normalized = normalized.replace('&', 'and')
-    normalized = normalized.replace("'", '').replace('`', '').replace("'", '')
-    normalized = re.sub(r'[^a-z0-9\s]', ' ', normalized)
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
-    normalized = normalized.replace(' ', '')
-    return normalized
-
-def parse_calculus_csv(filepath):
-    """Parse Calculus topic list CSV"""
-    topics = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            topic_code = row.get('Topic Code', '').strip()
-            if topic_code:
-                topics[topic_code] = {
-                    'course': row.get('Course', '').strip(),
-                    'coreIdea': row.get('Core Idea', '').strip(),
-                    'topicCode': topic_code,
-                    'topicName': row.get('Topic Name', '').strip()
-                }
-    return topics
-
-def parse_rationales_csv(filepath, category_name):
-    """Parse a rationales CSV file"""
-    rationales = []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            calc_topic = row.get('Calculus topic', '').strip()
-            cs_topic = row.get('CS topic', '').strip()
-            rationale = row.get('Rationale', '').strip()
-            
-            if calc_topic and cs_topic and rationale:
-                rationales.append({
-                    'calc_topic': calc_topic,
-                    'cs_topic': cs_topic,
-                    'rationale': rationale,
-                    'category': category_name
-                })
-    return rationales
 
-def main():
-    base_path = Path(__file__).parent
-    
-    # File paths
-    calc_list_file = base_path / 'Calculus topic list-Table 1.csv'
-    ml_calc_file = base_path / 'ML-Calc-Table 1.csv'
-    alg_calc_file = base_path / 'Alg-Calc-Table 1.csv'
-    ai_calc_file = base_path / 'AI-Calc-Table 1.csv'
-    cg_calc_file = base_path / 'CG-Calc-Table 1.csv'
-    graph_data_file = base_path / 'graph_data.json'
-    
-    print("=" * 80)
-    print("验证 CSV 文件与 graph_data.json 的同步情况")
-    print("=" * 80)
-    
-    # Load calculus topics
-    calculus_topics = parse_calculus_csv(calc_list_file)
-    
-    # Build a map from topic name to topic code
-    topic_name_to_code = {}
-    for code, info in calculus_topics.items():
-        normalized_name = normalize_text(info['topicName'])
-        topic_name_to_code[normalized_name] = code
-    
-    # Load all rationales from CSV files
-    all_csv_rationales = []
-    
-    csv_files = [
-        (ml_calc_file, 'Machine Learning'),
-        (alg_calc_file, 'Algorithms'),
-        (ai_calc_file, 'Artificial Intelligence'),
-        (cg_calc_file, 'Computer Graphics')
-    ]
-    
-    print("\n从 CSV 文件读取关联:")
-    for csv_file, category in csv_files:
-        if csv_file.exists():
-            rationales = parse_rationales_csv(csv_file, category)
-            all_csv_rationales.extend(rationales)
-            print(f"  {category}: {len(rationales)} 个关联")
-    
-    print(f"\nCSV 文件总计: {len(all_csv_rationales)} 个关联")
-    
-    # Load graph_data.json
-    with open(graph_data_file, 'r', encoding='utf-8') as f:
-        graph = json.load(f)
-    
-    # Build a map of what's in graph_data.json
-    # Key: (topicCode, category, cs_topic) -> rationale
-    graph_rationales = {}
+from graph_io import load_graph, rationale_id
+from ingest import GRAPH_DATA_FILE, load_dataset
+
+REPORT_VERSION = 1
+# Entries of each kind listed in the human-readable output
+SHOW_LIMIT = 20
+SUMMARY_KINDS = ('found', 'missing', 'extra', 'changed', 'not_found_topic')
+
+def _item_rationale_id(item):
+    # The text wins over a loaded rationale_id: a stage may have edited it since,
+    # and write_graph() writes the text. Items never resolved only have the id.
+    if 'rationale' in item or not item.get('rationale_id'):
+        return rationale_id(item.get('rationale') or '')
+    return item['rationale_id']
+
+def _graph_items(graph):
+    """(key, item) for every graph association that is compared"""
     for node in graph['nodes']:
-        topic_code = node.get('topicCode')
-        if not topic_code:
+        if not node.get('topicCode'):
             continue
-        
-        rationales = node.get('rationales', {})
-        for category, items in rationales.items():
+        for category, items in (node.get('rationales') or {}).items():
             for item in items:
                 cs_topic = item.get('cs_topic', '').strip()
                 if cs_topic:
-                    key = (topic_code, category, cs_topic)
-                    graph_rationales[key] = item.get('rationale', '')
-    
-    print(f"graph_data.json 总计: {len(graph_rationales)} 个关联")
-    
-    # Check for missing associations
-    missing = []
-    found = []
-    not_found_topic = []
-    
-    for csv_item in all_csv_rationales:
-        calc_topic = csv_item['calc_topic']
-        cs_topic = csv_item['cs_topic']
-        category = csv_item['category']
-        
-        # Find topic code
-        normalized_calc = normalize_text(calc_topic)
-        topic_code = topic_name_to_code.get(normalized_calc)
-        
-        if not topic_code:
-            not_found_topic.append({
-                'calc_topic': calc_topic,
-                'category': category,
-                'cs_topic': cs_topic
-            })
-            continue
-        
-        key = (topic_code, category, cs_topic)
-        if key not in graph_rationales:
-            missing.append({
-                'topic_code': topic_code,
-                'calc_topic': calc_topic,
-                'category': category,
-                'cs_topic': cs_topic
-            })
-        else:
-            found.append(key)
-    
+                    yield (node['topicCode'], category, cs_topic), item
+
+def csv_entries(dataset):
+    """CSV 关联: {(topicCode, category, cs_topic, rationale_id)}"""
+    return {
+        (row['topic_code'], row['category'], row['cs_topic'].strip(), rationale_id(row['rationale']))
+        for row in dataset.rows
+        if row['topic_code']
+    }
+
+def graph_entries(graph):
+    """graph 中的关联: {(topicCode, category, cs_topic, rationale_id)}"""
+    return {key + (_item_rationale_id(item),) for key, item in _graph_items(graph)}
+
+def _ids_by_key(entries, keys):
+    ids = {}
+    for entry in entries:
+        if entry[:3] in keys:
+            ids.setdefault(entry[:3], set()).add(entry[3])
+    return ids
+
+def changed_texts(graph, dataset, keys):
+    """两侧的 rationale 文本 {'csv', 'graph': {key: set(text)}}，只解析 keys 中的关联"""
+    texts = {'csv': {}, 'graph': {}}
+    if not keys:
+        return texts
+    for row in dataset.rows:
+        key = (row['topic_code'], row['category'], row['cs_topic'].strip())
+        if row['topic_code'] and key in keys:
+            texts['csv'].setdefault(key, set()).add(row['rationale'])
+    for key, item in _graph_items(graph):
+        if key in keys:
+            texts['graph'].setdefault(key, set()).add(item.get('rationale') or '')
+    return texts
+
+def check_sync(graph, dataset):
+    """双向比较 CSV 关联与内存中的 graph
+
+    返回 {'found', 'missing', 'extra', 'changed', 'not_found_topic', 'categories',
+    'calc_topics', 'changed_ids', 'csv_total', 'graph_total'};
+    missing/extra/changed 为排序后的 (topicCode, category, cs_topic) 列表,
+    changed_ids 为两侧各自的 rationale_id (文本可用 changed_texts() 取得)。
+    """
+    csv_set = csv_entries(dataset)
+    graph_set = graph_entries(graph)
+    csv_keys = {entry[:3] for entry in csv_set}
+    graph_keys = {entry[:3] for entry in graph_set}
+
+    shared = csv_keys & graph_keys
+    missing = csv_keys - graph_keys
+    extra = graph_keys - csv_keys
+    # A shared key whose texts differ shows up in the symmetric difference
+    changed = {entry[:3] for entry in csv_set ^ graph_set} & shared
+
+    not_found_topic = [
+        {'calc_topic': row['calc_topic'], 'category': row['category'], 'cs_topic': row['cs_topic']}
+        for row in dataset.rows
+        if not row['topic_code']
+    ]
+    calc_topics = {}
+    if missing or changed:
+        for row in dataset.rows:
+            if row['topic_code']:
+                key = (row['topic_code'], row['category'], row['cs_topic'].strip())
+                if key in missing or key in changed:
+                    calc_topics.setdefault(key, row['calc_topic'])
+
+    categories = {}
+    found_by_category = Counter(key[1] for key in shared)
+    changed_by_category = Counter(key[1] for key in changed)
+    found_by_category.subtract(changed_by_category)
+    for kind, counts in (
+        ('found', found_by_category),
+        ('missing', Counter(key[1] for key in missing)),
+        ('extra', Counter(key[1] for key in extra)),
+        ('changed', changed_by_category),
+        ('not_found_topic', Counter(item['category'] for item in not_found_topic)),
+    ):
+        for category, count in counts.items():
+            if count:
+                categories.setdefault(category, dict.fromkeys(SUMMARY_KINDS, 0))[kind] = count
+
+    return {
+        'found': len(shared) - len(changed),
+        'missing': sorted(missing),
+        'extra': sorted(extra),
+        'changed': sorted(changed),
+        'not_found_topic': not_found_topic,
+        'categories': dict(sorted(categories.items())),
+        'calc_topics': calc_topics,
+        'changed_ids': {
+            'csv': _ids_by_key(csv_set, changed),
+            'graph': _ids_by_key(graph_set, changed),
+        } if changed else {'csv': {}, 'graph': {}},
+        'csv_total': len(csv_keys),
+        'graph_total': len(graph_keys),
+    }
+
+def problem_count(result):
+    return len(result['missing']) + len(result['extra']) + len(result['changed']) + len(result['not_found_topic'])
+
+def build_report(result):
+    """JSON 报告"""
+    def entry(key):
+        topic_code, category, cs_topic = key
+        return {'topic_code': topic_code, 'category': category, 'cs_topic': cs_topic}
+
+    return {
+        'version': REPORT_VERSION,
+        'in_sync': problem_count(result) == 0,
+        'totals': {
+            'csv': result['csv_total'],
+            'graph': result['graph_total'],
+            'found': result['found'],
+            'missing': len(result['missing']),
+            'extra': len(result['extra']),
+            'changed': len(result['changed']),
+            'not_found_topic': len(result['not_found_topic']),
+        },
+        'categories': result['categories'],
+        'missing': [dict(entry(key), calc_topic=result['calc_topics'][key]) for key in result['missing']],
+        'extra': [entry(key) for key in result['extra']],
+        'changed': [
+            dict(entry(key),
+                 csv_rationale_ids=sorted(result['changed_ids']['csv'][key]),
+                 graph_rationale_ids=sorted(result['changed_ids']['graph'][key]))
+            for key in result['changed']
+        ],
+        'not_found_topic': result['not_found_topic'],
+    }
+
+def print_report(result, dataset):
+    print("=" * 80)
+    print("验证 CSV 文件与 graph_data.json 的同步情况")
+    print("=" * 80)
+
+    print("\n从 CSV 文件读取关联:")
+    for category, rows in dataset.rows_by_category.items():
+        print(f"  {category}: {len(rows)} 个关联")
+
+    print(f"\nCSV 文件总计: {len(dataset.rows)} 行, {result['csv_total']} 个关联")
+    print(f"graph_data.json 总计: {result['graph_total']} 个关联")
+
     print(f"\n同步状态:")
-    print(f"  ✓ 已同步: {len(found)} 个关联")
-    print(f"  ✗ 缺失: {len(missing)} 个关联")
-    if not_found_topic:
-        print(f"  ⚠ 无法找到主题代码: {len(not_found_topic)} 个关联")
-    
-    if missing:
-        print(f"\n缺失的关联 (前20个):")
-        for i, item in enumerate(missing[:20], 1):
-            print(f"  {i}. {item['topic_code']} ({item['calc_topic']}) -> {item['category']} / {item['cs_topic']}")
-        if len(missing) > 20:
-            print(f"  ... 还有 {len(missing) - 20} 个")
-    
-    if not_found_topic:
+    print(f"  ✓ 已同步: {result['found']} 个关联")
+    print(f"  ✗ 缺失: {len(result['missing'])} 个关联")
+    print(f"  ✗ 多余 (CSV 中已不存在): {len(result['extra'])} 个关联")
+    if result['changed']:
+        print(f"  ⚠ rationale 文本不一致: {len(result['changed'])} 个关联")
+    if result['not_found_topic']:
+        print(f"  ⚠ 无法找到主题代码: {len(result['not_found_topic'])} 个关联")
+
+    print(f"\n按类别:")
+    for category, summary in result['categories'].items():
+        print(f"  {category}: 已同步 {summary['found']}, 缺失 {summary['missing']}, "
+              f"多余 {summary['extra']}, 不一致 {summary['changed']}, 无主题代码 {summary['not_found_topic']}")
+
+    for kind, title in (('missing', '缺失的关联'), ('extra', '多余的关联'),
+                        ('changed', 'rationale 文本与 CSV 不一致的关联')):
+        keys = result[kind]
+        if not keys:
+            continue
+        print(f"\n{title} (前{SHOW_LIMIT}个):")
+        for i, key in enumerate(keys[:SHOW_LIMIT], 1):
+            topic_code, category, cs_topic = key
+            calc_topic = result['calc_topics'].get(key)
+            label = f"{topic_code} ({calc_topic})" if calc_topic else topic_code
+            print(f"  {i}. {label} -> {category} / {cs_topic}")
+        if len(keys) > SHOW_LIMIT:
+            print(f"  ... 还有 {len(keys) - SHOW_LIMIT} 个")
+
+    if result['not_found_topic']:
         print(f"\n无法找到主题代码的关联:")
-        for item in not_found_topic:
+        for item in result['not_found_topic']:
             print(f"  - {item['calc_topic']} -> {item['category']} / {item['cs_topic']}")
-    
-    # Check Image composition specifically
-    print(f"\n检查 Image composition 关联:")
-    image_comp_found = False
-    for key, rationale in graph_rationales.items():
-        topic_code, category, cs_topic = key
-        if cs_topic.lower() == 'image composition' and category == 'Computer Graphics':
-            print(f"  ✓ 找到: {topic_code} ({calculus_topics.get(topic_code, {}).get('topicName', 'Unknown')}) -> Computer Graphics / Image composition")
-            image_comp_found = True
-            break
-    
-    if not image_comp_found:
-        print(f"  ✗ 未找到 Image composition 关联")
-    
+
     print("\n" + "=" * 80)
-    if len(missing) == 0 and len(not_found_topic) == 0:
+    problems = problem_count(result)
+    if problems == 0:
         print("✓ 所有关联都已正确同步！")
     else:
-        print(f"⚠ 还有 {len(missing) + len(not_found_topic)} 个关联需要修复")
+        print(f"⚠ 还有 {problems} 个关联需要修复")
     print("=" * 80)
 
+def main():
+    parser = argparse.ArgumentParser(description='Verify that the CSV associations are synced to graph_data.json')
+    parser.add_argument('--json', metavar='PATH',
+                        help="write a JSON report to PATH ('-' for stdout, which replaces the text report)")
+    args = parser.parse_args()
+
+    base_path = Path(__file__).parent
+    graph_data_file = base_path / GRAPH_DATA_FILE
+
+    dataset = load_dataset(base_path)
+    graph = load_graph(graph_data_file)
+    result = check_sync(graph, dataset)
+
+    if args.json != '-':
+        print_report(result, dataset)
+    if args.json:
+        report = build_report(result)
+        if args.json == '-':
+            json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+            print()
+        else:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+    sys.exit(1 if problem_count(result) else 0)
+
 if __name__ == '__main__':
     main()